@@ -0,0 +1,243 @@
+"""
+Times every stage of the shell pipeline (read, clean, makexy, every model command, runall, pca run, save and
+load) on synthetic datasets of a grid of sizes, records wall time, CPU time and peak memory per command, and
+compares the run against a stored baseline. Run from the repository root:
+>>> python -m benchmarks.pipeline --rows 1000 --cols 10 100 --save_baseline benchmarks/baseline.json
+>>> python -m benchmarks.pipeline --rows 1000 --cols 10 100 --baseline benchmarks/baseline.json --threshold 0.25
+>>> python -m benchmarks.pipeline --rows 1000 100000 10000000 --cols 10 100 1000 --max_cells 100000000
+The run exits with status 1 if any command fails, or is slower (or uses more memory) than the baseline by more
+than the threshold. Datasets are generated with a fixed seed, and every run works in a temporary directory with
+its own config, so saved projects and the data directory are never touched.
+"""
+
+from src.project_store import ProjectStore
+from src.commands.command import Command
+from src.profiling import PROFILER, peak_rss_bytes
+
+import pandas as pd
+import numpy as np
+import sklearn
+import argparse
+import platform
+import tempfile
+import shutil
+import json
+import time
+import os
+
+# Model commands use fewer folds and iterations than their defaults so the larger grids stay tractable.
+PIPELINES: dict[str, list[str]] = {
+    'regression': [
+        'read {data}', 'clean', 'makexy target',
+        'linearregression -n_splits 5',
+        'mlpregressor -n_splits 5 -max_iter 50',
+        'runall -n_values 2 -cv 3',
+        'pca run', 'save', 'load {alias}',
+    ],
+    'classification': [
+        'read {data}', 'clean', 'makexy target',
+        'gaussiannb -n_splits 5',
+        'mlpclassifier -n_splits 5 -max_iter 50',
+        'logisticregression -n_splits 5',
+        'decisiontreeclassifier -n_splits 5',
+        'randomforestclassifier -n_splits 5 -n_estimators 20',
+        'gradientboostingclassifier -n_splits 5 -n_estimators 20',
+        'runall -n_values 2 -cv 3',
+        'pca run', 'save', 'load {alias}',
+    ],
+}
+CATEGORIES = ['red', 'green', 'blue', 'yellow', 'black']
+# Rows generated and written at a time, so the largest datasets are never held in memory twice.
+WRITE_ROWS = 1_000_000
+
+
+def write_dataset(path: str, rows: int, cols: int, kind: str, seed: int = 0) -> None:
+    """
+    Writes a synthetic CSV: `cols - 1` numeric features, one string feature and a `target` column that is a
+    noisy linear function of the features (binned into three labels for classification).
+    """
+    rng = np.random.default_rng(seed)
+    weights = rng.normal(size=cols - 1)
+    offsets = rng.normal(size=len(CATEGORIES))
+    for start in range(0, rows, WRITE_ROWS):
+        n = min(WRITE_ROWS, rows - start)
+        X = rng.normal(size=(n, cols - 1))
+        category = rng.integers(len(CATEGORIES), size=n)
+        score = X @ weights + offsets[category] + rng.normal(scale=0.5, size=n)
+        df = pd.DataFrame(X, columns=[f'x{i}' for i in range(cols - 1)])
+        df['color'] = np.array(CATEGORIES)[category]
+        if kind == 'classification':
+            df['target'] = np.array(['low', 'mid', 'high'])[np.digitize(score, np.quantile(score, [1 / 3, 2 / 3]))]
+        else:
+            df['target'] = score
+        df.to_csv(path, mode='w' if start == 0 else 'a', header=start == 0, index=False)
+
+
+def run_pipeline(kind: str, rows: int, cols: int, memory: bool, seed: int) -> list[dict]:
+    """
+    Runs the pipeline of `kind` on a fresh project in the current directory and measures every command.
+
+    Returns:
+        list[dict]: Per command: its label, status, wall and CPU seconds, peak traced bytes and error, if any.
+    """
+    data = f'{kind}_{rows}x{cols}'
+    alias = f'bench_{data}'
+    write_dataset(f'data/{data}.csv', rows, cols, kind, seed=seed)
+    store = ProjectStore()
+    Command.from_string(f'create {alias} {kind}').execute(store)
+    records = []
+    for template in PIPELINES[kind]:
+        command = template.format(data=data, alias=alias)
+        label = command.split()[0] if not command.startswith('pca') else 'pca run'
+        if label == 'load':
+            store.delete(alias)
+        PROFILER.clear()
+        PROFILER.enable(memory=memory)
+        try:
+            Command.from_string(command).execute(store)
+            error = None
+        except Exception as e:
+            error = f'{type(e).__name__}: {e}'
+        finally:
+            PROFILER.disable()
+        top = next((record for record in reversed(PROFILER.records) if record['depth'] == 0), None)
+        records.append({
+            'command': label,
+            'status': 'failed' if error else 'ok',
+            'wall_s': top['wall_s'] if top else None,
+            'cpu_s': top['cpu_s'] if top else None,
+            'peak_bytes': top['peak_bytes'] if top else None,
+            'error': error,
+        })
+    PROFILER.clear()
+    return records
+
+
+def run_suite(rows: list[int], cols: list[int], kinds: list[str], memory: bool, max_cells: int, seed: int) -> dict:
+    """
+    Runs every pipeline on every dataset size of the grid, skipping sizes beyond `max_cells`.
+
+    Returns:
+        dict: The environment and one result per dataset, pipeline and command, keyed '<rows>x<cols>/<kind>/<command>'.
+    """
+    results: dict[str, dict] = {}
+    skipped = []
+    repo = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix='hungakid_bench_')
+    try:
+        os.chdir(workdir)
+        os.makedirs('config')
+        os.makedirs('data')
+        with open('config/paths.json', 'w') as f:
+            json.dump({'data_dir': 'data/', 'projects_dir': 'projects/'}, f)
+        for n_rows in rows:
+            for n_cols in cols:
+                if n_rows * n_cols > max_cells:
+                    skipped.append(f'{n_rows}x{n_cols}')
+                    continue
+                for kind in kinds:
+                    start = time.perf_counter()
+                    for record in run_pipeline(kind, n_rows, n_cols, memory, seed):
+                        results[f"{n_rows}x{n_cols}/{kind}/{record.pop('command')}"] = record
+                    print(f"{n_rows}x{n_cols} {kind}: {time.perf_counter() - start:.1f}s")
+                    shutil.rmtree('projects', ignore_errors=True)
+                    for file in os.listdir('data'):
+                        os.remove(os.path.join('data', file))
+    finally:
+        os.chdir(repo)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'scikit-learn': sklearn.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'seed': seed,
+        'memory_traced': memory,
+        'skipped': skipped,
+        'peak_rss_bytes': peak_rss_bytes(),
+        'results': results,
+    }
+
+
+def compare(run: dict, baseline: dict, threshold: float, min_seconds: float) -> list[str]:
+    """
+    Commands slower, or with a larger peak, than in `baseline` by more than `threshold` (0.2 is 20%), and commands
+    that passed in `baseline` but fail now. Timings below `min_seconds` in the baseline are too noisy to compare
+    and are ignored.
+
+    Returns:
+        list[str]: One line per regression.
+    """
+    regressions = []
+    for key, result in run['results'].items():
+        before = baseline['results'].get(key)
+        if before is None or before['status'] != 'ok':
+            continue
+        if result['status'] != 'ok':
+            regressions.append(f"{key}: {result['status']} (ok in the baseline): {result['error']}")
+            continue
+        if before['wall_s'] >= min_seconds and result['wall_s'] > before['wall_s'] * (1 + threshold):
+            regressions.append(f"{key}: {result['wall_s']:.3f}s vs {before['wall_s']:.3f}s "
+                               f"(+{result['wall_s'] / before['wall_s'] - 1:.0%})")
+        if result['peak_bytes'] and before['peak_bytes'] and result['peak_bytes'] > before['peak_bytes'] * (1 + threshold):
+            regressions.append(f"{key}: peak {result['peak_bytes'] / 1024 ** 2:.1f} MB vs "
+                               f"{before['peak_bytes'] / 1024 ** 2:.1f} MB (+{result['peak_bytes'] / before['peak_bytes'] - 1:.0%})")
+    return regressions
+
+
+def _format(run: dict) -> str:
+    lines = [f"{'dataset/pipeline/command':<56}{'status':>8}{'wall s':>10}{'cpu s':>10}{'peak MB':>10}"]
+    for key, result in run['results'].items():
+        wall = '-' if result['wall_s'] is None else f"{result['wall_s']:.3f}"
+        cpu = '-' if result['cpu_s'] is None else f"{result['cpu_s']:.3f}"
+        peak = '-' if result['peak_bytes'] is None else f"{result['peak_bytes'] / 1024 ** 2:.1f}"
+        lines.append(f"{key:<56}{result['status']:>8}{wall:>10}{cpu:>10}{peak:>10}")
+    if run['skipped']:
+        lines.append(f"Skipped (more than --max_cells cells): {', '.join(run['skipped'])}")
+    return '\n'.join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000, 100_000, 10_000_000], help='Row counts of the datasets.')
+    parser.add_argument('--cols', type=int, nargs='+', default=[10, 100, 1000], help='Column counts of the datasets.')
+    parser.add_argument('--kinds', nargs='+', default=list(PIPELINES), choices=list(PIPELINES), help='Pipelines to run.')
+    parser.add_argument('--max_cells', type=int, default=10_000_000, help='Skip datasets with more rows times columns.')
+    parser.add_argument('--no_memory', action='store_true', help='Do not trace allocations, which slows allocation-heavy commands down.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic datasets.')
+    parser.add_argument('--output', default=None, help='Write the results to this JSON file.')
+    parser.add_argument('--save_baseline', default=None, help='Write the results to this JSON file as the new baseline.')
+    parser.add_argument('--baseline', default=None, help='Compare against this baseline.')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Relative slowdown (or memory growth) counted as a regression.')
+    parser.add_argument('--min_seconds', type=float, default=0.05, help='Baseline timings below this are not compared.')
+    args = parser.parse_args()
+
+    run = run_suite(args.rows, args.cols, args.kinds, memory=not args.no_memory, max_cells=args.max_cells, seed=args.seed)
+    print(_format(run))
+    failed = [f"{key}: {result['error']}" for key, result in run['results'].items() if result['status'] != 'ok']
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(run, f, indent=4)
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        if baseline.get('memory_traced') != run['memory_traced']:
+            print("Warning: the baseline was recorded with memory tracing set differently; timings are not comparable.")
+        regressions = compare(run, baseline, args.threshold, args.min_seconds)
+        if regressions:
+            print(f"{len(regressions)} regressions beyond {args.threshold:.0%}:")
+            print('\n'.join(regressions))
+            raise SystemExit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}.")
+    if failed:
+        print(f"{len(failed)} commands failed:")
+        print('\n'.join(failed))
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -3,15 +3,40 @@ This is the main entry point for the application.
 It initializes the ProjectStore and Shell, then starts the shell. Example usage:
 >>> python main.py
 >>> >> create bonk regression; read Iris; view; makexy SepalLengthCm; linearregression; mlpregressor max_iter=1000; summary
+Scripts of shell commands run in batch mode, independent projects in parallel:
+>>> python main.py run nightly.hk --log nightly.json
 """
 
 from src.shell import Shell
 from src.project_store import ProjectStore
+from src.batch import run_script
+
+import argparse
+import sys
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    modes = parser.add_subparsers(dest='mode')
+    run = modes.add_parser('run', help='Run a script of shell commands.')
+    run.add_argument('script', help='Script with one or more ;-separated commands per line. Lines starting with # are comments.')
+    run.add_argument('--log', default=None, help='JSON log to write. Defaults to <script>.log.json.')
+    run.add_argument('--n_jobs', type=int, default=None, help='Projects run concurrently. Defaults to one per project, at most one per core.')
+    run.add_argument('--keep_going', action='store_true', help="Keep running a project's commands after one failed.")
+    args = parser.parse_args()
+
+    if args.mode == 'run':
+        try:
+            result = run_script(args.script, log=args.log, n_jobs=args.n_jobs, keep_going=args.keep_going)
+        except (ValueError, FileNotFoundError) as e:
+            parser.error(str(e))
+        for line in result['summary']:
+            print(line)
+        print(f"{args.script}: {result['status']} in {result['seconds']:.1f}s, log written to {args.log or args.script + '.log.json'}.")
+        sys.exit(0 if result['status'] == 'ok' else 1)
+
     project_store = ProjectStore()
     shell = Shell(project_store)
     shell.run()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
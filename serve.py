@@ -0,0 +1,52 @@
+"""
+Serves a saved project's fitted model over HTTP on localhost. Example usage:
+>>> python serve.py bonk
+>>> python serve.py bonk --model linear_regression --port 8080
+>>> python serve.py bonk --retrain "linearregression -n_splits 5"
+POST /predict with {"rows": [{"sepalwidthcm": 3.1, ...}, ...]} answers {"model": ..., "predictions": [...]}.
+GET /stats answers request counts, p50/p99 latency and throughput.
+"""
+
+from src.project_store import ProjectStore
+from src.commands.command import Command
+from src.serving import make_server
+
+import argparse
+import json
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('project', help='Saved project to serve.')
+    parser.add_argument('--model', default=None, help='Logged model to serve. Defaults to the one with the best score.')
+    parser.add_argument('--retrain', default=None, help='Model command to run before serving, e.g. "linearregression".')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to bind.')
+    parser.add_argument('--port', type=int, default=8000, help='Port to bind.')
+    parser.add_argument('--max_batch_rows', type=int, default=1024, help='Rows after which a micro-batch is predicted.')
+    parser.add_argument('--max_wait_ms', type=float, default=2.0, help='Milliseconds a micro-batch waits for more requests.')
+    args = parser.parse_args()
+
+    project_store = ProjectStore()
+    try:
+        project_store.load_project_from_file(args.project, lazy=True)
+        if args.retrain:
+            result = Command.from_string(args.retrain).execute(project_store)
+            if result is not None:
+                print(result.result)
+        project = project_store.get_current_project()
+        server, batcher = make_server(project, model=args.model, host=args.host, port=args.port,
+                                      max_batch_rows=args.max_batch_rows, max_wait=args.max_wait_ms / 1000)
+    except ValueError as e:
+        parser.error(str(e))
+    host, port = server.server_address[:2]
+    print(f"Serving {args.project} on http://{host}:{port}/predict. Press Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
+        print(json.dumps(batcher.stats.snapshot(), indent=4))
+
+if __name__ == "__main__":
+    main()
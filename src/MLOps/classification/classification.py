@@ -10,7 +10,7 @@ from typing import Any
 
 
 def naivebayes(X: np.ndarray, y: np.ndarray, *args, **kwargs
-                       ) -> tuple[np.ndarray,  np.ndarray[Any, Any]]:
+                       ) -> tuple[np.ndarray,  np.ndarray[Any, Any], Any]:
     """
     Perform Naive Bayes classification with k-fold cross-validation.
 
@@ -19,19 +19,20 @@ def naivebayes(X: np.ndarray, y: np.ndarray, *args, **kwargs
         y (np.ndarray): Target vector.
 
     Returns:
-        tuple[np.ndarray, np.ndarray[Any, Any]]: 
+        tuple[np.ndarray, np.ndarray[Any, Any], Any]: 
             - Predictions from the cross-validation.
             - Class priors of the final model.
+            - The final model, fitted on the full data.
     """
     
     predictions, scores, final_model = generic_ml(GaussianNB(), X, y, **kwargs)
 
     model_priors: np.ndarray[Any, Any] = final_model.class_prior_
     
-    return np.array(predictions), model_priors
+    return np.array(predictions), model_priors, final_model
 
 def mlpclas(X: np.ndarray, y: np.ndarray, *args, **kwargs
-                       ) -> tuple[np.ndarray, float, np.ndarray]:
+                       ) -> tuple[np.ndarray, float, np.ndarray, Any]:
     """
     Perform MLP classification with k-fold cross-validation.
 
@@ -41,19 +42,20 @@ def mlpclas(X: np.ndarray, y: np.ndarray, *args, **kwargs
         **kwargs: Additional keyword arguments for k-fold cross-validation.
 
     Returns:
-        tuple[np.ndarray, np.ndarray, np.ndarray]: 
+        tuple[np.ndarray, np.ndarray, np.ndarray, Any]: 
             - Predictions from the cross-validation.
             - Intercepts of the final model.
             - Weights of the final model.
+            - The final model, fitted on the full data.
     """
     predictions, scores, final_model = generic_ml(MLPClassifier(), X, y, *args, **kwargs)
 
     model_weights: np.ndarray = final_model.coefs_
     
-    return np.array(predictions), final_model.intercepts_, model_weights
+    return np.array(predictions), final_model.intercepts_, model_weights, final_model
 
 def logisticreg(X: np.ndarray, y: np.ndarray, *args, **kwargs
-                       ) -> tuple[np.ndarray, float, np.ndarray]:
+                       ) -> tuple[np.ndarray, float, np.ndarray, Any]:
     """
     Perform logistic regression with k-fold cross-validation.
 
@@ -63,16 +65,17 @@ def logisticreg(X: np.ndarray, y: np.ndarray, *args, **kwargs
         **kwargs: Additional keyword arguments for k-fold cross-validation.
 
     Returns:
-        tuple[np.ndarray, float, np.ndarray]: 
+        tuple[np.ndarray, float, np.ndarray, Any]: 
             - Predictions from the cross-validation.
             - Intercept of the final model.
             - Coefficients of the final model.
+            - The final model, fitted on the full data.
     """
     predictions, scores, final_model = generic_ml(LogisticRegression(), X, y, *args, **kwargs)
 
     model_weights: np.ndarray = final_model.coef_
     
-    return np.array(predictions), final_model.intercept_, model_weights
+    return np.array(predictions), final_model.intercept_, model_weights, final_model
 
 def decisiontree(X: np.ndarray, y: np.ndarray, *args, **kwargs
                        ) -> tuple[np.ndarray, np.ndarray, Any]:
@@ -0,0 +1,257 @@
+"""Closed-form cross-validation of ordinary least squares. One pass over X accumulates the sufficient statistics
+(row count, column sums, Gram matrix X^T X, X^T y and the sum of y) of every fold's held-out rows. The training
+statistics of a fold are the totals minus its own block, so all K fold fits and the final fit are solved from
+p x p systems instead of refitting on the data K + 1 times. Leave-one-out predictions follow from the leverages of the
+full fit in the same way, without a single refit."""
+
+from src.MLOps.utils.ml_utils import k_fold_cross, generic_ml
+from src.MLOps.utils.preprocessing import Standardizer, PreprocessingCache
+from src.MLOps.utils.result_cache import ResultCache
+from src.profiling import phase
+
+from sklearn.linear_model import LinearRegression
+from sklearn.metrics import r2_score
+from scipy import sparse
+from dataclasses import dataclass
+from typing import Any
+import numpy as np
+
+# Rows of X read at a time, so a memory-mapped X is streamed rather than loaded.
+DEFAULT_CHUNK_ROWS = 1 << 16
+# Eigenvalues of the standardized Gram matrix below this fraction of the largest count as zero. Exactly collinear
+# columns (e.g. every dummy of a one-hot encoded column) then get the minimum-norm solution, as with lstsq.
+RCOND = 1e-12
+# Keyword arguments that control cross-validation rather than the estimator.
+CV_KWARGS = frozenset({'n_splits', 'shuffle', 'random_state', 'n_jobs', 'preprocessing', 'cache', 'chunksize', 'cv'})
+CV_MODES = ('kfold', 'loo')
+# Rows with a leverage this close to 1 are the only ones spanning some direction of X (e.g. the single row of a
+# category). Their leave-one-out residual is not e / (1 - h), so they are refitted without the row instead.
+LEVERAGE_TOLERANCE = 1e-8
+
+
+@dataclass
+class Statistics:
+    """Sufficient statistics of least squares on a set of rows."""
+    n: float
+    sx: np.ndarray
+    sxx: np.ndarray
+    sxy: np.ndarray
+    sy: float
+
+    def __sub__(self, other: "Statistics") -> "Statistics":
+        return Statistics(self.n - other.n, self.sx - other.sx, self.sxx - other.sxx, self.sxy - other.sxy, self.sy - other.sy)
+
+    def __add__(self, other: "Statistics") -> "Statistics":
+        return Statistics(self.n + other.n, self.sx + other.sx, self.sxx + other.sxx, self.sxy + other.sxy, self.sy + other.sy)
+
+    def solve(self) -> tuple[np.ndarray, np.ndarray, float, np.ndarray]:
+        """
+        Least squares with an intercept, solved on standardized columns like LinearRegression after standard_pipeline.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, float, np.ndarray]: Coefficients on the unstandardized columns, the column
+                means, the mean of y and the column standard deviations (1 for constant columns).
+        """
+        w, x_mean, y_mean, scale, _ = self._solve()
+        return w, x_mean, y_mean, scale
+
+    def _solve(self) -> tuple[np.ndarray, np.ndarray, float, np.ndarray, np.ndarray]:
+        """solve, also returning the pseudo-inverse of the centered Gram matrix of the unstandardized columns."""
+        x_mean = self.sx / self.n
+        y_mean = self.sy / self.n
+        cxx = self.sxx - self.n * np.outer(x_mean, x_mean)
+        cxy = self.sxy - self.n * x_mean * y_mean
+        var = np.diag(cxx) / self.n
+        # Cancellation leaves a constant column with a variance of rounding size rather than 0.
+        constant = var <= 1e-12 * np.maximum(np.diag(self.sxx) / self.n, np.finfo(np.float64).tiny)
+        scale = np.where(constant, 1.0, np.sqrt(np.maximum(var, 0)))
+        czz = cxx / np.outer(scale, scale)
+        czy = cxy / scale
+        czz[constant, :] = 0
+        czz[:, constant] = 0
+        czy[constant] = 0
+        czz_inv = np.linalg.pinv(czz, rcond=RCOND, hermitian=True)
+        w = czz_inv @ czy
+        return w / scale, x_mean, y_mean, scale, czz_inv / np.outer(scale, scale)
+
+
+def _block(X: np.ndarray | sparse.spmatrix, start: int, stop: int, shift: np.ndarray | None) -> np.ndarray | sparse.csr_matrix:
+    """Rows start:stop of X in float64, minus `shift` for dense X."""
+    if sparse.issparse(X):
+        return sparse.csr_matrix(X[start:stop], dtype=np.float64)
+    block = np.asarray(X[start:stop], dtype=np.float64)
+    return block - shift if shift is not None else block
+
+
+def _statistics(Xk: np.ndarray | sparse.csr_matrix, yk: np.ndarray) -> Statistics:
+    gram = Xk.T @ Xk
+    return Statistics(n=float(Xk.shape[0]),
+                      sx=np.asarray(Xk.sum(axis=0)).ravel(),
+                      sxx=gram.toarray() if sparse.issparse(gram) else gram,
+                      sxy=np.asarray(Xk.T @ yk).ravel(),
+                      sy=float(yk.sum()))
+
+
+def _final_model(X: np.ndarray | sparse.spmatrix, total: Statistics, shift: np.ndarray | None,
+                 preprocessing: PreprocessingCache | None) -> LinearRegression:
+    """The fit on every row, as a LinearRegression expecting rows standardized with the full-data statistics."""
+    w, x_mean, y_mean, scale = total.solve()
+    if shift is not None:
+        x_mean = x_mean + shift
+    if preprocessing is not None:
+        scaler = preprocessing.scaler(X)
+    else:
+        scaler = Standardizer(mean=None if sparse.issparse(X) else x_mean, scale=scale)
+    # Coefficients on the columns as the scaler standardizes them, so FittedModel can predict raw rows.
+    offset = 0 if scaler.mean is None else scaler.mean
+    final_model = LinearRegression()
+    final_model.coef_ = w * scaler.scale
+    final_model.intercept_ = float(y_mean - w @ (x_mean - offset))
+    final_model.n_features_in_ = X.shape[1]
+    return final_model
+
+
+def loo_predictions(X: np.ndarray | sparse.spmatrix, y: np.ndarray, total: Statistics, shift: np.ndarray | None,
+                    chunk_rows: int) -> np.ndarray:
+    """
+    Exact leave-one-out predictions of least squares, from the fit on every row and its leverages.
+
+    The leverage of row i is h_i = 1/n + d_i^T C^+ d_i, with d_i the row minus the column means and C the centered
+    Gram matrix, and the prediction without row i is y_i - e_i / (1 - h_i), where e_i is its residual under the
+    full fit. This costs O(n p^2) instead of n refits. Rows with a leverage of 1 are refitted from the statistics
+    of every other row.
+
+    Args:
+        X (np.ndarray | sparse.spmatrix): Feature matrix, read in chunks.
+        y (np.ndarray): Target vector.
+        total (Statistics): Statistics of every row, of X minus `shift`.
+        shift (np.ndarray | None): What was subtracted from the rows of dense X.
+        chunk_rows (int): Rows read at a time.
+
+    Returns:
+        np.ndarray: Prediction of every row by the model fitted without it.
+    """
+    w, x_mean, y_mean, _, gram_inv = total._solve()
+    n_rows = X.shape[0]
+    predictions = np.empty(n_rows, dtype=np.float64)
+    refit = []
+    for start in range(0, n_rows, chunk_rows):
+        Xc = _block(X, start, start + chunk_rows, shift)
+        d = (Xc.toarray() if sparse.issparse(Xc) else Xc) - x_mean
+        yc = np.asarray(y[start:start + chunk_rows], dtype=np.float64)
+        residuals = yc - (y_mean + d @ w)
+        leverages = 1 / total.n + np.einsum('ij,jk,ik->i', d, gram_inv, d)
+        singular = 1 - leverages < LEVERAGE_TOLERANCE
+        predictions[start:start + len(yc)] = yc - residuals / np.where(singular, 1, 1 - leverages)
+        refit.extend(start + np.flatnonzero(singular))
+    for row in refit:
+        Xr = _block(X, row, row + 1, shift)
+        w_r, x_mean_r, y_mean_r, _ = (total - _statistics(Xr, np.asarray(y[row:row + 1], dtype=np.float64))).solve()
+        predictions[row] = float(np.asarray(Xr @ w_r).ravel()[0]) + y_mean_r - x_mean_r @ w_r
+    return predictions
+
+
+def ols_ml(X: np.ndarray | sparse.spmatrix, y: np.ndarray, **kwargs: Any) -> tuple[np.ndarray, list[float], LinearRegression]:
+    """
+    Drop-in for generic_ml(LinearRegression(), X, y, **kwargs), computed from the sufficient statistics of the folds.
+    With cv='loo' the out-of-fold predictions are exact leave-one-out predictions (see loo_predictions).
+
+    X is read in chunks twice: once to accumulate the statistics of every fold's held-out rows, and once to
+    predict the held-out rows. Both passes read contiguous rows only, so a memory-mapped X is streamed and never
+    loaded whole. The predictions equal those of LinearRegression fitted on standard_pipeline's folds up to
+    rounding. Estimator arguments (e.g. -fit_intercept False) fall back to generic_ml.
+
+    Args:
+        X (np.ndarray | sparse.spmatrix): Feature matrix.
+        y (np.ndarray): Target vector.
+        **kwargs: As for generic_ml.
+            n_splits, shuffle, random_state: The folds, as in generic_ml. Ignored for leave-one-out.
+            cv (str, optional): 'kfold' (default) or 'loo' for leave-one-out, where every row is its own fold.
+            chunksize (int, optional): Rows read at a time. Default is 65536.
+            preprocessing (PreprocessingCache, optional): Only its statistics of the full X are used, for the final model.
+            cache (ResultCache, optional): The project's result cache, as in generic_ml.
+            n_jobs: Ignored. The work is in BLAS calls, which use every core already.
+
+    Returns:
+        tuple[np.ndarray, list[float], LinearRegression]: Out-of-fold predictions, the fold R^2 scores (a single
+            R^2 of every prediction for leave-one-out) and the final model, which expects rows standardized with the
+            project's full-data statistics.
+    """
+    cv = kwargs.get('cv', 'kfold')
+    if cv not in CV_MODES:
+        raise ValueError(f"Invalid cv {cv}. Must be one of {', '.join(CV_MODES)}.")
+    if set(kwargs) - CV_KWARGS:
+        if cv == 'loo':
+            raise ValueError("Leave-one-out is only supported for ordinary least squares. Remove the model arguments or -cv.")
+        kwargs.pop('cv', None)
+        return generic_ml(LinearRegression(), X, y, **kwargs)
+    cache: ResultCache | None = kwargs.pop('cache', None)
+    if cache is not None:
+        key = cache.key(LinearRegression(), X, y, kwargs)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+        result = ols_ml(X, y, **kwargs)
+        cache.put(key, *result)
+        return result
+    n_splits: int = kwargs.pop('n_splits', 10)
+    shuffle: bool = kwargs.pop('shuffle', False)
+    random_state: int | None = kwargs.pop('random_state', 42) if shuffle else None
+    chunk_rows: int = int(kwargs.pop('chunksize', None) or DEFAULT_CHUNK_ROWS)
+    preprocessing: PreprocessingCache | None = kwargs.pop('preprocessing', None)
+    if chunk_rows < 1:
+        raise ValueError("chunksize must be a positive number of rows.")
+
+    n_rows, n_features = X.shape
+    # Statistics are accumulated around the mean of the first rows: sums of squares far from zero would cancel.
+    shift = None if sparse.issparse(X) else np.asarray(X[:chunk_rows], dtype=np.float64).mean(axis=0)
+    if kwargs.get('cv') == 'loo':
+        with phase('fold fit'):
+            total = Statistics(0.0, np.zeros(n_features), np.zeros((n_features, n_features)), np.zeros(n_features), 0.0)
+            for start in range(0, n_rows, chunk_rows):
+                total += _statistics(_block(X, start, start + chunk_rows, shift), np.asarray(y[start:start + chunk_rows], dtype=np.float64))
+        with phase('predict'):
+            predictions = loo_predictions(X, y, total, shift, chunk_rows)
+            scores = [float(r2_score(y, predictions))]
+        with phase('refit'):
+            final_model = _final_model(X, total, shift, preprocessing)
+        return predictions, scores, final_model
+
+    folds = k_fold_cross(X, y, n_splits=n_splits, random_state=random_state, shuffle=shuffle)
+    fold_of = np.empty(n_rows, dtype=np.intp)
+    for k, (_, test_index) in enumerate(folds):
+        fold_of[test_index] = k
+
+    with phase('fold fit'):
+        blocks = [Statistics(0.0, np.zeros(n_features), np.zeros((n_features, n_features)), np.zeros(n_features), 0.0)
+                  for _ in folds]
+        for start in range(0, n_rows, chunk_rows):
+            Xc = _block(X, start, start + chunk_rows, shift)
+            yc = np.asarray(y[start:start + chunk_rows], dtype=np.float64)
+            fc = fold_of[start:start + chunk_rows]
+            for k in np.unique(fc):
+                mask = fc == k
+                part = _statistics(Xc[mask], yc[mask])
+                block = blocks[k]
+                block.n += part.n
+                block.sx += part.sx
+                block.sxx += part.sxx
+                block.sxy += part.sxy
+                block.sy += part.sy
+        total = sum(blocks[1:], blocks[0])
+        fits = [(total - block).solve() for block in blocks]
+
+    with phase('predict'):
+        predictions = np.empty(n_rows, dtype=np.float64)
+        for start in range(0, n_rows, chunk_rows):
+            Xc = _block(X, start, start + chunk_rows, shift)
+            fc = fold_of[start:start + chunk_rows]
+            for k in np.unique(fc):
+                rows = np.flatnonzero(fc == k)
+                w, x_mean, y_mean, _ = fits[k]
+                predictions[start + rows] = Xc[rows] @ w + (y_mean - x_mean @ w)
+        scores = [float(r2_score(np.asarray(y)[test_index], predictions[test_index])) for _, test_index in folds]
+
+    with phase('refit'):
+        final_model = _final_model(X, total, shift, preprocessing)
+    return predictions, scores, final_model
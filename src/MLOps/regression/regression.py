@@ -1,4 +1,5 @@
 from src.MLOps.utils.ml_utils import generic_ml
+from src.MLOps.regression.ols import ols_ml
 
 from sklearn.linear_model import LinearRegression
 from sklearn.neural_network import MLPRegressor
@@ -7,9 +8,10 @@ from typing import Any
 
 
 def linreg(X: np.ndarray, y: np.ndarray, *args, **kwargs
-                       ) -> tuple[np.ndarray, float, np.ndarray[Any, Any]]:
+                       ) -> tuple[np.ndarray, float, np.ndarray[Any, Any], Any]:
     """
     Perform linear regression with k-fold cross-validation.
+    Every fold fit and the final fit are solved from shared sufficient statistics (see ols_ml).
 
     Args:
         X (np.ndarray): Feature matrix.
@@ -17,20 +19,21 @@ def linreg(X: np.ndarray, y: np.ndarray, *args, **kwargs
         **kwargs: Additional keyword arguments for k-fold cross-validation.
 
     Returns:
-        tuple[np.ndarray, float, np.ndarray[Any, Any]]: 
+        tuple[np.ndarray, float, np.ndarray[Any, Any], Any]: 
             - Predictions from the cross-validation.
             - Intercept of the final model.
             - Coefficients of the final model.
+            - The final model, fitted on the full data.
     """
     
-    predictions, scores, final_model = generic_ml(LinearRegression(), X, y, **kwargs)
+    predictions, scores, final_model = ols_ml(X, y, **kwargs)
 
     model_weights: np.ndarray[Any, Any] = final_model.coef_
     
-    return np.array(predictions), float(final_model.intercept_), model_weights
+    return np.array(predictions), float(final_model.intercept_), model_weights, final_model
 
 def mlpreg(X: np.ndarray, y: np.ndarray, *args, **kwargs
-                       ) -> tuple[np.ndarray, float, np.ndarray]:
+                       ) -> tuple[np.ndarray, float, np.ndarray, Any]:
     """
     Perform linear regression with k-fold cross-validation.
 
@@ -40,13 +43,14 @@ def mlpreg(X: np.ndarray, y: np.ndarray, *args, **kwargs
         **kwargs: Additional keyword arguments for k-fold cross-validation.
 
     Returns:
-        tuple[np.ndarray, float, np.ndarray]: 
+        tuple[np.ndarray, float, np.ndarray, Any]: 
             - Predictions from the cross-validation.
             - Intercept of the final model.
             - Coefficients of the final model.
+            - The final model, fitted on the full data.
     """
     predictions, scores, final_model = generic_ml(MLPRegressor(), X, y, *args, **kwargs)
 
     model_weights: np.ndarray = final_model.coefs_
     
-    return np.array(predictions), final_model.intercepts_, model_weights
+    return np.array(predictions), final_model.intercepts_, model_weights, final_model
@@ -0,0 +1,105 @@
+"""Concurrent tuning of several estimators. Each estimator gets its own share of the worker pool, sized by how
+expensive it is to fit, and results are yielded as soon as an estimator is done."""
+
+from src.MLOps.utils.base import BaseEstimator
+from src.MLOps.search import SearchResult
+
+from joblib import Parallel, delayed, parallel_config, cpu_count
+from typing import Callable, Iterator
+import warnings
+
+# Relative cost of tuning an estimator, by class name. Estimators not listed cost 1.
+TUNING_COSTS: dict[str, int] = {
+    'MLPClassifier': 4,
+    'MLPRegressor': 4,
+    'RandomForestClassifier': 4,
+    'RandomForestRegressor': 4,
+    'GradientBoostingClassifier': 4,
+    'GradientBoostingRegressor': 4,
+    'LogisticRegression': 2,
+}
+
+
+def _pool_size(n_jobs: int) -> int:
+    """Number of workers in a pool of `n_jobs` (-1 uses every core)."""
+    return cpu_count() if n_jobs < 0 else max(1, n_jobs)
+
+
+def allocate_workers(models: tuple[BaseEstimator, ...], n_jobs: int = -1) -> list[int]:
+    """
+    Split a pool of workers between estimators in proportion to their tuning cost.
+
+    Every estimator gets one worker; the rest of the pool is shared by cost with largest-remainder rounding, so
+    the allocations add up to the pool size. With more estimators than workers each gets a single worker, and
+    schedule_tuning runs at most pool-size searches at a time.
+
+    Args:
+        models (tuple[BaseEstimator, ...]): Estimators to tune.
+        n_jobs (int): Size of the pool. -1 uses every core.
+
+    Returns:
+        list[int]: Number of workers per estimator, at least 1 each.
+    """
+    spare = _pool_size(n_jobs) - len(models)
+    if spare <= 0:
+        return [1] * len(models)
+    costs = [TUNING_COSTS.get(model.__class__.__name__, 1) for model in models]
+    quotas = [spare * cost / sum(costs) for cost in costs]
+    allocation = [1 + int(quota) for quota in quotas]
+    by_remainder = sorted(range(len(models)), key=lambda i: quotas[i] - int(quotas[i]), reverse=True)
+    for i in by_remainder[:spare - sum(int(quota) for quota in quotas)]:
+        allocation[i] += 1
+    return allocation
+
+
+def _tune_in_worker(tune: Callable[..., SearchResult], index: int, n_jobs: int,
+                    *args, **kwargs) -> tuple[int, SearchResult | str]:
+    """
+    Run one estimator's search inside a scheduler worker.
+
+    Warnings are silenced for this worker only (MLPs raise a ConvergenceWarning per fit), and the search's own
+    fits run in separate processes rather than the threads joblib would default to inside a worker.
+
+    Args:
+        tune (Callable[..., SearchResult]): Search function, called with `*args`, `n_jobs` and `**kwargs`.
+        index (int): Position of the estimator in the scheduled batch.
+        n_jobs (int): Workers allotted to this estimator's search.
+
+    Returns:
+        tuple[int, SearchResult | str]: The index and the search result, or the error if the search failed.
+    """
+    with warnings.catch_warnings(), parallel_config(backend='loky'):
+        warnings.simplefilter('ignore')
+        try:
+            return index, tune(*args, n_jobs=n_jobs, **kwargs)
+        except (ValueError, TypeError, RuntimeError) as e:
+            # Returned rather than raised, so one failing estimator doesn't cancel the others' searches.
+            return index, f"{e.__class__.__name__}: {e}"
+
+
+def schedule_tuning(tune: Callable[..., SearchResult], models: tuple[BaseEstimator, ...],
+                    arguments: list[tuple], n_jobs: int = -1, **kwargs) -> Iterator[tuple[BaseEstimator, SearchResult | str]]:
+    """
+    Tune several estimators concurrently and yield each one as soon as its search finishes.
+
+    Every estimator's search runs in its own worker process with a share of `n_jobs` given by allocate_workers,
+    so a slow estimator no longer holds up the others. At most `n_jobs` searches run at once. X and y should be memory-mapped (see SharedData) so the
+    workers share them instead of receiving copies.
+
+    Args:
+        tune (Callable[..., SearchResult]): Search function, called as tune(model, *arguments[i], n_jobs=..., **kwargs).
+        models (tuple[BaseEstimator, ...]): Estimators to tune.
+        arguments (list[tuple]): Positional arguments following the estimator, one tuple per estimator.
+        n_jobs (int): Total number of workers shared by all searches. -1 uses every core.
+        **kwargs: Keyword arguments passed to every search.
+
+    Returns:
+        Iterator[tuple[BaseEstimator, SearchResult | str]]: The estimator and its search result (the error message
+            if it failed), in order of completion.
+    """
+    allocation = allocate_workers(models, n_jobs=n_jobs)
+    tasks = [delayed(_tune_in_worker)(tune, i, workers, model, *args, **kwargs)
+             for i, (model, args, workers) in enumerate(zip(models, arguments, allocation))]
+    results = Parallel(n_jobs=min(len(tasks), _pool_size(n_jobs)), backend='loky', return_as='generator_unordered')(tasks)
+    for index, result in results:
+        yield models[index], result
@@ -0,0 +1,388 @@
+"""Budget-aware hyperparameter search strategies used by the tuning module."""
+
+from src.MLOps.utils.base import BaseEstimator
+from src.MLOps.utils.ml_utils import standard_pipeline, assemble_out_of_fold
+from src.MLOps.utils.preprocessing import PreprocessingCache
+from src.profiling import phase
+
+from sklearn.model_selection import ParameterGrid
+from sklearn.base import clone, is_classifier
+from sklearn.metrics import accuracy_score, r2_score
+from sklearn.exceptions import ConvergenceWarning
+from joblib import Parallel, delayed
+from dataclasses import dataclass, field
+from typing import Any
+import numpy as np
+import warnings
+import math
+import time
+
+# Parameter along which a fit with warm_start=True continues the fit of the previous, smaller value instead of
+# starting over, by class name. Ensembles grow more estimators (the same ones a cold fit would), MLPs run more
+# epochs (with a fresh optimizer, so close to but not the same as a cold fit) and logistic regression starts its
+# solver from the coefficients of the previous, more strongly regularised, C.
+WARM_START_PATHS: dict[str, str] = {
+    'RandomForestClassifier': 'n_estimators',
+    'RandomForestRegressor': 'n_estimators',
+    'GradientBoostingClassifier': 'n_estimators',
+    'GradientBoostingRegressor': 'n_estimators',
+    'MLPClassifier': 'max_iter',
+    'MLPRegressor': 'max_iter',
+    'LogisticRegression': 'C',
+}
+
+
+@dataclass
+class Rung:
+    """One round of successive halving."""
+    resource: int
+    n_candidates: int
+    n_pruned: int
+
+
+@dataclass
+class SearchResult:
+    """Outcome of a hyperparameter search for one estimator."""
+    params: dict[str, float | int | str]
+    strategy: str = 'grid'
+    resource: str | None = None
+    rungs: list[Rung] = field(default_factory=list)
+    n_fits: int = 0
+    n_warm_fits: int = 0
+    stopped_early: bool = False
+    predictions: np.ndarray | None = None
+    best_estimator: Any = None
+
+    def describe(self, name: str) -> str:
+        """
+        Human readable summary of the search, listing the configurations pruned per rung.
+
+        Args:
+            name (str): Name of the tuned estimator.
+
+        Returns:
+            str: The summary.
+        """
+        if not self.rungs:
+            warm = f", {self.n_warm_fits} warm-started" if self.n_warm_fits else ''
+            return f"Note: {name} tuned with {self.strategy} search ({self.n_fits} fits{warm})."
+        rungs = ', '.join(f"{rung.n_candidates} @ {self.resource}={rung.resource} -> pruned {rung.n_pruned}" for rung in self.rungs)
+        stopped = ' Stopped early: time budget exhausted.' if self.stopped_early else ''
+        return f"Note: {name} tuned with {self.strategy} search ({self.n_fits} fits). Rungs: {rungs}.{stopped}"
+
+
+def _fit_and_score(estimator: BaseEstimator, params: dict, X: np.ndarray, y: np.ndarray,
+                   train_index: np.ndarray, test_index: np.ndarray, predict: bool = False,
+                   preprocessing: PreprocessingCache | None = None) -> tuple[float, np.ndarray | None]:
+    """
+    Fit a clone of `estimator` with `params` on a (possibly subsampled) training split and score it on the held-out split.
+
+    Args:
+        estimator (BaseEstimator): Unfitted template estimator. Never mutated.
+        params (dict): Parameters to set on the clone.
+        X (np.ndarray): Full feature matrix.
+        y (np.ndarray): Full target vector.
+        train_index (np.ndarray): Row indices to train on.
+        test_index (np.ndarray): Row indices to score on.
+        predict (bool): Whether to also return the predictions for the held-out split.
+        preprocessing (PreprocessingCache | None): Cache of the split's standardisation, shared by every candidate.
+
+    Returns:
+        tuple[float, np.ndarray | None]: The estimator's default score on the held-out split, or NaN if the
+            configuration is invalid, and the held-out predictions if `predict` is set.
+    """
+    if preprocessing is None:
+        X_train, X_test = standard_pipeline(X[train_index], X[test_index])
+    else:
+        X_train, X_test = preprocessing.fold(X, train_index, test_index)
+    try:
+        model = clone(estimator).set_params(**params)
+        # Fits run in worker processes that do not inherit the caller's warning filters.
+        with warnings.catch_warnings(), phase('fold fit'):
+            warnings.simplefilter('ignore', ConvergenceWarning)
+            model.fit(X_train, y[train_index])
+    except (ValueError, TypeError):
+        # Same as GridSearchCV's error_score=np.nan: invalid combinations rank last instead of aborting the search.
+        return np.nan, None
+    if not predict:
+        with phase('predict'):
+            return float(model.score(X_test, y[test_index])), None
+    # score() would predict the held-out split a second time.
+    with phase('predict'):
+        predictions = model.predict(X_test)
+    metric = accuracy_score if is_classifier(model) else r2_score
+    return float(metric(y[test_index], predictions)), predictions
+
+
+def _fit_and_score_path(estimator: BaseEstimator, params: dict, path: str, values: list, X: np.ndarray, y: np.ndarray,
+                        train_index: np.ndarray, test_index: np.ndarray,
+                        preprocessing: PreprocessingCache | None = None) -> list[tuple[float, np.ndarray | None]]:
+    """
+    _fit_and_score with predict=True for every value of `path` in `values`, fitting one warm-started clone that
+    each value continues from the previous one, so the split costs about as much as its largest value alone.
+
+    Args:
+        estimator (BaseEstimator): Unfitted template estimator. Never mutated.
+        params (dict): Parameters other than `path` to set on the clone.
+        path (str): The parameter along the path (see WARM_START_PATHS).
+        values (list): Values of `path`, in ascending order.
+        X (np.ndarray): Full feature matrix.
+        y (np.ndarray): Full target vector.
+        train_index (np.ndarray): Row indices to train on.
+        test_index (np.ndarray): Row indices to score on.
+        preprocessing (PreprocessingCache | None): Cache of the split's standardisation, shared by every candidate.
+
+    Returns:
+        list[tuple[float, np.ndarray | None]]: Score and held-out predictions per value. A value whose fit fails,
+            and every value after it, gets NaN and None.
+    """
+    if preprocessing is None:
+        X_train, X_test = standard_pipeline(X[train_index], X[test_index])
+    else:
+        X_train, X_test = preprocessing.fold(X, train_index, test_index)
+    metric = accuracy_score if is_classifier(estimator) else r2_score
+    results: list[tuple[float, np.ndarray | None]] = []
+    done, converged = 0, False
+    try:
+        # Overrides the candidate's own warm_start, which has no effect on a single fit.
+        model = clone(estimator).set_params(**{**params, 'warm_start': True})
+        for value in values:
+            if converged:
+                # A cold fit with a larger max_iter would stop at the same epoch.
+                results.append(results[-1])
+                continue
+            # max_iter counts the epochs of one fit call, so a warm fit only runs the difference.
+            step = value - done if path == 'max_iter' else value
+            with warnings.catch_warnings(), phase('fold fit'):
+                warnings.simplefilter('ignore', ConvergenceWarning)
+                model.set_params(**{path: step}).fit(X_train, y[train_index])
+            if path == 'max_iter':
+                converged, done = int(np.max(model.n_iter_)) < step, value
+            with phase('predict'):
+                predictions = model.predict(X_test)
+            results.append((float(metric(y[test_index], predictions)), predictions))
+    except (ValueError, TypeError):
+        results.extend([(np.nan, None)] * (len(values) - len(results)))
+    return results
+
+
+def _warm_start_groups(model: BaseEstimator, candidates: list[dict]) -> list[tuple[list[int], str | None]]:
+    """
+    Candidates that differ only in the model's warm start path parameter, as (candidate indices in ascending
+    order of the parameter, parameter). Every other candidate forms a group of its own with parameter None.
+    """
+    path = WARM_START_PATHS.get(model.__class__.__name__)
+    if path is None or 'warm_start' not in model.get_params():
+        return [([i], None) for i in range(len(candidates))]
+    groups: dict[str, list[int]] = {}
+    for i, params in enumerate(candidates):
+        rest = {name: value for name, value in params.items() if name != path}
+        groups.setdefault(repr(sorted(rest.items())), []).append(i)
+    result = []
+    for indices in groups.values():
+        values = [candidates[i].get(path) for i in indices]
+        if len(indices) < 2 or None in values or len(set(values)) < len(values):
+            result.extend(([i], None) for i in indices)
+        else:
+            result.append((sorted(indices, key=lambda i: candidates[i][path]), path))
+    return result
+
+
+def _refit(estimator: BaseEstimator, params: dict, X: np.ndarray, y: np.ndarray,
+           preprocessing: PreprocessingCache | None = None) -> Any:
+    """
+    Fit a clone of `estimator` with `params` on the full, standardized data.
+
+    Args:
+        estimator (BaseEstimator): Unfitted template estimator. Never mutated.
+        params (dict): Parameters to set on the clone.
+        X (np.ndarray): Full feature matrix.
+        y (np.ndarray): Full target vector.
+        preprocessing (PreprocessingCache | None): Cache of the full data's standardisation, if any.
+
+    Returns:
+        Any: The fitted estimator.
+    """
+    X_scaled = standard_pipeline(X, X)[0] if preprocessing is None else preprocessing.scaled(X)
+    with warnings.catch_warnings(), phase('refit'):
+        warnings.simplefilter('ignore', ConvergenceWarning)
+        return clone(estimator).set_params(**params).fit(X_scaled, y)
+
+
+def cross_validate_candidates(model: BaseEstimator, X: np.ndarray, y: np.ndarray, candidates: list[dict],
+                              folds: list[tuple[np.ndarray, np.ndarray]], strategy: str = 'grid',
+                              n_jobs: int = -1, refit: bool = False, preprocessing: PreprocessingCache | None = None) -> SearchResult:
+    """
+    Cross-validate every candidate configuration and keep the out-of-fold predictions of the best one,
+    so the caller does not have to cross-validate the winner a second time to get them.
+
+    Candidates that differ only in the parameter of WARM_START_PATHS are fitted as one warm-started path per
+    fold (see _fit_and_score_path). Results are consumed in submission order, one group of candidates at a
+    time, so only the predictions of the current group and the best candidate are held in memory.
+
+    Args:
+        model (BaseEstimator): Estimator to tune.
+        X (np.ndarray): Feature matrix.
+        y (np.ndarray): Target vector.
+        candidates (list[dict]): Parameter configurations to evaluate.
+        folds (list[tuple[np.ndarray, np.ndarray]]): Train and test indices per fold.
+        strategy (str): Name of the search strategy, used in the report.
+        n_jobs (int): Number of workers evaluating (configuration, fold) pairs.
+        refit (bool): Whether to also fit the best configuration on the full data.
+        preprocessing (PreprocessingCache | None): Cache of the fold standardisation, so every candidate reuses it.
+
+    Returns:
+        SearchResult: Best parameters, their out-of-fold predictions and, if `refit`, the refit estimator.
+    """
+    if preprocessing is not None:
+        preprocessing.warm(X, folds, full=refit)
+    groups = _warm_start_groups(model, candidates)
+    tasks = []
+    for indices, path in groups:
+        for train_index, test_index in folds:
+            if path is None:
+                tasks.append(delayed(_fit_and_score)(model, candidates[indices[0]], X, y, train_index, test_index,
+                                                     predict=True, preprocessing=preprocessing))
+            else:
+                rest = {name: value for name, value in candidates[indices[0]].items() if name != path}
+                tasks.append(delayed(_fit_and_score_path)(model, rest, path, [candidates[i][path] for i in indices],
+                                                          X, y, train_index, test_index, preprocessing=preprocessing))
+    results = Parallel(n_jobs=n_jobs, return_as='generator')(tasks)
+
+    best_score, best_index, best_predictions = -np.inf, 0, None
+    n_warm_fits = 0
+    for indices, path in groups:
+        # Per fold, the (score, predictions) of every candidate of the group.
+        fold_results = [next(results) if path is not None else [next(results)] for _ in folds]
+        if path is not None:
+            n_warm_fits += (len(indices) - 1) * len(folds)
+        for position, index in enumerate(indices):
+            score = np.mean([fold[position][0] for fold in fold_results])
+            # Ties go to the first candidate in grid order, like GridSearchCV; NaN never wins.
+            if score > best_score or (score == best_score and index < best_index):
+                best_score, best_index = score, index
+                best_predictions = assemble_out_of_fold([test_index for _, test_index in folds],
+                                                        [fold[position][1] for fold in fold_results])
+    best_params = candidates[best_index]
+
+    result = SearchResult(params=clone(model).set_params(**best_params).get_params(), strategy=strategy,
+                          n_fits=len(candidates) * len(folds), n_warm_fits=n_warm_fits, predictions=best_predictions)
+    if refit:
+        result.best_estimator = _refit(model, best_params, X, y, preprocessing)
+    return result
+
+
+def _rung_resources(n_rungs: int, max_resource: int, min_resource: int, factor: int) -> list[int]:
+    """Resource per rung, growing geometrically by `factor` and ending at `max_resource`."""
+    return [max(min_resource, int(max_resource / factor ** (n_rungs - 1 - i))) for i in range(n_rungs)]
+
+
+def _planned_fits(n_candidates: int, n_folds: int, factor: int) -> int:
+    """Number of fits successive halving needs when starting from `n_candidates` configurations."""
+    fits = 0
+    while True:
+        fits += n_candidates * n_folds
+        if n_candidates <= factor:
+            return fits
+        n_candidates = math.ceil(n_candidates / factor)
+
+
+def successive_halving(model: BaseEstimator, X: np.ndarray, y: np.ndarray, param_grid: dict[str, list[float | int]],
+                       folds: list[tuple[np.ndarray, np.ndarray]], factor: int = 3, resource: str | None = None,
+                       max_fits: int | None = None, max_time: float | None = None, n_jobs: int = -1,
+                       random_state: int = 42, refit: bool = False, preprocessing: PreprocessingCache | None = None) -> SearchResult:
+    """
+    Successive halving over a parameter grid. Every rung evaluates the surviving configurations with
+    cross-validation on a growing budget and keeps the best 1/`factor` of them, so most configurations
+    are discarded after cheap fits on a fraction of the data (or of the iterations).
+
+    Args:
+        model (BaseEstimator): Estimator to tune.
+        X (np.ndarray): Feature matrix.
+        y (np.ndarray): Target vector.
+        param_grid (dict[str, list[float | int]]): Candidate values per parameter.
+        folds (list[tuple[np.ndarray, np.ndarray]]): Train and test indices per fold.
+        factor (int): Fraction of configurations kept per rung is 1 / factor.
+        resource (str | None): 'n_samples' or 'max_iter'. Defaults to 'max_iter' for estimators that
+            expose it in the grid and 'n_samples' otherwise.
+        max_fits (int | None): Fit-count budget. Configurations are sampled from the grid until the planned rungs fit in it.
+        max_time (float | None): Wall-clock budget in seconds. No new rung is started once it is spent.
+        n_jobs (int): Number of workers evaluating (configuration, fold) pairs.
+        random_state (int): Seed for configuration sampling and row subsampling.
+        refit (bool): Whether to also fit the best configuration on the full data.
+        preprocessing (PreprocessingCache | None): Cache of the fold standardisation, shared by every
+            candidate of a rung (and, with resource 'max_iter', by every rung).
+
+    Returns:
+        SearchResult: Best parameters and the per-rung pruning report. If the search reached the full
+            budget, also the out-of-fold predictions of the best configuration.
+    """
+    start = time.perf_counter()
+    rng = np.random.default_rng(random_state)
+    grid = dict(param_grid)
+    if resource is None:
+        resource = 'max_iter' if 'max_iter' in grid else 'n_samples'
+    if resource not in {'n_samples', 'max_iter'}:
+        raise ValueError(f"Invalid halving resource {resource}. Use n_samples or max_iter.")
+
+    n_train = min(len(train_index) for train_index, _ in folds)
+    if resource == 'max_iter':
+        max_resource = int(max(grid.pop('max_iter', [model.get_params()['max_iter']])))
+        min_resource = min(10, max_resource)
+    else:
+        max_resource = n_train
+        n_classes = len(np.unique(y)) if is_classifier(model) else 1
+        min_resource = min(n_train, max(2 * n_classes, 10))
+
+    candidates = list(ParameterGrid(grid))
+    n_candidates = len(candidates)
+    if max_fits is not None:
+        while n_candidates > 1 and _planned_fits(n_candidates, len(folds), factor) > max_fits:
+            n_candidates -= 1
+    if n_candidates < len(candidates):
+        candidates = [candidates[i] for i in rng.choice(len(candidates), size=n_candidates, replace=False)]
+
+    n_rungs = 1
+    while math.ceil(n_candidates / factor ** (n_rungs - 1)) > factor:
+        n_rungs += 1
+    resources = _rung_resources(n_rungs, max_resource, min_resource, factor)
+    # Subsample training rows in a fixed random order so small rungs do not only see sorted prefixes.
+    shuffled_folds = [(rng.permutation(train_index), test_index) for train_index, test_index in folds]
+
+    result = SearchResult(params={}, strategy='halving', resource=resource)
+    best_params = candidates[0]
+    for rung_resource in resources:
+        if max_time is not None and result.rungs and time.perf_counter() - start > max_time:
+            result.stopped_early = True
+            break
+        # The last rung runs at the full budget, so its held-out predictions are proper out-of-fold predictions.
+        full = rung_resource == max_resource
+        rung_folds = [(train_index if full or resource == 'max_iter' else train_index[:rung_resource], test_index)
+                      for train_index, test_index in shuffled_folds]
+        if preprocessing is not None:
+            preprocessing.warm(X, rung_folds, full=False)
+        tasks = []
+        for params in candidates:
+            rung_params = {**params, 'max_iter': rung_resource} if resource == 'max_iter' else params
+            for train_index, test_index in rung_folds:
+                tasks.append(delayed(_fit_and_score)(model, rung_params, X, y, train_index, test_index, predict=full, preprocessing=preprocessing))
+        fold_results = Parallel(n_jobs=n_jobs)(tasks)
+        scores = np.array([score for score, _ in fold_results]).reshape(len(candidates), len(folds)).mean(axis=1)
+        result.n_fits += len(tasks)
+
+        ranking = np.argsort(-scores, kind='stable')
+        best_params = candidates[ranking[0]]
+        if full and np.isfinite(scores[ranking[0]]):
+            best_folds = fold_results[ranking[0] * len(folds):(ranking[0] + 1) * len(folds)]
+            result.predictions = assemble_out_of_fold([test_index for _, test_index in shuffled_folds],
+                                                      [predictions for _, predictions in best_folds])
+        n_keep = 1 if rung_resource == resources[-1] else math.ceil(len(candidates) / factor)
+        result.rungs.append(Rung(resource=rung_resource, n_candidates=len(candidates), n_pruned=len(candidates) - n_keep))
+        candidates = [candidates[i] for i in ranking[:n_keep]]
+
+    if resource == 'max_iter':
+        best_params = {**best_params, 'max_iter': max_resource}
+    result.params = clone(model).set_params(**best_params).get_params()
+    if refit:
+        result.best_estimator = _refit(model, best_params, X, y, preprocessing)
+    return result
@@ -1,10 +1,16 @@
 from src.MLOps.utils.base import BaseEstimator
-from src.MLOps.utils.ml_utils import generic_ml
-from src.cliresult import chain, add_warning
+from src.MLOps.utils.ml_utils import generic_ml, _resolve_n_jobs
+from src.MLOps.utils.shared_data import SharedData
+from src.MLOps.utils.preprocessing import PreprocessingCache
+from src.MLOps.search import SearchResult, successive_halving, cross_validate_candidates
+from src.MLOps.scheduler import schedule_tuning
+from src.cliresult import chain, add_warning, add_note
 
 import numpy as np
-from sklearn.model_selection import GridSearchCV
+from sklearn.model_selection import ParameterGrid, ParameterSampler, check_cv
+from sklearn.base import is_classifier
 from tqdm import tqdm
+from typing import Iterator
 import re
 import os
 import sys
@@ -26,7 +32,8 @@ def infer_param_grid(model: BaseEstimator, n_values: int = 3) -> dict[str, list[
     :param n_values: How many values to generate per parameter.
     :return: A dictionary of parameter names mapped to lists of candidate values.
     """
-    tunable_dir = r'src\MLOps\tunables'
+    # Next to this module rather than relative to the working directory, e.g. for benchmarks run elsewhere.
+    tunable_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tunables')
     files = os.listdir(tunable_dir)
     for file in files:
         if re.match(model.__class__.__name__, file):
@@ -93,71 +100,139 @@ def infer_param_grid(model: BaseEstimator, n_values: int = 3) -> dict[str, list[
 def make_model_grids(*models: BaseEstimator) -> dict[str, dict[str, list[int | float]]]:
     return {model.__class__.__name__: infer_param_grid(model) for model in models}
 
-def tune_hyperparameters(model: BaseEstimator, X: np.ndarray, y: np.ndarray, param_grid: dict[str, list[float | int]], cv: int = 10) -> dict[str, float | int | str]:
+SEARCH_STRATEGIES = ('grid', 'random', 'halving')
+
+def tune_hyperparameters(model: BaseEstimator, X: np.ndarray, y: np.ndarray, param_grid: dict[str, list[float | int]], cv: int | list[tuple[np.ndarray, np.ndarray]] = 10,
+                         search: str = 'grid', max_fits: int | None = None, max_time: float | None = None, refit: bool = False,
+                         n_jobs: int = -1, preprocessing: PreprocessingCache | None = None) -> SearchResult:
     """
-    Tune hyperparameters for a given model using GridSearchCV.
+    Tune hyperparameters for a given model.
+
+    'grid' cross-validates every configuration in the grid, 'random' samples configurations from the grid
+    like RandomizedSearchCV and 'halving' runs successive halving (see search.successive_halving).
+    The out-of-fold predictions of the best configuration are kept on the result, so it does not have to
+    be cross-validated again to log it.
     
     :param model: A scikit-learn estimator.
     :param X: Feature matrix.
     :param y: Target vector.
     :param param_grid: A dictionary of parameter names mapped to lists of candidate values.
-    :param cv: Number of cross-validation folds.
-    :return: A fitted model with the best hyperparameters.
+    :param cv: Number of cross-validation folds, or precomputed (train, test) index pairs.
+    :param search: Search strategy, one of 'grid', 'random' or 'halving'.
+    :param max_fits: Fit-count budget for 'random' and 'halving'.
+    :param max_time: Wall-clock budget in seconds for 'halving'.
+    :param refit: Whether to also fit the best configuration on the full data.
+    :param n_jobs: Number of workers evaluating (configuration, fold) pairs. -1 uses every core.
+    :param preprocessing: Cache of the fold standardisation, shared by every configuration.
+    :return: The best hyperparameters, their out-of-fold predictions and a report of the search.
     """
-    if 'MLP' in model.__class__.__name__: n_jobs = 1 ## Because ConvergenceWarning is raised infinetely many times
-    else: n_jobs = -1
-    grid_search = GridSearchCV(model, param_grid, cv=cv, n_jobs=n_jobs, verbose=0) # type: ignore
-    grid_search.fit(X, y)
-    return grid_search.best_estimator_.get_params()
+    if search not in SEARCH_STRATEGIES:
+        raise ValueError(f"Invalid search strategy {search}. Must be one of {', '.join(SEARCH_STRATEGIES)}.")
+    folds = cv if not isinstance(cv, int) else list(check_cv(cv, y, classifier=is_classifier(model)).split(X, y))
+
+    if search == 'halving':
+        return successive_halving(model, X, y, param_grid, folds, max_fits=max_fits, max_time=max_time, n_jobs=n_jobs, refit=refit,
+                                  preprocessing=preprocessing)
+
+    if search == 'random':
+        n_iter = max(1, max_fits // len(folds)) if max_fits is not None else 10
+        candidates = list(ParameterSampler(param_grid, n_iter=n_iter, random_state=42))
+    else:
+        candidates = list(ParameterGrid(param_grid))
+    return cross_validate_candidates(model, X, y, candidates, folds, strategy=search, n_jobs=n_jobs, refit=refit,
+                                     preprocessing=preprocessing)
 
-def tune_models(*models: BaseEstimator, X: np.ndarray, y: np.ndarray, cv: int = 10, n_values: int = 3) -> list[tuple[BaseEstimator, dict[str, float | int | str]]]:
+def tune_models(*models: BaseEstimator, X: np.ndarray, y: np.ndarray, cv: int = 10, n_values: int = 3,
+                search: str = 'grid', max_fits: int | None = None, max_time: float | None = None,
+                refit: bool = False, n_jobs: int = -1,
+                preprocessing: PreprocessingCache | None = None) -> Iterator[tuple[BaseEstimator, SearchResult | str]]:
     """
-    Tune hyperparameters for a list of models using GridSearchCV.
+    Tune hyperparameters for a list of models concurrently, yielding each model as soon as its search is done.
+    The pool of `n_jobs` workers is split between the models by their tuning cost (see scheduler.allocate_workers).
+    X, y and the fold indices are memory-mapped once and shared by every search, so the
+    search workers never receive their own pickled copy of the data.
     
     :param models: A list of scikit-learn estimators.
     :param X: Feature matrix.
     :param y: Target vector.
     :param cv: Number of cross-validation folds.
-    :return: A dictionary of model names mapped to fitted models with the best hyperparameters.
+    :param search: Search strategy, one of 'grid', 'random' or 'halving'.
+    :param max_fits: Fit-count budget per model for 'random' and 'halving'.
+    :param max_time: Wall-clock budget in seconds per model for 'halving'.
+    :param refit: Whether to also fit each model's best configuration on the full data.
+    :param n_jobs: Total number of workers shared by all searches. -1 uses every core.
+    :param preprocessing: The project's cache of fold standardisation. The statistics of every fold are computed
+        once, here, and handed to all searches.
+    :return: Models paired with the result of their search (the error message if it failed), in order of completion.
     """
+    if search not in SEARCH_STRATEGIES:
+        raise ValueError(f"Invalid search strategy {search}. Must be one of {', '.join(SEARCH_STRATEGIES)}.")
     
-    params: list[dict[str, float | int | str]] = []
-    for model in tqdm(models, desc="Tuning models"):
-        param_grid = infer_param_grid(model, n_values=n_values)
-        params.append(tune_hyperparameters(model, X, y, param_grid, cv))
-    
-    return list(zip(models, params))
+    with SharedData(X, y) as shared:
+        folds: dict[bool, list[tuple[np.ndarray, np.ndarray]]] = {}
+        arguments = []
+        for model in models:
+            classifier = is_classifier(model)
+            if classifier not in folds:
+                # Same splitter GridSearchCV builds from an integer cv: stratified for classifiers.
+                splitter = check_cv(cv, shared.y, classifier=classifier)
+                folds[classifier] = shared.share_folds(splitter.split(shared.X, shared.y))
+                if preprocessing is not None:
+                    preprocessing.warm(shared.X, folds[classifier], full=refit)
+            arguments.append((shared.X, shared.y, infer_param_grid(model, n_values=n_values), folds[classifier]))
+        yield from tqdm(schedule_tuning(tune_hyperparameters, models, arguments, n_jobs=n_jobs, search=search,
+                                        max_fits=max_fits, max_time=max_time, refit=refit, preprocessing=preprocessing),
+                        total=len(models), desc="Tuning models")
 
 @chain
-def log_predictions_from_best(*models: BaseEstimator, project: "ShellProject",  cv: int = 10, n_values: int = 3) -> None: # type: ignore to avoid circular import #TODO fix it
+def log_predictions_from_best(*models: BaseEstimator, project: "ShellProject",  cv: int = 10, n_values: int = 3, # type: ignore to avoid circular import #TODO fix it
+                              search: str = 'grid', max_fits: int | None = None, max_time: float | None = None,
+                              n_jobs: int | bool | None = -1) -> None:
     """
-    Get predictions from the best hyperparameters for a list of models using GridSearchCV.
+    Get predictions from the best hyperparameters for a list of models.
+    The out-of-fold predictions are the ones the search computed for the winning configuration, so
+    models are only cross-validated again when a time-limited halving search stopped early. The winning
+    configuration is refitted once on the full data and kept as the final model, for predict and serving.
+    Models are tuned concurrently and each one is logged to the project as soon as its search finishes.
     
     :param models: A list of scikit-learn estimators.
     :param X: Feature matrix.
     :param y: Target vector.
     :param cv: Number of cross-validation folds.
+    :param search: Search strategy, one of 'grid', 'random' or 'halving'.
+    :param max_fits: Fit-count budget per model for 'random' and 'halving'.
+    :param max_time: Wall-clock budget in seconds per model for 'halving'.
+    :param n_jobs: Total number of workers shared by all searches. -1 or a bare flag uses every core.
     :return: A dictionary of model names mapped to fitted models with the best hyperparameters.
     """
-    type_ = project.project_type
+    data: list[tuple[BaseEstimator, SearchResult]] = []
+    failed: list[str] = []
+    # tune_models memory-maps X and y for the searches; the fallback below runs in this process.
     X, y = project.X, project.y
-
-    data = tune_models(*models, X = X, y = y, cv = cv, n_values = n_values)
-    if type_ == 'classification':
-        for model, params in tqdm(data, desc=f"Getting predictions from model"):
+    for model, result in tune_models(*models, X = X, y = y, cv = cv, n_values = n_values, search = search,
+                                     max_fits = max_fits, max_time = max_time, n_jobs = _resolve_n_jobs(n_jobs),
+                                     refit = True, preprocessing = project.preprocessing):
+        if isinstance(result, str):
+            failed.append(f"Model {model.__class__.__name__} failed ({result}). Skipping...")
+            continue
+        preds, final_model = result.predictions, result.best_estimator
+        if preds is None:
+            # No configuration was cross-validated at the full budget (halving stopped early or every fit failed).
+            # Unshuffled, like the search's folds, and with as many folds, so the scores stay comparable.
             try:
-                preds = generic_ml(model, X, y, **params)[0]
-                project.log_model(model.__class__.__name__, preds, params)
-            except RuntimeError as e:
-                add_warning(project, f"Model {model.__class__.__name__} failed. Skipping...")
+                preds, _, final_model = generic_ml(model, X, y, n_splits=cv, shuffle=False, preprocessing=project.preprocessing, **result.params)
+            except (RuntimeError, ValueError, TypeError) as e:
+                # The estimator cannot fit this data, e.g. GaussianNB on a sparse X.
+                failed.append(f"Model {model.__class__.__name__} failed ({e.__class__.__name__}: {e}). Skipping...")
+                continue
+        project.log_model(model.__class__.__name__, preds, result.params, final_model=final_model)
+        data.append((model, result))
 
-    elif type_ == 'regression':
-        for model, params in tqdm(data, desc=f"Getting predictions from model"):
-            try:
-                preds = generic_ml(model, X, y, **params)[0]
-                project.log_model(model.__class__.__name__, preds, params)
-            except RuntimeError as e:
-                add_warning(project, f"Model {model.__class__.__name__} failed. Skipping...")
+    # Added last: log_model collects pending notes and warnings on the project into its own (discarded) result.
+    for message in failed:
+        add_warning(project, message)
+    for model, result in data:
+        add_note(project, result.describe(model.__class__.__name__))
 
 def _main() -> None:
     from sklearn.linear_model import LinearRegression
@@ -193,8 +268,8 @@ def _main() -> None:
         , X = X, y = y, cv = 5, n_values=2
     )
     
-    for model, params in blobs:
-        print(f"{model.__class__.__name__}:\n{params}\n")
+    for model, result in blobs:
+        print(f"{model.__class__.__name__}:\n{result.params}\n")
 
 if __name__ == "__main__":
     _main()
\ No newline at end of file
@@ -1,13 +1,32 @@
 from src.MLOps.utils.base import BaseEstimator
+from src.MLOps.utils.shared_data import SharedData
+from src.MLOps.utils.preprocessing import Standardizer, PreprocessingCache
+from src.MLOps.utils.result_cache import ResultCache
+from src.profiling import phase
 
 from sklearn.model_selection import KFold
+from sklearn.base import clone, is_classifier
+from sklearn.metrics import accuracy_score, r2_score, log_loss, mean_squared_error
 import numpy as np
-from pandas import DataFrame, get_dummies, concat
-from pandas.api.types import is_string_dtype
-import numpy as np
-from typing import Any
+from scipy import sparse
+from pandas import DataFrame, Categorical, get_dummies
+from pandas.api.types import is_string_dtype, infer_dtype
+from joblib import Parallel, delayed
+from contextlib import ExitStack
+from typing import Any, Callable, Iterator
 from tqdm import tqdm
 
+# Iteration parameter that generic_ml's early_stop picks per fold, by class name.
+EARLY_STOPPING_PARAMS: dict[str, str] = {
+    'GradientBoostingClassifier': 'n_estimators',
+    'GradientBoostingRegressor': 'n_estimators',
+    'MLPClassifier': 'max_iter',
+    'MLPRegressor': 'max_iter',
+}
+EARLY_STOPPING_MODES = ('holdout', 'inner')
+# Share of a fold's training rows held out to pick the best iteration with early_stop='inner'.
+INNER_VALIDATION_FRACTION = 0.1
+
 def k_fold_cross(X: np.ndarray, y: np.ndarray, shuffle: bool, n_splits: int, random_state: int | None) -> list[tuple[np.ndarray, np.ndarray]]:
     """
     Perform K-Fold cross-validation.
@@ -26,7 +45,9 @@ def k_fold_cross(X: np.ndarray, y: np.ndarray, shuffle: bool, n_splits: int, ran
     return list(kf.split(X, y))
 
 def standard_pipeline(X_train: np.ndarray, X_test: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
-    """Standardize the data using the mean and standard deviation of the training set.
+    """Standardize the data using the mean and standard deviation of the training set (see Standardizer).
+    Sparse matrices are only scaled, not centered, since centering would make them dense. Columns that are
+    constant in the training set (e.g. a category absent from it) are left unscaled.
 
     Args:
         X_train (np.ndarray): Training data.
@@ -35,41 +56,323 @@ def standard_pipeline(X_train: np.ndarray, X_test: np.ndarray) -> tuple[np.ndarr
     Returns:
         tuple[np.ndarray, np.ndarray]: Standardized training and testing data.
     """
-    mu, sig = X_train.mean(axis=0), X_train.std(axis=0)
-    X_train = (X_train - mu) / sig
-    X_test =   (X_test - mu) / sig
-    return X_train, X_test
+    scaler = Standardizer.fit(X_train)
+    return scaler.transform(X_train), scaler.transform(X_test)
+
+def string_columns(df: DataFrame, ignore_columns: list[str]) -> list[str]:
+    """
+    Columns of `df` that hold only strings (and missing values). The values are checked by pandas' dtype
+    inference, which scans in C, and only for columns whose dtype can hold strings at all.
+    """
+    return [col for col in df.columns
+            if col not in ignore_columns and is_string_dtype(df[col]) and infer_dtype(df[col], skipna=True) in ('string', 'empty')]
+
+def fit_vocabulary(df: DataFrame, ignore_columns: list[str]) -> dict[str, list[str]]:
+    """
+    Detects the string columns of `df` and records their categories, so the same one-hot encoding can be
+    applied to new data without detecting the columns again.
+
+    Args:
+        df (DataFrame): Frame to fit on.
+        ignore_columns (list[str]): Columns never to encode, e.g. the target.
+
+    Returns:
+        dict[str, list[str]]: Sorted categories per string column.
+    """
+    return {col: sorted(df[col].dropna().unique().tolist()) for col in string_columns(df, ignore_columns)}
 
-def onehot_encode_string_columns(df: DataFrame, ignore_columns: list[str]) -> DataFrame:
+def onehot_encode_string_columns(df: DataFrame, ignore_columns: list[str], vocabulary: dict[str, list[str]] | None = None) -> DataFrame:
     """
     Detects columns containing strings in `df` and one-hot encodes them.
     Returns a new DataFrame with the transformations applied.
+    All columns are encoded by a single get_dummies call. With a `vocabulary` (see fit_vocabulary), exactly
+    its columns and categories are encoded: categories missing from `df` get all-zero columns and values
+    missing from the vocabulary get no column.
+    """
+    if vocabulary is None:
+        vocabulary = fit_vocabulary(df, ignore_columns)
+    if not vocabulary:
+        return df.copy()
+    # Unseen values are masked first: pandas is deprecating values outside a Categorical's categories.
+    categorical = {col: Categorical(df[col].where(df[col].isin(categories)), categories=categories)
+                   for col, categories in vocabulary.items()}
+    return get_dummies(df.assign(**categorical), columns=list(vocabulary))
+
+# Largest relative error a feature may pick up from being stored as float32.
+FLOAT32_RTOL = 1e-6
+
+def fits_float32(values: np.ndarray) -> bool:
+    """
+    Whether `values` can be stored as float32 without losing precision that matters: booleans, integers up to
+    2**24 (exact in float32) and floats that stay within FLOAT32_RTOL of themselves after the round trip.
+
+    Args:
+        values (np.ndarray): Column values.
+
+    Returns:
+        bool: True if the column can be stored as float32.
+    """
+    if values.dtype.kind == 'b' or values.size == 0:
+        return True
+    if values.dtype.kind in 'iu':
+        return -2 ** 24 <= values.min() and values.max() <= 2 ** 24
+    if values.dtype.kind == 'f':
+        if values.dtype.itemsize <= 4:
+            return True
+        with np.errstate(over='ignore'):
+            return bool(np.allclose(values.astype(np.float32), values, rtol=FLOAT32_RTOL, atol=0, equal_nan=True))
+    return False
+
+def frame_to_matrix(df: DataFrame, columns: list[str], dtype: Any = None) -> np.ndarray:
+    """
+    Builds a feature matrix from `columns` of `df`, copying one column at a time straight into the result
+    instead of going through an intermediate DataFrame and a second astype copy.
+
+    Args:
+        df (DataFrame): Source frame.
+        columns (list[str]): Columns to use, in order.
+        dtype (Any): dtype of the matrix. By default float32 if every column fits it (see fits_float32), otherwise float64.
+
+    Returns:
+        np.ndarray: The (n_rows, len(columns)) feature matrix.
+    """
+    if dtype is None:
+        dtype = np.float32 if all(fits_float32(df[col].to_numpy()) for col in columns) else np.float64
+    X = np.empty((len(df), len(columns)), dtype=dtype)
+    for i, col in enumerate(columns):
+        X[:, i] = df[col].to_numpy()
+    return X
+
+def sparse_onehot_matrix(df: DataFrame, features: list[str], dtype: Any = np.float64,
+                         vocabulary: dict[str, list[str]] | None = None) -> tuple[sparse.csr_matrix, list[str]]:
+    """
+    Builds a sparse CSR feature matrix from `features` of `df`. String columns are one-hot encoded straight
+    from their category codes, without a dense get_dummies frame; other columns are copied as they are.
+    Dummy columns are named and ordered like get_dummies makes them: `column_category`, categories sorted.
+
+    Args:
+        df (DataFrame): Source frame.
+        features (list[str]): Columns to use, in order.
+        dtype (Any): dtype of the matrix.
+        vocabulary (dict[str, list[str]] | None): Categories per string column (see fit_vocabulary). Fitted on `df` if not given.
+
+    Returns:
+        tuple[sparse.csr_matrix, list[str]]: The feature matrix and its column names.
+    """
+    if vocabulary is None:
+        vocabulary = fit_vocabulary(df, ignore_columns=[col for col in df.columns if col not in features])
+    # Same column order as the dense path: the other columns first, then the dummies of every string column.
+    names = [col for col in features if col not in vocabulary]
+    blocks: list[sparse.spmatrix] = [sparse.csr_matrix(frame_to_matrix(df, names, dtype=dtype))]
+    rows = np.arange(len(df))
+    for col, categories in vocabulary.items():
+        codes = Categorical(df[col], categories=categories).codes
+        present = codes >= 0
+        blocks.append(sparse.csr_matrix((np.ones(present.sum(), dtype=dtype), (rows[present], codes[present])),
+                                        shape=(len(df), len(categories))))
+        names.extend(f"{col}_{category}" for category in categories)
+    return sparse.hstack(blocks, format='csr', dtype=dtype), names
+
+def format_bytes(n_bytes: int) -> str:
+    """Human readable size, e.g. 1.5 MB."""
+    size = float(n_bytes)
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def assemble_out_of_fold(test_indices: list[np.ndarray], fold_predictions: list[np.ndarray]) -> np.ndarray:
+    """
+    Place the held-out predictions of every fold back in the original row order.
+
+    Args:
+        test_indices (list[np.ndarray]): Held-out row indices per fold.
+        fold_predictions (list[np.ndarray]): Predictions for those rows per fold.
+
+    Returns:
+        np.ndarray: Out-of-fold predictions, one per row.
+    """
+    stacked = np.concatenate(fold_predictions)
+    predictions = np.empty_like(stacked)
+    predictions[np.concatenate(test_indices)] = stacked
+    return predictions
+
+def _resolve_n_jobs(n_jobs: int | bool | None) -> int:
+    """
+    Translate the `n_jobs` value parsed from the command line into a joblib worker count.
+    A bare `-n_jobs` flag is parsed as True and means "use every core".
+
+    Args:
+        n_jobs (int | bool | None): Value parsed from kwargs.
+
+    Returns:
+        int: Number of workers to hand to joblib (-1 for all cores).
+    """
+    if n_jobs is True:
+        return -1
+    if n_jobs is None or n_jobs is False:
+        return 1
+    return int(n_jobs)
+
+def _fit_fold(estimator: BaseEstimator, X: np.ndarray, y: np.ndarray, train_index: np.ndarray, test_index: np.ndarray,
+              preprocessing: PreprocessingCache | None = None) -> tuple[np.ndarray, np.ndarray, float]:
+    """
+    Fit a fresh clone of `estimator` on one training split and predict the held-out split.
+
+    Args:
+        estimator (BaseEstimator): Unfitted template estimator. Never mutated.
+        X (np.ndarray): Full feature matrix.
+        y (np.ndarray): Full target vector.
+        train_index (np.ndarray): Row indices of the training split.
+        test_index (np.ndarray): Row indices of the held-out split.
+        preprocessing (PreprocessingCache | None): Cache of the fold's standardisation, if any.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, float]: Held-out row indices, their predictions and the fold score.
+    """
+    if preprocessing is None:
+        X_train, X_test = standard_pipeline(X[train_index], X[test_index])
+    else:
+        X_train, X_test = preprocessing.fold(X, train_index, test_index)
+    model = clone(estimator)
+    with phase('fold fit'):
+        model.fit(X_train, y[train_index])
+    with phase('predict'):
+        return test_index, model.predict(X_test), float(model.score(X_test, y[test_index]))
+
+def _fit_final(estimator: BaseEstimator, X: np.ndarray, y: np.ndarray, preprocessing: PreprocessingCache | None = None) -> Any:
+    """
+    Fit a fresh clone of `estimator` on the full, standardized data.
+
+    Args:
+        estimator (BaseEstimator): Unfitted template estimator. Never mutated.
+        X (np.ndarray): Full feature matrix.
+        y (np.ndarray): Full target vector.
+        preprocessing (PreprocessingCache | None): Cache of the full data's standardisation, if any.
+
+    Returns:
+        Any: The fitted estimator.
+    """
+    X_scaled = standard_pipeline(X, X)[0] if preprocessing is None else preprocessing.scaled(X)
+    model = clone(estimator)
+    with phase('refit'):
+        model.fit(X_scaled, y)
+    return model
+
+class _BestIteration:
+    """
+    Validation loss of one fold fit after every iteration (log loss for classifiers, squared error otherwise).
+    Keeps the held-out predictions of the best iteration and tells the fit to stop once `patience` iterations
+    in a row have not improved on it.
+    """
+    def __init__(self, model: BaseEstimator, y_val: np.ndarray, patience: int) -> None:
+        self.model = model
+        self.y_val = y_val
+        self.patience = patience
+        self.classifier = is_classifier(model)
+        self.iteration = 0
+        self.best_iteration = 0
+        self.best_loss = np.inf
+        self.predictions: np.ndarray | None = None
+
+    def update(self, val_output: np.ndarray, predict_test: Callable[[], np.ndarray] | None = None) -> bool:
+        """
+        Records the next iteration.
+
+        Args:
+            val_output (np.ndarray): Class probabilities (classifiers) or predictions for the validation rows.
+            predict_test (Callable[[], np.ndarray] | None): Predicts the held-out rows, called only if the
+                iteration is the best so far. None if the validation rows are the held-out rows.
+
+        Returns:
+            bool: Whether to stop.
+        """
+        self.iteration += 1
+        if self.classifier:
+            loss = log_loss(self.y_val, val_output, labels=self.model.classes_)
+        else:
+            loss = mean_squared_error(self.y_val, val_output)
+        if loss < self.best_loss:
+            self.best_loss, self.best_iteration = loss, self.iteration
+            if predict_test is not None:
+                self.predictions = predict_test()
+            else:
+                self.predictions = self.model.classes_[np.argmax(val_output, axis=1)] if self.classifier else val_output
+        return self.iteration - self.best_iteration >= self.patience
+
+def _fit_fold_early_stopping(estimator: BaseEstimator, X: np.ndarray, y: np.ndarray, train_index: np.ndarray,
+                             test_index: np.ndarray, early_stop: str, patience: int,
+                             preprocessing: PreprocessingCache | None = None) -> tuple[np.ndarray, np.ndarray, float, int]:
     """
-    df_encoded = df.copy()
+    Fit a fresh clone of `estimator` on one training split one boosting stage (or epoch) at a time, stop once the
+    validation loss has not improved for `patience` iterations and predict the held-out split at the best iteration.
 
-    string_cols = []
-    for col in df_encoded.columns:
-        if col in ignore_columns:
-            continue
-        if is_string_dtype(df_encoded[col]):
-            non_null_values = df_encoded[col].dropna()
-            if all(isinstance(val, str) for val in non_null_values):
-                string_cols.append(col)
-    
-    for col in string_cols:
-        dummies = get_dummies(df_encoded[col], prefix=col)
-        df_encoded.drop(col, axis=1, inplace=True)
-        df_encoded = concat([df_encoded, dummies], axis=1)
-    
-    return df_encoded
+    Args:
+        estimator (BaseEstimator): Unfitted template estimator, one of EARLY_STOPPING_PARAMS. Never mutated.
+        X (np.ndarray): Full feature matrix.
+        y (np.ndarray): Full target vector.
+        train_index (np.ndarray): Row indices of the training split.
+        test_index (np.ndarray): Row indices of the held-out split.
+        early_stop (str): 'holdout' validates on the held-out split itself, 'inner' on INNER_VALIDATION_FRACTION
+            of the training split, which is then not trained on.
+        patience (int): Iterations without improvement before the fit stops.
+        preprocessing (PreprocessingCache | None): Cache of the fold's standardisation, if any.
 
+    Returns:
+        tuple[np.ndarray, np.ndarray, float, int]: Held-out row indices, their predictions and the fold score at
+            the best iteration, and the best iteration.
+    """
+    if early_stop == 'inner':
+        shuffled = np.random.default_rng(42).permutation(train_index)
+        n_val = max(1, int(len(train_index) * INNER_VALIDATION_FRACTION))
+        val_index, train_index = np.sort(shuffled[:n_val]), np.sort(shuffled[n_val:])
+        scaler = Standardizer.fit(X[train_index])
+        X_train, X_val, X_test = scaler.transform(X[train_index]), scaler.transform(X[val_index]), scaler.transform(X[test_index])
+    else:
+        val_index = test_index
+        if preprocessing is None:
+            X_train, X_test = standard_pipeline(X[train_index], X[test_index])
+        else:
+            X_train, X_test = preprocessing.fold(X, train_index, test_index)
+        X_val = X_test
+    holdout = early_stop != 'inner'
 
+    model = clone(estimator)
+    classifier = is_classifier(model)
+    stopper = _BestIteration(model, y[val_index], patience)
+    with phase('fold fit'):
+        if EARLY_STOPPING_PARAMS[model.__class__.__name__] == 'n_estimators':
+            # Staged predictions are computed lazily, one stage per call of the monitor.
+            val_stages = model.staged_predict_proba(X_val) if classifier else model.staged_predict(X_val)
+            test_stages = None if holdout else model.staged_predict(X_test)
 
+            def monitor(stage: int, gradient_boosting: Any, local: dict) -> bool:
+                val_output = next(val_stages)
+                test_output = None if test_stages is None else next(test_stages)
+                return stopper.update(val_output, None if holdout else lambda: test_output)
 
+            model.fit(X_train, y[train_index], monitor=monitor)
+        else:
+            if model.solver == 'lbfgs':
+                raise ValueError("Early stopping trains MLPs one epoch at a time, which the lbfgs solver cannot. Use -solver adam or sgd.")
+            classes = {'classes': np.unique(y)} if classifier else {}
+            for _ in range(model.max_iter):
+                model.partial_fit(X_train, y[train_index], **classes)
+                val_output = model.predict_proba(X_val) if classifier else model.predict(X_val)
+                if stopper.update(val_output, None if holdout else lambda: model.predict(X_test)):
+                    break
+    predictions = stopper.predictions
+    score = accuracy_score(y[test_index], predictions) if classifier else r2_score(y[test_index], predictions)
+    return test_index, predictions, float(score), stopper.best_iteration
 
 def generic_ml(mlmodel: BaseEstimator, X: np.ndarray, y: np.ndarray, *args, **kwargs) -> tuple[np.ndarray, list[float], Any]:
     """
     Perform k-fold cross-validation on a given machine learning model and return predictions, scores, and the final trained model.
+    Every fold and the final refit get their own clone of the estimator, so they can run concurrently.
+    The final refit is scheduled first so it overlaps with the fold fits instead of running afterwards.
+    When running in parallel, workers receive memory-mapped views of X, y and the fold indices (see SharedData).
     Args:
         mlmodel (BaseEstimator): The machine learning model to be trained and evaluated.
         X (np.ndarray): The input features for the model.
@@ -79,38 +382,244 @@ def generic_ml(mlmodel: BaseEstimator, X: np.ndarray, y: np.ndarray, *args, **kw
             n_splits (int, optional): Number of splits for k-fold cross-validation. Default is 10.
             shuffle (bool, optional): Whether to shuffle the data before splitting into batches. Default is False.
             random_state (int, optional): Random seed for shuffling. Default is 42 if shuffle is True, otherwise None.
+            n_jobs (int, optional): Number of worker processes fitting folds concurrently. Default is 1 (serial), -1 or a bare flag uses all cores.
+            early_stop (str, optional): Stop boosting stages (or MLP epochs) in every fold once the validation loss
+                stops improving, and refit with the median of the folds' best iterations (see _fit_fold_early_stopping).
+                'inner' (or a bare flag) validates on a part of the training split. 'holdout' validates on the
+                held-out split itself, which biases the fold scores upwards.
+                The best iteration per fold is kept on the final model as `best_iterations_`.
+            patience (int, optional): Iterations without improvement before early_stop stops a fit. Default is 10.
+            chunksize (int, optional): Train out of core with partial_fit on chunks of this many rows (see incremental_ml).
+            preprocessing (PreprocessingCache, optional): The project's cache of fold standardisation. Folds it has
+                seen before (for any estimator) are not summarised again.
+            cache (ResultCache, optional): The project's result cache. A result computed before for the same data,
+                estimator, hyperparameters and cross-validation settings is returned without fitting.
     Returns:
         tuple[np.ndarray, list[float], Any]: A tuple containing:
-            - np.ndarray: The predictions made by the model during cross-validation.
+            - np.ndarray: The out-of-fold predictions, in the original row order of `y`.
             - list[float]: The scores obtained during cross-validation.
             - Any: The final trained model.
     """
-                       
-    
-    
-    predictions: list[float] = []
+    if kwargs.get('early_stop') is True:
+        # Resolved before the cache key, so a bare -early_stop and -early_stop inner share a result.
+        kwargs['early_stop'] = 'inner'
+    cache: ResultCache | None = kwargs.pop('cache', None)
+    if cache is not None:
+        key = cache.key(mlmodel, X, y, kwargs)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+        result = generic_ml(mlmodel, X, y, *args, **kwargs)
+        cache.put(key, *result)
+        return result
+    early_stop: str | None = kwargs.pop('early_stop', None)
+    patience: int = int(kwargs.pop('patience', 10))
+    if early_stop:
+        if early_stop not in EARLY_STOPPING_MODES:
+            raise ValueError(f"Invalid early_stop {early_stop}. Must be one of {', '.join(EARLY_STOPPING_MODES)}.")
+        if mlmodel.__class__.__name__ not in EARLY_STOPPING_PARAMS:
+            raise ValueError(f"{mlmodel.__class__.__name__} does not support early stopping. Remove -early_stop.")
+        if kwargs.get('chunksize') is not None:
+            raise ValueError("early_stop cannot be combined with out-of-core training. Remove -chunksize or -early_stop.")
+        if patience < 1:
+            raise ValueError("patience must be a positive number of iterations.")
+    if kwargs.get('chunksize') is not None:
+        return incremental_ml(mlmodel, X, y, *args, **kwargs)
+    n_splits: int = kwargs.pop('n_splits', 10)
+    shuffle: bool  = kwargs.pop('shuffle', False)
+    random_state: int | None = kwargs.pop('random_state', 42) if shuffle else None
+    n_jobs: int = _resolve_n_jobs(kwargs.pop('n_jobs', 1))
+    preprocessing: PreprocessingCache | None = kwargs.pop('preprocessing', None)
+
+    estimator = mlmodel.__class__(**kwargs)
+    folds = k_fold_cross(X, y, n_splits=n_splits, random_state=random_state, shuffle=shuffle)
+
+    final_model = None
+    test_indices: list[np.ndarray] = []
+    fold_predictions: list[np.ndarray] = []
     scores: list[float] = []
+    best_iterations: list[int] = []
+    with ExitStack() as stack:
+        if n_jobs != 1:
+            if preprocessing is not None:
+                # Workers get a copy of the cache, so whatever they compute themselves is lost.
+                preprocessing.warm(X, folds)
+            shared = stack.enter_context(SharedData(X, y))
+            X, y, folds = shared.X, shared.y, shared.share_folds(folds)
+
+        if early_stop:
+            # The final refit needs the folds' best iterations, so it runs after them.
+            tasks = [delayed(_fit_fold_early_stopping)(estimator, X, y, train_index, test_index, early_stop, patience, preprocessing)
+                     for train_index, test_index in folds]
+        else:
+            tasks = [delayed(_fit_final)(estimator, X, y, preprocessing)]
+            tasks.extend(delayed(_fit_fold)(estimator, X, y, train_index, test_index, preprocessing) for train_index, test_index in folds)
+        results = Parallel(n_jobs=n_jobs, return_as='generator')(tasks)
+
+        for i, result in enumerate(tqdm(results, total=len(tasks), desc=f'Cross Validating {mlmodel.__class__.__name__}')):
+            if i == 0 and not early_stop:
+                final_model = result
+                continue
+            test_index, fold_prediction, score, *best_iteration = result
+            test_indices.append(np.asarray(test_index))
+            fold_predictions.append(np.asarray(fold_prediction))
+            scores.append(score)
+            best_iterations.extend(best_iteration)
+
+        if early_stop:
+            n_iterations = max(1, int(np.median(best_iterations)))
+            param = EARLY_STOPPING_PARAMS[mlmodel.__class__.__name__]
+            final_model = _fit_final(clone(estimator).set_params(**{param: n_iterations}), X, y, preprocessing)
+            final_model.best_iterations_ = best_iterations
+
+    return assemble_out_of_fold(test_indices, fold_predictions), scores, final_model
+
+def _chunks(index: np.ndarray, chunksize: int) -> Iterator[np.ndarray]:
+    """Splits sorted row indices into consecutive chunks, so every chunk reads a contiguous stretch of a memory-mapped X."""
+    for start in range(0, len(index), chunksize):
+        yield index[start:start + chunksize]
+
+def _dense_rows(X: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """Rows of `X` as a dense float array; a sparse X is only densified one chunk at a time."""
+    return X[rows].toarray() if sparse.issparse(X) else np.asarray(X[rows], dtype=np.float64)
+
+def streaming_moments(X: np.ndarray, index: np.ndarray, chunksize: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Mean and standard deviation of the rows `index` of `X`, computed one chunk at a time by merging per-chunk
+    moments (Chan et al.), so the rows never have to be in memory together.
+
+    Args:
+        X (np.ndarray): Feature matrix, typically memory-mapped.
+        index (np.ndarray): Sorted row indices.
+        chunksize (int): Rows per chunk.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Column means and (population) standard deviations, as standard_pipeline computes them.
+    """
+    n, mean, m2 = 0, np.zeros(X.shape[1]), np.zeros(X.shape[1])
+    for chunk in _chunks(index, chunksize):
+        X_chunk = _dense_rows(X, chunk)
+        n_chunk, chunk_mean = len(chunk), X_chunk.mean(axis=0)
+        delta = chunk_mean - mean
+        total = n + n_chunk
+        mean = mean + delta * n_chunk / total
+        m2 = m2 + ((X_chunk - chunk_mean) ** 2).sum(axis=0) + delta ** 2 * n * n_chunk / total
+        n = total
+    return mean, np.sqrt(m2 / n)
+
+def _partial_fit(estimator: BaseEstimator, X: np.ndarray, y: np.ndarray, index: np.ndarray, chunksize: int,
+                 epochs: int, classes: np.ndarray | None, random_state: int) -> tuple[Any, np.ndarray, np.ndarray]:
+    """
+    Fit a fresh clone of `estimator` on the rows `index` with partial_fit, one standardized chunk at a time.
+    The chunk order is shuffled every epoch, since rows are often stored sorted by target.
+
+    Args:
+        estimator (BaseEstimator): Unfitted template estimator with partial_fit. Never mutated.
+        X (np.ndarray): Full feature matrix.
+        y (np.ndarray): Full target vector.
+        index (np.ndarray): Sorted row indices to train on.
+        chunksize (int): Rows per partial_fit call.
+        epochs (int): Passes over the rows.
+        classes (np.ndarray | None): Every class label, required by partial_fit of classifiers.
+        random_state (int): Seed for the chunk order.
+
+    Returns:
+        tuple[Any, np.ndarray, np.ndarray]: The fitted estimator and the mean and standard deviation it was standardized with.
+    """
+    mu, sig = streaming_moments(X, index, chunksize)
+    model = clone(estimator)
+    chunks = list(_chunks(index, chunksize))
+    rng = np.random.default_rng(random_state)
+    fit_params = {'classes': classes} if classes is not None else {}
+    for _ in range(epochs):
+        for i in rng.permutation(len(chunks)):
+            model.partial_fit((_dense_rows(X, chunks[i]) - mu) / sig, y[chunks[i]], **fit_params)
+    return model, mu, sig
+
+def _fit_fold_incremental(estimator: BaseEstimator, X: np.ndarray, y: np.ndarray, train_index: np.ndarray, test_index: np.ndarray,
+                          chunksize: int, epochs: int, classes: np.ndarray | None, random_state: int) -> tuple[np.ndarray, np.ndarray, float]:
+    """
+    Out-of-core counterpart of _fit_fold: trains on the training split with partial_fit and predicts the
+    held-out split chunk by chunk.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, float]: Held-out row indices, their predictions and the fold score.
+    """
+    with phase('fold fit'):
+        model, mu, sig = _partial_fit(estimator, X, y, train_index, chunksize, epochs, classes, random_state)
+    with phase('predict'):
+        predictions = np.concatenate([model.predict((_dense_rows(X, chunk) - mu) / sig) for chunk in _chunks(test_index, chunksize)])
+    metric = accuracy_score if classes is not None else r2_score
+    return test_index, predictions, float(metric(y[test_index], predictions))
+
+def _fit_final_incremental(estimator: BaseEstimator, X: np.ndarray, y: np.ndarray, chunksize: int, epochs: int,
+                           classes: np.ndarray | None, random_state: int) -> Any:
+    """Out-of-core counterpart of _fit_final."""
+    with phase('refit'):
+        return _partial_fit(estimator, X, y, np.arange(len(y)), chunksize, epochs, classes, random_state)[0]
+
+def incremental_ml(mlmodel: BaseEstimator, X: np.ndarray, y: np.ndarray, *args, **kwargs) -> tuple[np.ndarray, list[float], Any]:
+    """
+    Out-of-core variant of generic_ml for estimators with partial_fit (GaussianNB, MLPs, SGD models).
+    Features are standardized with moments computed chunk by chunk, every model is trained with partial_fit
+    on chunks of `chunksize` rows and out-of-fold predictions are collected chunk by chunk, so only one chunk
+    of X is in memory at a time. Pair it with a lazily loaded project (load -lazy), where X is memory-mapped.
+    Args:
+        mlmodel (BaseEstimator): The machine learning model to be trained and evaluated.
+        X (np.ndarray): The input features for the model.
+        y (np.ndarray): The target values for the model.
+        *args: Additional positional arguments to pass to the model's __init__ method.
+        **kwargs: Additional keyword arguments to pass to the model's __init__ method and to control cross-validation.
+            chunksize (int): Rows per partial_fit call.
+            epochs (int, optional): Passes over the training rows. Default is 1.
+            n_splits, shuffle, random_state, n_jobs: As in generic_ml.
+    Returns:
+        tuple[np.ndarray, list[float], Any]: Out-of-fold predictions in the original row order, the fold scores and the final model.
+    """
+    chunksize: int = int(kwargs.pop('chunksize'))
+    epochs: int = int(kwargs.pop('epochs', 1))
     n_splits: int = kwargs.pop('n_splits', 10)
     shuffle: bool  = kwargs.pop('shuffle', False)
     random_state: int | None = kwargs.pop('random_state', 42) if shuffle else None
-    for train_index, test_index in tqdm(k_fold_cross(X, y, n_splits=n_splits, 
-                                                     random_state=random_state, 
-                                                     shuffle=shuffle), desc=f'Cross Validating {mlmodel.__class__.__name__}'):
-        X_train, X_test = X[train_index], X[test_index]
-        y_train, y_test = y[train_index], y[test_index]
-        X_train, X_test = standard_pipeline(X_train, X_test)
-        model = mlmodel
-        model.__init__(**kwargs)
-        model.fit(X_train, y_train)
-        predictions.extend(model.predict(X_test))
-        scores.append(float(model.score(X_test, y_test)))
-    
-    final_model = mlmodel
-    final_model.__init__(**kwargs)
-    X, _ = standard_pipeline(X, X)
-    final_model.fit(X, y)
-
-    return np.array(predictions), scores, final_model
+    n_jobs: int = _resolve_n_jobs(kwargs.pop('n_jobs', 1))
+    # Chunks are standardized with streamed statistics; cached fold matrices would not fit in memory anyway.
+    kwargs.pop('preprocessing', None)
+
+    estimator = mlmodel.__class__(**kwargs)
+    if not hasattr(estimator, 'partial_fit'):
+        raise ValueError(f"{mlmodel.__class__.__name__} does not support out-of-core training. Remove -chunksize.")
+    if chunksize < 1:
+        raise ValueError("chunksize must be a positive number of rows.")
+    classes = np.unique(y) if is_classifier(estimator) else None
+    seed = random_state if random_state is not None else 42
+    # Shuffled KFold yields unsorted indices; sorting keeps every chunk a contiguous read.
+    folds = [(np.sort(train_index), np.sort(test_index))
+             for train_index, test_index in k_fold_cross(X, y, n_splits=n_splits, random_state=random_state, shuffle=shuffle)]
+
+    final_model = None
+    test_indices: list[np.ndarray] = []
+    fold_predictions: list[np.ndarray] = []
+    scores: list[float] = []
+    with ExitStack() as stack:
+        if n_jobs != 1:
+            shared = stack.enter_context(SharedData(X, y))
+            X, y, folds = shared.X, shared.y, shared.share_folds(folds)
+
+        tasks = [delayed(_fit_final_incremental)(estimator, X, y, chunksize, epochs, classes, seed)]
+        tasks.extend(delayed(_fit_fold_incremental)(estimator, X, y, train_index, test_index, chunksize, epochs, classes, seed)
+                     for train_index, test_index in folds)
+        results = Parallel(n_jobs=n_jobs, return_as='generator')(tasks)
+
+        for i, result in enumerate(tqdm(results, total=len(tasks), desc=f'Cross Validating {mlmodel.__class__.__name__} out of core')):
+            if i == 0:
+                final_model = result
+                continue
+            test_index, fold_prediction, score = result
+            test_indices.append(np.asarray(test_index))
+            fold_predictions.append(np.asarray(fold_prediction))
+            scores.append(score)
+
+    return assemble_out_of_fold(test_indices, fold_predictions), scores, final_model
 
 def clean_dict(dict_: dict) -> dict:
     """
@@ -0,0 +1,208 @@
+"""Fitted standardisation shared between cross-validation, tuning and PCA. A project's PreprocessingCache keeps
+the statistics of every fold it has seen, so the same fold is only ever summarised once per version of X."""
+
+import numpy as np
+from scipy import sparse
+from collections import OrderedDict
+from dataclasses import dataclass
+from src.profiling import phase
+from typing import Any
+import hashlib
+
+# Memory the scaled fold matrices of one cache may hold. Fold statistics are always kept.
+DEFAULT_CACHE_BYTES = 256 * 1024 ** 2
+
+
+@dataclass(frozen=True)
+class Standardizer:
+    """
+    Mean and standard deviation of a set of training rows, applied to any rows of the same matrix.
+    Sparse matrices are only scaled, not centered, since centering would make them dense. Columns that are
+    constant in the training rows (e.g. a category absent from them) are left unscaled.
+    """
+    mean: np.ndarray | None
+    scale: np.ndarray
+
+    @classmethod
+    def fit(cls, X: np.ndarray | sparse.spmatrix) -> "Standardizer":
+        """
+        Computes the statistics of `X`.
+
+        Args:
+            X (np.ndarray | sparse.spmatrix): Training rows.
+
+        Returns:
+            Standardizer: The fitted statistics.
+        """
+        if sparse.issparse(X):
+            mean = np.asarray(X.mean(axis=0)).ravel()
+            mean_sq = np.asarray(X.multiply(X).mean(axis=0)).ravel()
+            sig = np.sqrt(np.maximum(mean_sq - mean ** 2, 0))
+            return cls(mean=None, scale=np.where(sig > 0, sig, 1))
+        sig = X.std(axis=0)
+        return cls(mean=X.mean(axis=0), scale=np.where(sig > 0, sig, 1).astype(sig.dtype))
+
+    def transform(self, X: np.ndarray | sparse.spmatrix) -> np.ndarray | sparse.csr_matrix:
+        """
+        Standardizes `X` with the fitted statistics.
+
+        Args:
+            X (np.ndarray | sparse.spmatrix): Rows to standardize.
+
+        Returns:
+            np.ndarray | sparse.csr_matrix: The standardized rows.
+        """
+        if self.mean is None:
+            return sparse.csr_matrix(X @ sparse.diags(1 / self.scale))
+        return (X - self.mean) / self.scale
+
+
+@dataclass
+class FittedModel:
+    """A final model together with the Standardizer of the data it was fitted on, so it can predict raw rows."""
+    scaler: Standardizer
+    estimator: Any
+
+    def predict(self, X: np.ndarray | sparse.spmatrix) -> np.ndarray:
+        """
+        Predicts unstandardized rows.
+
+        Args:
+            X (np.ndarray | sparse.spmatrix): Rows encoded like the project's X (see ShellProject.encode).
+
+        Returns:
+            np.ndarray: The predictions.
+        """
+        with phase('predict'):
+            return self.estimator.predict(self.scaler.transform(X))
+
+
+def _nbytes(X: np.ndarray | sparse.spmatrix) -> int:
+    if sparse.issparse(X):
+        return X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+    return X.nbytes
+
+
+class PreprocessingCache:
+    """
+    Per-project cache of fitted Standardizers and standardized fold matrices.
+
+    Entries are keyed on the data version and the row indices they were fitted on, so every estimator,
+    every tuning candidate and PCA that sees the same fold reuses its statistics instead of recomputing them.
+    Standardized matrices are additionally kept up to `max_bytes`, least recently used first out.
+    Call invalidate() whenever X changes.
+
+    The cache can be handed to worker processes: it pickles without its matrices, so workers receive only
+    the statistics the parent has already computed (see warm).
+
+    Attributes:
+        version (int): Data version, bumped by invalidate().
+        max_bytes (int): Memory budget for standardized matrices.
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups that had to compute.
+    """
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_BYTES) -> None:
+        self.version = 0
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._scalers: dict[tuple, Standardizer] = {}
+        self._matrices: OrderedDict[tuple, np.ndarray | sparse.spmatrix] = OrderedDict()
+        self._nbytes = 0
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state['_matrices'], state['_nbytes'] = OrderedDict(), 0
+        return state
+
+    def _key(self, X: np.ndarray | sparse.spmatrix, index: np.ndarray | None) -> tuple:
+        """Cache key of rows `index` (None for every row) of `X`."""
+        if index is None:
+            return (self.version, X.shape, 'all')
+        index = np.ascontiguousarray(index)
+        return (self.version, X.shape, len(index), hashlib.blake2b(index.tobytes(), digest_size=16).hexdigest())
+
+    def scaler(self, X: np.ndarray | sparse.spmatrix, fit_index: np.ndarray | None = None) -> Standardizer:
+        """
+        Statistics of the rows `fit_index` of `X`, computed on the first request.
+
+        Args:
+            X (np.ndarray | sparse.spmatrix): Feature matrix of the current data version.
+            fit_index (np.ndarray | None): Training rows. None uses every row.
+
+        Returns:
+            Standardizer: The fitted statistics.
+        """
+        key = self._key(X, fit_index)
+        scaler = self._scalers.get(key)
+        if scaler is None:
+            self.misses += 1
+            scaler = self._scalers[key] = Standardizer.fit(X if fit_index is None else X[fit_index])
+        else:
+            self.hits += 1
+        return scaler
+
+    def warm(self, X: np.ndarray | sparse.spmatrix, folds: list[tuple[np.ndarray, np.ndarray]], full: bool = True) -> None:
+        """
+        Computes the statistics of every fold (and of the full data if `full`) ahead of dispatching them to workers.
+
+        Args:
+            X (np.ndarray | sparse.spmatrix): Feature matrix.
+            folds (list[tuple[np.ndarray, np.ndarray]]): Train and test indices per fold.
+            full (bool): Whether to also fit the statistics of every row, as a final refit needs them.
+        """
+        if full:
+            self.scaler(X)
+        for train_index, _ in folds:
+            self.scaler(X, train_index)
+
+    def scaled(self, X: np.ndarray | sparse.spmatrix, fit_index: np.ndarray | None = None,
+               index: np.ndarray | None = None) -> np.ndarray | sparse.spmatrix:
+        """
+        Rows `index` of `X` standardized with the statistics of the rows `fit_index`.
+
+        Args:
+            X (np.ndarray | sparse.spmatrix): Feature matrix of the current data version.
+            fit_index (np.ndarray | None): Rows the statistics are fitted on. None uses every row.
+            index (np.ndarray | None): Rows to standardize. None uses every row.
+
+        Returns:
+            np.ndarray | sparse.spmatrix: The standardized rows. Shared with later callers, so never modify it in place.
+        """
+        key = (self._key(X, fit_index), self._key(X, index))
+        if key in self._matrices:
+            self._matrices.move_to_end(key)
+            self.hits += 1
+            return self._matrices[key]
+        result = self.scaler(X, fit_index).transform(X if index is None else X[index])
+        size = _nbytes(result)
+        if size <= self.max_bytes:
+            while self._nbytes + size > self.max_bytes:
+                _, evicted = self._matrices.popitem(last=False)
+                self._nbytes -= _nbytes(evicted)
+            self._matrices[key] = result
+            self._nbytes += size
+        return result
+
+    def fold(self, X: np.ndarray | sparse.spmatrix, train_index: np.ndarray,
+             test_index: np.ndarray) -> tuple[np.ndarray | sparse.spmatrix, np.ndarray | sparse.spmatrix]:
+        """
+        Standardized training and held-out rows of one fold, like standard_pipeline(X[train_index], X[test_index]).
+
+        Args:
+            X (np.ndarray | sparse.spmatrix): Feature matrix.
+            train_index (np.ndarray): Training rows.
+            test_index (np.ndarray): Held-out rows.
+
+        Returns:
+            tuple[np.ndarray | sparse.spmatrix, np.ndarray | sparse.spmatrix]: Standardized training and held-out rows.
+        """
+        return self.scaled(X, train_index, train_index), self.scaled(X, train_index, test_index)
+
+    def invalidate(self) -> None:
+        """Drops every entry and bumps the data version."""
+        self.version += 1
+        self._scalers.clear()
+        self._matrices.clear()
+        self._nbytes = 0
+
@@ -0,0 +1,294 @@
+"""Content-addressed memoisation of model commands. A result is keyed on a hash of X, y, the estimator, its
+hyperparameters and the cross-validation settings, so rerunning a command on unchanged data returns the stored
+out-of-fold predictions, scores and final model instead of fitting again."""
+
+from src.column_store import RESULTS_DIR, encode_labels, decode_labels
+
+from scipy import sparse
+from collections import OrderedDict
+from typing import Any
+import numpy as np
+import hashlib
+import joblib
+import types
+import json
+import sys
+import os
+
+INDEX_FILE = 'index.json'
+# Memory (and disk) the cached results of one project may take.
+DEFAULT_RESULT_BYTES = 512 * 1024 ** 2
+# Rows hashed at a time when fingerprinting X.
+HASH_ROWS = 1 << 16
+# generic_ml arguments that change how a result is computed, not the result.
+EXECUTION_KWARGS = ('n_jobs', 'preprocessing', 'cache')
+
+ModelResult = tuple[np.ndarray, list[float], Any]
+
+
+def fingerprint_data(X: np.ndarray | sparse.spmatrix, y: np.ndarray) -> str:
+    """
+    Hash of the contents of X and y, read a block of rows at a time so a memory-mapped X is never copied whole.
+
+    Args:
+        X (np.ndarray | sparse.spmatrix): Feature matrix.
+        y (np.ndarray): Target vector.
+
+    Returns:
+        str: Hex digest.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f'{X.shape}{X.dtype}'.encode())
+    if sparse.issparse(X):
+        X = sparse.csr_matrix(X)
+        for array in (X.data, X.indices, X.indptr):
+            digest.update(np.ascontiguousarray(array).tobytes())
+    else:
+        for start in range(0, X.shape[0], HASH_ROWS):
+            digest.update(np.ascontiguousarray(X[start:start + HASH_ROWS]).tobytes())
+    codes, classes = encode_labels(np.asarray(y))
+    digest.update(f'{codes.dtype}{classes}'.encode())
+    digest.update(np.ascontiguousarray(codes).tobytes())
+    return digest.hexdigest()
+
+
+def estimate_nbytes(obj: Any, seen: dict[int, Any] | None = None) -> int:
+    """
+    Memory held by a fitted model, estimated from the arrays and strings it references. Cheaper than pickling
+    it to measure, which costs a full serialisation of e.g. a large forest.
+
+    Args:
+        obj (Any): Estimator, or any object it references.
+        seen (dict[int, Any] | None): Objects already counted, by id. They are kept referenced so the id of a
+            temporary state dict is not reused while counting.
+
+    Returns:
+        int: Estimated size in bytes.
+    """
+    seen = {} if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen[id(obj)] = obj
+    if isinstance(obj, np.ndarray):
+        # Object arrays, e.g. the trees of gradient boosting, hold references.
+        return obj.nbytes + (sum(estimate_nbytes(value, seen) for value in obj.flat) if obj.dtype.hasobject else 0)
+    if isinstance(obj, (str, bytes)):
+        return sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        return sum(estimate_nbytes(value, seen) for value in obj.values())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sum(estimate_nbytes(value, seen) for value in obj)
+    if isinstance(obj, (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)):
+        return 0
+    if hasattr(obj, '__dict__'):
+        return estimate_nbytes(vars(obj), seen)
+    # Extension types such as sklearn's Tree expose their arrays through their pickled state.
+    state = obj.__getstate__() if hasattr(obj, '__getstate__') else None
+    return estimate_nbytes(state, seen) if isinstance(state, dict) else 0
+
+
+class ResultCache:
+    """
+    Per-project store of generic_ml results, keyed on the content of the data and the model configuration.
+
+    Results are held in memory and, once the project has a directory (after save or load), also written to
+    its `results` directory, next to modeldata.json. When the results exceed `max_bytes`, the least recently
+    used ones are evicted. Call data_changed() whenever X or y is replaced, so the data is hashed again.
+
+    Attributes:
+        directory (str | None): The results directory of the saved project, if any.
+        max_bytes (int): Size budget for stored results.
+        hits (int): Results returned from the cache.
+        misses (int): Results that had to be computed.
+    """
+    def __init__(self, max_bytes: int = DEFAULT_RESULT_BYTES) -> None:
+        self.directory: str | None = None
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # Index of every stored result in least recently used order: estimator name, size and label classes.
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._results: dict[str, ModelResult] = {}
+        self._fingerprint: str | None = None
+
+    @property
+    def nbytes(self) -> int:
+        return sum(entry['nbytes'] for entry in self._entries.values())
+
+    def data_changed(self) -> None:
+        """Forgets the hash of X and y. Stored results stay, keyed on the data they were computed on."""
+        self._fingerprint = None
+
+    def key(self, mlmodel: Any, X: np.ndarray | sparse.spmatrix, y: np.ndarray, kwargs: dict[str, Any]) -> str:
+        """
+        Cache key of generic_ml(mlmodel, X, y, **kwargs).
+
+        Args:
+            mlmodel (Any): Estimator whose class is fitted.
+            X (np.ndarray | sparse.spmatrix): Feature matrix of the project.
+            y (np.ndarray): Target vector of the project.
+            kwargs (dict[str, Any]): Keyword arguments of generic_ml.
+
+        Returns:
+            str: Hex digest identifying the result.
+        """
+        if self._fingerprint is None:
+            self._fingerprint = fingerprint_data(X, y)
+        settings = {name: value for name, value in kwargs.items() if name not in EXECUTION_KWARGS}
+        # Resolved like generic_ml and incremental_ml pop them; whatever is left configures the estimator.
+        shuffle = settings.pop('shuffle', False)
+        cv = {
+            'n_splits': settings.pop('n_splits', 10),
+            'shuffle': shuffle,
+            'random_state': settings.pop('random_state', 42) if shuffle else None,
+            'chunksize': settings.pop('chunksize', None),
+            'epochs': settings.pop('epochs', 1),
+        }
+        # Settings added after results were first cached join the key only when set, so existing keys stay valid.
+        mode = settings.pop('cv', 'kfold')  # 'loo' in ols_ml
+        if mode != 'kfold':
+            cv['cv'] = mode
+        early_stop = settings.pop('early_stop', None)  # A bare flag is resolved to 'inner' by generic_ml.
+        patience = settings.pop('patience', 10)
+        if early_stop:
+            cv.update(early_stop=early_stop, patience=int(patience))
+        estimator = mlmodel.__class__(**settings)
+        description = {
+            'data': self._fingerprint,
+            'estimator': f'{estimator.__class__.__module__}.{estimator.__class__.__qualname__}',
+            'params': estimator.get_params(),
+            'cv': cv,
+        }
+        return hashlib.blake2b(json.dumps(description, sort_keys=True, default=repr).encode(), digest_size=20).hexdigest()
+
+    def _paths(self, key: str) -> tuple[str, str]:
+        assert self.directory is not None
+        return os.path.join(self.directory, key + '.npz'), os.path.join(self.directory, key + '.joblib')
+
+    def get(self, key: str) -> ModelResult | None:
+        """
+        The stored result for `key`, if any.
+
+        Args:
+            key (str): Key from key().
+
+        Returns:
+            ModelResult | None: Out-of-fold predictions, fold scores and final model, or None.
+        """
+        if key not in self._entries:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return self._read(key)
+
+    def _read(self, key: str) -> ModelResult:
+        """The result for `key`, read from the results directory unless it is in memory."""
+        if key not in self._results:
+            arrays_path, model_path = self._paths(key)
+            with np.load(arrays_path, allow_pickle=False) as arrays:
+                predictions = decode_labels(arrays['predictions'], self._entries[key]['classes'])
+                scores = arrays['scores'].tolist()
+            self._results[key] = (predictions, scores, joblib.load(model_path))
+        return self._results[key]
+
+    def put(self, key: str, predictions: np.ndarray, scores: list[float], final_model: Any) -> None:
+        """
+        Stores a result, evicting the least recently used ones beyond `max_bytes`.
+
+        Args:
+            key (str): Key from key().
+            predictions (np.ndarray): Out-of-fold predictions.
+            scores (list[float]): Fold scores.
+            final_model (Any): Estimator fitted on the full data.
+        """
+        predictions = np.asarray(predictions)
+        nbytes = predictions.nbytes + estimate_nbytes(final_model)
+        if nbytes > self.max_bytes:
+            return
+        while self._entries and self.nbytes + nbytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+        _, classes = encode_labels(predictions)
+        self._entries[key] = {'estimator': final_model.__class__.__name__, 'nbytes': nbytes, 'classes': classes}
+        self._results[key] = (predictions, list(scores), final_model)
+        if self.directory is not None:
+            self._write(key)
+            self._write_index()
+
+    def _write(self, key: str) -> None:
+        """Writes the result for `key`, which must be in memory, to the results directory."""
+        predictions, scores, final_model = self._results[key]
+        arrays_path, model_path = self._paths(key)
+        codes, _ = encode_labels(predictions)
+        np.savez(arrays_path, predictions=codes, scores=np.asarray(scores, dtype=np.float64))
+        joblib.dump(final_model, model_path)
+
+    def _write_index(self) -> None:
+        assert self.directory is not None
+        with open(os.path.join(self.directory, INDEX_FILE), 'w') as f:
+            json.dump(self._entries, f, indent=4)
+
+    def _remove(self, key: str) -> None:
+        self._entries.pop(key)
+        self._results.pop(key, None)
+        if self.directory is not None:
+            for path in self._paths(key):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def clear(self) -> int:
+        """
+        Removes every stored result, from memory and from disk.
+
+        Returns:
+            int: Number of results removed.
+        """
+        n_results = len(self._entries)
+        for key in list(self._entries):
+            self._remove(key)
+        if self.directory is not None:
+            self._write_index()
+        return n_results
+
+    def save(self, project_path: str) -> None:
+        """
+        Writes every stored result to the results directory of `project_path` and keeps writing new ones there.
+
+        Args:
+            project_path (str): Project directory.
+        """
+        directory = os.path.join(project_path, RESULTS_DIR)
+        if self.directory is None and not self._entries:
+            return
+        if self.directory is not None and os.path.exists(directory) and os.path.samefile(self.directory, directory):
+            self._write_index()
+            return
+        # Results only stored in a previous directory have to be read before switching.
+        for key in self._entries:
+            self._read(key)
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        for key in self._entries:
+            self._write(key)
+        self._write_index()
+
+    def load(self, project_path: str) -> None:
+        """
+        Attaches the results directory of `project_path`. Results are read from disk on first use.
+
+        Args:
+            project_path (str): Project directory.
+        """
+        directory = os.path.join(project_path, RESULTS_DIR)
+        if not os.path.exists(os.path.join(directory, INDEX_FILE)):
+            return
+        with open(os.path.join(directory, INDEX_FILE), 'r') as f:
+            self._entries = OrderedDict(json.load(f))
+        self._results.clear()
+        self.directory = directory
+
+    def stats(self) -> str:
+        """Human readable summary of the cache."""
+        where = 'in memory' if self.directory is None else f'in {self.directory}'
+        return (f"{len(self._entries)} cached results {where} ({self.nbytes / 1024 ** 2:.1f} of "
+                f"{self.max_bytes / 1024 ** 2:.0f} MB), {self.hits} hits, {self.misses} misses.")
@@ -0,0 +1,74 @@
+"""Memory-mapped data plane for multi-process training. Worker processes receive file-backed views of X, y
+and the fold indices instead of their own pickled copies."""
+
+import numpy as np
+from typing import Iterable
+import tempfile
+import shutil
+import os
+
+
+class SharedData:
+    """
+    Dumps X, y and fold index arrays to .npy files in a temporary directory and exposes read-only
+    memory-mapped views of them. joblib hands np.memmap arguments to its workers by file reference,
+    so every worker maps the same pages rather than unpickling its own copy of the matrix.
+
+    joblib memory-maps large arguments by itself (`max_nbytes`), but it does so per Parallel call: every call
+    dumps X again, and a search running inside a scheduler worker dumps it once more from that worker. Arrays
+    below the threshold, such as the fold indices, are pickled into every task. Dumping once here means
+    the outer scheduler, every search inside it and every fold task map the same files, whatever the sizes.
+
+    Arrays that are already memory-mapped are reused as they are, and object arrays (e.g. string
+    class labels) cannot be mapped, so they stay in memory. Use as a context manager; the files are
+    removed on exit.
+
+    Attributes:
+        X (np.ndarray): Memory-mapped feature matrix.
+        y (np.ndarray): Memory-mapped target vector, or the original array if it holds objects.
+        directory (str): Directory holding the backing files.
+    """
+    def __init__(self, X: np.ndarray, y: np.ndarray) -> None:
+        self.directory = tempfile.mkdtemp(prefix='hungakid_')
+        self._n_files = 0
+        self.X = self._share(X)
+        self.y = self._share(y)
+
+    def _share(self, array: np.ndarray) -> np.ndarray:
+        """
+        Writes `array` to the shared directory and returns a read-only memory-mapped view of it.
+
+        Args:
+            array (np.ndarray): Array to share.
+
+        Returns:
+            np.ndarray: Memory-mapped view, or `array` itself if it is already mapped or holds objects.
+        """
+        if isinstance(array, np.memmap) or not isinstance(array, np.ndarray) or array.dtype.hasobject:
+            return array
+        path = os.path.join(self.directory, f'{self._n_files}.npy')
+        self._n_files += 1
+        np.save(path, array)
+        return np.load(path, mmap_mode='r')
+
+    def share_folds(self, folds: Iterable[tuple[np.ndarray, np.ndarray]]) -> list[tuple[np.ndarray, np.ndarray]]:
+        """
+        Shares the train and test index arrays of every fold.
+
+        Args:
+            folds (Iterable[tuple[np.ndarray, np.ndarray]]): Train and test indices per fold.
+
+        Returns:
+            list[tuple[np.ndarray, np.ndarray]]: Memory-mapped train and test indices per fold.
+        """
+        return [(self._share(np.asarray(train_index)), self._share(np.asarray(test_index))) for train_index, test_index in folds]
+
+    def close(self) -> None:
+        """Removes the backing files."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self) -> "SharedData":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
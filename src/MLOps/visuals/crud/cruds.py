@@ -1,4 +1,5 @@
 from src.MLOps.visuals.pca.pca import plot_explained_var, plot_pca, barplot_pcs
+from src.MLOps.utils.preprocessing import PreprocessingCache
 
 import numpy as np
 import matplotlib.pyplot as plt
@@ -87,9 +88,9 @@ class Plotter:
         plt.ioff()
     
     def pca_plot(self, pca: PCA, X: np.ndarray, y: np.ndarray, task: str,
-                 cols: list[str], show: bool = False) -> None:
+                 cols: list[str], show: bool = False, preprocessing: PreprocessingCache | None = None) -> None:
         """Plots the PCA visualization of the input data."""
-        self.plot_data.append({'pca': pca, 'X': X, 'y': y, 'task': task})
+        self.plot_data.append({'pca': pca, 'X': X, 'y': y, 'task': task, 'preprocessing': preprocessing})
         self.plot_funcs.append(plot_pca)
         self.plot_data.append({'pca' : pca})
         self.plot_funcs.append(plot_explained_var)
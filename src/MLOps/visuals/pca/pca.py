@@ -1,21 +1,25 @@
+from src.MLOps.utils.preprocessing import PreprocessingCache
+
 from sklearn.decomposition import PCA
 from sklearn.preprocessing import StandardScaler
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.colors as mcolors
 
-def scale(X: np.ndarray) -> np.ndarray:
-    """Scales the input data."""
+def scale(X: np.ndarray, preprocessing: PreprocessingCache | None = None) -> np.ndarray:
+    """Scales the input data, reusing the project's cached standardisation of X if given."""
+    if preprocessing is not None:
+        return preprocessing.scaled(X)
     scaler = StandardScaler()
     return scaler.fit_transform(X)
 
-def pca_fit(X: np.ndarray) -> PCA:
+def pca_fit(X: np.ndarray, preprocessing: PreprocessingCache | None = None) -> PCA:
     """Performs PCA transformation on the input data."""
-    scaled = scale(X)
+    scaled = scale(X, preprocessing)
     pca =  PCA()
     return pca.fit(scaled)
 
-def plot_pca(pca: PCA, X: np.ndarray,  y:np.ndarray, task: str) -> None:
+def plot_pca(pca: PCA, X: np.ndarray,  y:np.ndarray, task: str, preprocessing: PreprocessingCache | None = None) -> None:
     """
     Plots the PCA visualization of the input data.
     
@@ -31,11 +35,14 @@ def plot_pca(pca: PCA, X: np.ndarray,  y:np.ndarray, task: str) -> None:
     
     task : str {'classification', 'regression'}
     
+    preprocessing : PreprocessingCache, optional
+        Cache holding the standardised X pca was fitted on.
+    
     Returns
     -------
     None"""
 
-    X_pca = pca.transform(scale(X))
+    X_pca = pca.transform(scale(X, preprocessing))
 
     if task == 'classification':
         unique_labels = np.unique(y)
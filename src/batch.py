@@ -0,0 +1,226 @@
+"""Batch mode: runs a script of shell commands without the prompt. Every command is attributed to the project it
+touches (the project opened by the last `create`, `load` or `chproj`), projects that no command connects run as
+independent pipelines in parallel processes, and commands of one pipeline run in script order."""
+
+from src.commands.command import Command
+from src.cliresult import CLIResult
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Any
+import json
+import os
+import sys
+import time
+
+# Commands that open a project; the commands after them belong to that project.
+SCOPE_COMMANDS = frozenset({'create', 'load', 'chproj'})
+# Commands that touch the project named by their first argument without opening it.
+TARGET_COMMANDS = frozenset({'delete'})
+# Commands that touch every project in the list given as their first argument.
+FANOUT_COMMANDS = frozenset({'foreach'})
+# Commands that change state shared by every project; only allowed before the first project is opened.
+GLOBAL_COMMANDS = frozenset({'config'})
+# Commands that only make sense at the interactive prompt.
+INTERACTIVE_COMMANDS = frozenset({'exit', 'jobs', 'wait', 'cancel'})
+
+
+@dataclass
+class Step:
+    """
+    One command of a script.
+
+    Attributes:
+        index (int): Position of the command in the script.
+        line (int): Line of the script the command is on.
+        command (str): The command as written.
+        project (str | None): The project the command runs in. None for commands before the first project.
+        touches (list[str]): Every project the command reads or changes.
+    """
+    index: int
+    line: int
+    command: str
+    project: str | None
+    touches: list[str]
+
+
+def parse_script(text: str) -> list[Step]:
+    """
+    Splits a script into commands and attributes each to a project.
+
+    A script holds shell commands, one or more per line separated by ';'. Blank lines and lines starting with
+    '#' are ignored, as are `exit` and a trailing `&`.
+
+    Args:
+        text (str): The script.
+
+    Returns:
+        list[Step]: The commands in script order.
+    """
+    steps: list[Step] = []
+    scope: str | None = None
+    for line_number, line in enumerate(text.splitlines(), start=1):
+        if line.strip().startswith('#'):
+            continue
+        for raw in line.split(';'):
+            command = raw.strip().removesuffix('&').strip()
+            if not command:
+                continue
+            try:
+                parsed = Command.from_string(command)
+            except ValueError as e:
+                raise ValueError(f"Line {line_number}: {e}")
+            if parsed.cmd in INTERACTIVE_COMMANDS:
+                continue
+            if parsed.cmd in GLOBAL_COMMANDS and scope is not None:
+                raise ValueError(f"Line {line_number}: '{parsed.cmd}' changes every project and must come before the first project command.")
+            touches = [] if scope is None else [scope]
+            if parsed.cmd in SCOPE_COMMANDS | TARGET_COMMANDS:
+                if not parsed.args:
+                    raise ValueError(f"Line {line_number}: '{parsed.cmd}' needs a project name.")
+                target = str(parsed.args[0])
+                if parsed.cmd in SCOPE_COMMANDS:
+                    scope, touches = target, [target]
+                else:
+                    touches = [target]
+            elif parsed.cmd in FANOUT_COMMANDS and parsed.args:
+                targets = parsed.args[0]
+                touches = [str(alias) for alias in targets] if isinstance(targets, list) else [str(targets)]
+            steps.append(Step(index=len(steps), line=line_number, command=command, project=scope, touches=touches))
+    return steps
+
+
+def build_pipelines(steps: list[Step]) -> tuple[list[Step], list[list[Step]]]:
+    """
+    Groups the commands of a script into pipelines that can run concurrently.
+
+    Projects are nodes of a graph and every command touching several projects connects them. Each connected
+    group of projects becomes one pipeline holding its commands in script order.
+
+    Args:
+        steps (list[Step]): Commands from parse_script.
+
+    Returns:
+        tuple[list[Step], list[list[Step]]]: Commands before the first project, run before anything else,
+            and the pipelines.
+    """
+    parent: dict[str, str] = {}
+
+    def find(alias: str) -> str:
+        parent.setdefault(alias, alias)
+        while parent[alias] != alias:
+            parent[alias] = parent[parent[alias]]
+            alias = parent[alias]
+        return alias
+
+    for step in steps:
+        for alias in step.touches:
+            parent[find(alias)] = find(step.touches[0])
+
+    preamble = [step for step in steps if not step.touches]
+    pipelines: dict[str, list[Step]] = {}
+    for step in steps:
+        if step.touches:
+            pipelines.setdefault(find(step.touches[0]), []).append(step)
+    return preamble, list(pipelines.values())
+
+
+def _describe(step: Step, status: str, seconds: float = 0.0, result: CLIResult | None = None, error: str = '') -> dict[str, Any]:
+    return {
+        **asdict(step),
+        'status': status,
+        'seconds': round(seconds, 4),
+        'result': '' if result is None else str(result.result),
+        'warning': '' if result is None else result.warning.strip(),
+        'note': '' if result is None else result.note.strip(),
+        'error': error,
+    }
+
+
+def run_pipeline(steps: list[Step], keep_going: bool = False, quiet: bool = True) -> list[dict[str, Any]]:
+    """
+    Runs the commands of one pipeline in order on a fresh ProjectStore.
+
+    Args:
+        steps (list[Step]): The commands.
+        keep_going (bool): Run the remaining commands after one failed, instead of skipping them.
+        quiet (bool): Discard what commands print, e.g. progress bars of concurrent pipelines.
+
+    Returns:
+        list[dict[str, Any]]: One log record per command.
+    """
+    from src.project_store import ProjectStore
+
+    if quiet:
+        sys.stdout = sys.stderr = open(os.devnull, 'w')
+    store = ProjectStore()
+    records = []
+    failed = False
+    for step in steps:
+        if failed and not keep_going:
+            records.append(_describe(step, 'skipped'))
+            continue
+        if step.project in store.projects:
+            store.current_project = step.project
+        start = time.perf_counter()
+        try:
+            result = Command.from_string(step.command).execute(store)
+        except Exception as e:
+            failed = True
+            records.append(_describe(step, 'failed', time.perf_counter() - start, error=f'{type(e).__name__}: {e}'))
+            continue
+        records.append(_describe(step, 'ok', time.perf_counter() - start, result))
+    return records
+
+
+def run_script(path: str, log: str | None = None, n_jobs: int | None = None, keep_going: bool = False) -> dict[str, Any]:
+    """
+    Runs a command script and writes a JSON log of every command.
+
+    Commands before the first project run first, in this process. The pipelines then run in up to `n_jobs`
+    worker processes.
+
+    Args:
+        path (str): The script.
+        log (str | None): Where to write the log. Defaults to the script path with '.log.json' appended.
+        n_jobs (int | None): Worker processes. Defaults to one per pipeline, at most one per core.
+        keep_going (bool): Keep running a pipeline after one of its commands failed.
+
+    Returns:
+        dict[str, Any]: The log: the script, start time, duration, overall status, the projects of every
+            pipeline, a one-line summary per pipeline and one record per command (line, command, project,
+            status, seconds, result, warning, note and error), in script order.
+    """
+    with open(path, 'r') as f:
+        steps = parse_script(f.read())
+    preamble, pipelines = build_pipelines(steps)
+    started = datetime.now().isoformat(timespec='seconds')
+    start = time.perf_counter()
+
+    records = run_pipeline(preamble, keep_going=True, quiet=False) if preamble else []
+    summary = []
+    if pipelines:
+        workers = n_jobs or min(len(pipelines), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(run_pipeline, pipeline, keep_going) for pipeline in pipelines]
+            for future in as_completed(futures):
+                records.extend(future.result())
+        for pipeline, future in zip(pipelines, futures):
+            projects = sorted({step.project for step in pipeline if step.project})
+            failures = sum(record['status'] == 'failed' for record in future.result())
+            summary.append(f"{', '.join(projects)}: {len(future.result())} commands, {failures} failed.")
+
+    records.sort(key=lambda record: record['index'])
+    result = {
+        'script': os.path.abspath(path),
+        'started': started,
+        'seconds': round(time.perf_counter() - start, 4),
+        'status': 'failed' if any(record['status'] == 'failed' for record in records) else 'ok',
+        'pipelines': [sorted({alias for step in pipeline for alias in step.touches}) for pipeline in pipelines],
+        'summary': summary,
+        'commands': records,
+    }
+    with open(log or path + '.log.json', 'w') as f:
+        json.dump(result, f, indent=4)
+    return result
@@ -2,6 +2,7 @@ from typing import Callable, Any, Optional
 from functools import wraps
 from colorama import Fore
 from dataclasses import dataclass
+from src.profiling import phase
     
 @dataclass    
 class CLIResult:
@@ -76,7 +77,8 @@ def chain(func: Callable) -> Callable:
     """
     @wraps(func)
     def wrapper(*args: Any, **kwargs: Any) -> CLIResult:
-        funcres = func(*args, **kwargs)
+        with phase(func.__name__):
+            funcres = func(*args, **kwargs)
         model, project = _parse_models(*args)
         if isinstance(funcres, CLIResult):
             RESULT = funcres
@@ -0,0 +1,270 @@
+"""Binary, typed column store for saved projects. Every DataFrame column is written to its own .npy file, string
+columns and class labels are dictionary encoded to integer codes, and nothing is pickled, so saving and
+loading a project is a sequence of raw array reads and writes instead of CSV parsing."""
+
+from pandas import DataFrame, Categorical, CategoricalDtype
+from pandas.api.types import is_bool_dtype, is_numeric_dtype, is_datetime64_dtype, is_timedelta64_dtype
+import numpy as np
+import shutil
+import json
+import os
+
+STORAGE_FORMAT = 2
+FRAME_DIR = 'df'
+SCHEMA_FILE = 'schema.json'
+# Cached model results, see MLOps.utils.result_cache.
+RESULTS_DIR = 'results'
+# Fitted final models, one joblib file per logged model.
+MODELS_DIR = 'models'
+# Files and directories a saved project may contain. df.csv is the layout of STORAGE_FORMAT 1.
+PROJECT_FILES = ('metadata.json', 'modeldata.json', 'X.npy', 'X.npz', 'y.npy', FRAME_DIR, RESULTS_DIR, MODELS_DIR, 'df.csv')
+# Rows copied at a time when rewriting a column file.
+BLOCK_ROWS = 1 << 20
+
+
+def _is_native(dtype) -> bool:
+    """Whether a column of this dtype can be written to .npy as it is."""
+    return isinstance(dtype, np.dtype) and (is_bool_dtype(dtype) or is_numeric_dtype(dtype)
+                                            or is_datetime64_dtype(dtype) or is_timedelta64_dtype(dtype))
+
+
+def write_frame(df: DataFrame, project_path: str) -> None:
+    """
+    Writes `df` to the column store in `project_path`, replacing any frame stored there.
+    Numeric, boolean and datetime columns keep their dtype. Categorical and string columns are stored as
+    integer codes (-1 for missing values) with their categories in the schema.
+
+    Args:
+        df (DataFrame): DataFrame to write. Its index is not stored.
+        project_path (str): Project directory.
+    """
+    frame_dir = os.path.join(project_path, FRAME_DIR)
+    shutil.rmtree(frame_dir, ignore_errors=True)
+    os.makedirs(frame_dir)
+
+    columns = []
+    for i, name in enumerate(df.columns):
+        series = df[name]
+        file = f'{i}.npy'
+        if _is_native(series.dtype):
+            np.save(os.path.join(frame_dir, file), series.to_numpy(), allow_pickle=False)
+            columns.append({'name': name, 'file': file, 'kind': 'native'})
+            continue
+        kind = 'category' if isinstance(series.dtype, CategoricalDtype) else 'object'
+        categorical = Categorical(series)
+        codes = categorical.codes.astype(np.int32)
+        np.save(os.path.join(frame_dir, file), codes, allow_pickle=False)
+        columns.append({'name': name, 'file': file, 'kind': kind,
+                        'categories': categorical.categories.tolist(), 'ordered': bool(categorical.ordered)})
+
+    with open(os.path.join(frame_dir, SCHEMA_FILE), 'w') as f:
+        json.dump({'n_rows': len(df), 'columns': columns}, f, indent=4)
+
+
+def read_frame(project_path: str, mmap_mode: str | None = None) -> DataFrame:
+    """
+    Reads the DataFrame stored in the column store in `project_path`.
+
+    Args:
+        project_path (str): Project directory.
+        mmap_mode (str | None): Memory-map the column files instead of reading them, see np.load.
+
+    Raises:
+        FileNotFoundError: If the project has no stored frame.
+
+    Returns:
+        DataFrame: The stored frame with a fresh RangeIndex. String columns are restored as object columns.
+            Native columns are not copied, so with `mmap_mode` they stay memory-mapped.
+    """
+    frame_dir = os.path.join(project_path, FRAME_DIR)
+    with open(os.path.join(frame_dir, SCHEMA_FILE), 'r') as f:
+        schema = json.load(f)
+
+    data = {}
+    for column in schema['columns']:
+        values = np.load(os.path.join(frame_dir, column['file']), mmap_mode=mmap_mode, allow_pickle=False)
+        if column['kind'] == 'native':
+            data[column['name']] = values
+            continue
+        categorical = Categorical.from_codes(values, categories=column['categories'], ordered=column['ordered'])
+        data[column['name']] = categorical if column['kind'] == 'category' else np.asarray(categorical, dtype=object)
+    return DataFrame(data, columns=[column['name'] for column in schema['columns']], copy=False)
+
+
+def _copy_column(source: str, dtype: np.dtype, n_rows: int, target: str, target_dtype: np.dtype) -> None:
+    """Copies a raw column file to a .npy file of `target_dtype`, a block of rows at a time."""
+    if n_rows == 0:
+        np.save(target, np.empty(0, dtype=target_dtype), allow_pickle=False)
+        return
+    values = np.memmap(source, dtype=dtype, mode='r', shape=(n_rows,))
+    out = np.lib.format.open_memmap(target, mode='w+', dtype=target_dtype, shape=(n_rows,))
+    for start in range(0, n_rows, BLOCK_ROWS):
+        out[start:start + BLOCK_ROWS] = values[start:start + BLOCK_ROWS]
+    out.flush()
+    del values, out
+
+
+def _narrowest_int(low: int, high: int) -> np.dtype:
+    """Smallest signed integer dtype holding every value in [low, high]."""
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+class ColumnStoreWriter:
+    """
+    Writes a DataFrame to the column store one chunk at a time, so a file larger than memory can be stored
+    without ever holding all of it. Chunks are appended to raw per-column files; close() converts them to the
+    .npy files and schema read_frame expects, narrowing integer columns to the smallest dtype that holds them.
+
+    Every chunk must have the same columns. A numeric column whose dtype widens in a later chunk (e.g. an
+    integer column that gains missing values) is promoted, but a numeric column cannot turn into strings.
+    Use as a context manager; the schema is only written by a successful close().
+
+    Attributes:
+        n_rows (int): Rows written so far.
+    """
+    def __init__(self, project_path: str) -> None:
+        self.frame_dir = os.path.join(project_path, FRAME_DIR)
+        shutil.rmtree(self.frame_dir, ignore_errors=True)
+        os.makedirs(self.frame_dir)
+        self.n_rows = 0
+        self._columns: list[dict] | None = None
+
+    def _raw_path(self, column: dict) -> str:
+        return os.path.join(self.frame_dir, column['file'][:-len('.npy')] + '.bin')
+
+    def _start(self, chunk: DataFrame) -> None:
+        """Fixes the columns and their kinds from the first chunk."""
+        self._columns = []
+        for i, name in enumerate(chunk.columns):
+            column: dict = {'name': name, 'file': f'{i}.npy'}
+            if _is_native(chunk[name].dtype):
+                column.update(kind='native', dtype=chunk[name].dtype, low=None, high=None)
+            else:
+                kind = 'category' if isinstance(chunk[name].dtype, CategoricalDtype) else 'object'
+                column.update(kind=kind, dtype=np.dtype(np.int32), categories=[], codes={})
+            self._columns.append(column)
+
+    def _promote(self, column: dict, dtype: np.dtype) -> None:
+        """Rewrites the rows written so far of a native column as `dtype`."""
+        raw_path = self._raw_path(column)
+        if self.n_rows:
+            values = np.memmap(raw_path, dtype=column['dtype'], mode='r', shape=(self.n_rows,))
+            with open(raw_path + '.tmp', 'wb') as f:
+                for start in range(0, self.n_rows, BLOCK_ROWS):
+                    values[start:start + BLOCK_ROWS].astype(dtype).tofile(f)
+            del values
+            os.replace(raw_path + '.tmp', raw_path)
+        column['dtype'] = dtype
+
+    def append(self, chunk: DataFrame) -> None:
+        """
+        Appends the rows of `chunk`.
+
+        Args:
+            chunk (DataFrame): Next rows of the frame. Its index is not stored.
+
+        Raises:
+            ValueError: If the columns differ from the first chunk or a numeric column turns into strings.
+        """
+        if self._columns is None:
+            self._start(chunk)
+        assert self._columns is not None
+        if list(chunk.columns) != [column['name'] for column in self._columns]:
+            raise ValueError("Every chunk must have the same columns.")
+
+        for column in self._columns:
+            series = chunk[column['name']]
+            if column['kind'] == 'native':
+                if not _is_native(series.dtype):
+                    raise ValueError(f"Column {column['name']} changes from {column['dtype']} to {series.dtype} between chunks. Read it without -chunksize.")
+                values = series.to_numpy()
+                try:
+                    dtype = np.result_type(column['dtype'], values.dtype)
+                except TypeError:
+                    raise ValueError(f"Column {column['name']} changes from {column['dtype']} to {series.dtype} between chunks. Read it without -chunksize.")
+                if dtype != column['dtype']:
+                    self._promote(column, dtype)
+                values = values.astype(dtype, copy=False)
+                if dtype.kind in 'iu' and len(values):
+                    low, high = int(values.min()), int(values.max())
+                    column['low'] = low if column['low'] is None else min(column['low'], low)
+                    column['high'] = high if column['high'] is None else max(column['high'], high)
+            else:
+                codes = column['codes']
+                for value in series.dropna().unique():
+                    if value not in codes:
+                        codes[value] = len(codes)
+                        column['categories'].append(value)
+                values = series.astype(object).map(codes).fillna(-1).to_numpy(dtype=np.int32)
+            with open(self._raw_path(column), 'ab') as f:
+                values.tofile(f)
+        self.n_rows += len(chunk)
+
+    def close(self) -> None:
+        """Converts the raw column files to .npy files and writes the schema."""
+        columns = []
+        for column in self._columns or []:
+            raw_path = self._raw_path(column)
+            if not os.path.exists(raw_path):
+                open(raw_path, 'wb').close()
+            target_dtype = column['dtype']
+            if column['kind'] == 'native' and target_dtype.kind == 'i' and column['low'] is not None:
+                target_dtype = _narrowest_int(column['low'], column['high'])
+            _copy_column(raw_path, column['dtype'], self.n_rows, os.path.join(self.frame_dir, column['file']), target_dtype)
+            os.remove(raw_path)
+            entry = {'name': column['name'], 'file': column['file'], 'kind': column['kind']}
+            if column['kind'] != 'native':
+                entry.update(categories=[_to_builtin(value) for value in column['categories']], ordered=False)
+            columns.append(entry)
+
+        with open(os.path.join(self.frame_dir, SCHEMA_FILE), 'w') as f:
+            json.dump({'n_rows': self.n_rows, 'columns': columns}, f, indent=4)
+
+    def __enter__(self) -> "ColumnStoreWriter":
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        if exc_type is None:
+            self.close()
+
+
+def _to_builtin(value):
+    """Converts NumPy scalars to the Python scalars json can write."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def encode_labels(y: np.ndarray) -> tuple[np.ndarray, list | None]:
+    """
+    Dictionary encodes an object target vector (e.g. string class labels) so it can be saved without pickling.
+
+    Args:
+        y (np.ndarray): Target vector.
+
+    Returns:
+        tuple[np.ndarray, list | None]: Integer codes and the sorted labels they index, or `y` and None if it
+            is not an object array.
+    """
+    if not y.dtype.hasobject:
+        return y, None
+    classes, codes = np.unique(y, return_inverse=True)
+    return codes.astype(np.int32), classes.tolist()
+
+
+def decode_labels(codes: np.ndarray, classes: list | None) -> np.ndarray:
+    """
+    Inverse of encode_labels.
+
+    Args:
+        codes (np.ndarray): Stored target vector.
+        classes (list | None): Labels returned by encode_labels.
+
+    Returns:
+        np.ndarray: The original target vector.
+    """
+    if classes is None:
+        return codes
+    return np.array(classes, dtype=object)[codes]
@@ -4,14 +4,19 @@ from src.commands.proj_cmds import (create, set_current_project,
                                     add_data, read_data, make_X_y, 
                                     clean_data, summary,
                                     save, load_project_from_file,
-                                    stats, list_cols
+                                    stats, list_cols, cache,
+                                    predict, foreach
                                     )
 from src.commands.ml_cmds import (linreg, mlpreg, naivebayes, mlpclas, 
                                   logisticreg, decisiontree, randomforest, 
                                   gradientboosting, log_from_best)
 from src.commands.config_cmds import config
+from src.commands.job_cmds import jobs, wait, cancel
+from src.commands.profile_cmds import profile
 from src.commands.plot_cmds import plot, show, pca_
 
+from src.profiling import PROFILER
+
 from typing import Any, Callable
 from pandas import DataFrame
 
@@ -54,17 +59,29 @@ COMMANDS: dict[str, CommandFn] = {
     "plot" : plot,
     "show" : show,
     "stats" : stats,
+    "cache" : cache,
+    "predict" : predict,
+    "foreach" : foreach,
+    "jobs" : jobs,
+    "wait" : wait,
+    "cancel" : cancel,
     "config" : config,
+    "profile" : profile,
     "pca" : pca_
 }
 
+# Commands that fit models on the current project and only change its model data; see ProjectStore.foreach.
+MODEL_COMMANDS = frozenset({"linearregression", "mlpregressor", "gaussiannb", "mlpclassifier", "logisticregression",
+                            "decisiontreeclassifier", "randomforestclassifier", "gradientboostingclassifier", "runall"})
+
 
 def cmd_exists(cmd: str) -> bool:
     return cmd in COMMANDS
 
 
 def execute_cmd(cmd: str, *args, **kwargs: Any) -> None | CLIResult:
-    result = COMMANDS[cmd](*args, **kwargs)
+    with PROFILER.command(cmd):
+        result = COMMANDS[cmd](*args, **kwargs)
     if isinstance(result, DataFrame): 
         result = result.to_string()
         result = CLIResult(result)
@@ -0,0 +1,67 @@
+from src.commands.project_store_protocol import Model
+from src.cliresult import chain, add_warning
+from src.cliresult import CLIResult
+
+def _merge(results: list[CLIResult]) -> CLIResult:
+    """Joins the results of several jobs into one, keeping their warnings and notes."""
+    if not results:
+        return CLIResult("No finished jobs.")
+    return CLIResult(result = '\n'.join(result.result for result in results if result.result),
+                     warning = ''.join(result.warning for result in results),
+                     note = ''.join(result.note for result in results))
+
+@chain
+def jobs(model: Model, *args, **kwargs) -> CLIResult:
+    """
+    Lists the background jobs of the session. Start one by ending a command with '&'.
+
+    Args:
+        model (Model): Parsed automatically by the command parser.
+
+    Returns:
+        CLIResult: One line per job with its number, status, runtime, project and command.
+    """
+    if args:
+        add_warning(model, f"Warning: extra arguments {args} will be ignored.")
+    elif kwargs:
+        add_warning(model, f"Warning: extra arguments {kwargs} will be ignored.")
+
+    return CLIResult(model.jobs.list_jobs())
+
+@chain
+def wait(model: Model, job_id: int | None = None, *args, **kwargs) -> CLIResult:
+    """
+    Waits for a background job, or for every running job if no number is given, and shows its result.
+
+    Args:
+        model (Model): Parsed automatically by the command parser.
+        job_id (int | None): Number of the job, as listed by 'jobs'.
+
+    Returns:
+        CLIResult: The results of the finished jobs, with their warnings and notes.
+    """
+    if args:
+        add_warning(model, f"Warning: extra arguments {args} will be ignored.")
+    elif kwargs:
+        add_warning(model, f"Warning: extra arguments {kwargs} will be ignored.")
+
+    return _merge(model.jobs.wait(model, job_id))
+
+@chain
+def cancel(model: Model, job_id: int, *args, **kwargs) -> CLIResult:
+    """
+    Cancels a running background job. Its project is left as it was before the job started.
+
+    Args:
+        model (Model): Parsed automatically by the command parser.
+        job_id (int): Number of the job, as listed by 'jobs'.
+
+    Returns:
+        CLIResult: Confirmation.
+    """
+    if args:
+        add_warning(model, f"Warning: extra arguments {args} will be ignored.")
+    elif kwargs:
+        add_warning(model, f"Warning: extra arguments {kwargs} will be ignored.")
+
+    return model.jobs.cancel(job_id)
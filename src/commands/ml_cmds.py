@@ -8,8 +8,24 @@ from src.commands.command_utils import MlModel
 from src.commands.project_store_protocol import Model
 from src.cliresult import CLIResult, chain
 
+from typing import Any
 import numpy as np
 
+def early_stopping_additionals(final_model: Any) -> dict[str, Any]:
+    """
+    Best iteration per fold and the iterations of the final model, if it was trained with -early_stop.
+
+    Args:
+        final_model (Any): The final model returned by generic_ml.
+
+    Returns:
+        dict[str, Any]: Entries for the model's additionals, empty without early stopping.
+    """
+    best_iterations = getattr(final_model, 'best_iterations_', None)
+    if best_iterations is None:
+        return {}
+    return {'best_iterations': best_iterations, 'final_iterations': int(np.median(best_iterations))}
+
 @chain
 def retrieve_X_y(model: Model) -> tuple[np.ndarray, np.ndarray]:
     """
@@ -32,6 +48,7 @@ def retrieve_X_y(model: Model) -> tuple[np.ndarray, np.ndarray]:
 def linreg(model: Model, *args, **kwargs) -> CLIResult:
     """
     Fits a linear regression model to the current project's data.
+    `-cv loo` evaluates it with exact leave-one-out predictions instead of k-fold cross-validation.
 
     Args:
         model (Model): Parsed automatically by the command parser.
@@ -41,9 +58,9 @@ def linreg(model: Model, *args, **kwargs) -> CLIResult:
     """
     X, y = retrieve_X_y(model = model).result
 
-    predictions, intercept, weights = linreg_impl(X, y, *args, **kwargs)
     project = model.get_current_project()
-    return project.log_model(MlModel.LINEAR_REGRESSION, predictions = predictions, params = {}, intercept = intercept, weights = weights)
+    predictions, intercept, weights, final_model = linreg_impl(X, y, *args, preprocessing = project.preprocessing, cache = project.result_cache, **kwargs)
+    return project.log_model(MlModel.LINEAR_REGRESSION, predictions = predictions, params = {}, intercept = intercept, weights = weights, cv = kwargs.get('cv', 'kfold'), final_model = final_model)
 
 @chain
 def mlpreg(model: Model, *args, **kwargs) -> CLIResult:
@@ -58,9 +75,9 @@ def mlpreg(model: Model, *args, **kwargs) -> CLIResult:
     """
     X, y = retrieve_X_y(model = model).result
 
-    predictions, intercept, weights = mlpreg_impl(X, y, *args, **kwargs)
     project = model.get_current_project()
-    return project.log_model(MlModel.MLPREG, predictions = predictions, params = {})
+    predictions, intercept, weights, final_model = mlpreg_impl(X, y, *args, preprocessing = project.preprocessing, cache = project.result_cache, **kwargs)
+    return project.log_model(MlModel.MLPREG, predictions = predictions, params = {}, final_model = final_model, **early_stopping_additionals(final_model))
 
 @chain
 def naivebayes(model: Model, *args, **kwargs) -> CLIResult:
@@ -75,9 +92,9 @@ def naivebayes(model: Model, *args, **kwargs) -> CLIResult:
     """
     X, y = retrieve_X_y(model = model).result
 
-    predictions, model_priors = naivebayes_impl(X, y, *args, **kwargs)
     project = model.get_current_project()
-    return project.log_model(MlModel.NAIVE_BAYES, predictions = predictions, params = {}, model_priors = model_priors)
+    predictions, model_priors, final_model = naivebayes_impl(X, y, *args, preprocessing = project.preprocessing, cache = project.result_cache, **kwargs)
+    return project.log_model(MlModel.NAIVE_BAYES, predictions = predictions, params = {}, model_priors = model_priors, final_model = final_model)
 
 @chain
 def mlpclas(model: Model, *args, **kwargs) -> CLIResult:
@@ -92,9 +109,9 @@ def mlpclas(model: Model, *args, **kwargs) -> CLIResult:
     """
     X, y = retrieve_X_y(model = model).result
 
-    predictions, intercept, weights = mlpclas_impl(X, y, *args, **kwargs)
     project = model.get_current_project()
-    return project.log_model(MlModel.MLPCLASS, predictions = predictions, params = {})
+    predictions, intercept, weights, final_model = mlpclas_impl(X, y, *args, preprocessing = project.preprocessing, cache = project.result_cache, **kwargs)
+    return project.log_model(MlModel.MLPCLASS, predictions = predictions, params = {}, final_model = final_model, **early_stopping_additionals(final_model))
 
 @chain
 def logisticreg(model: Model, *args, **kwargs) -> CLIResult:
@@ -109,9 +126,9 @@ def logisticreg(model: Model, *args, **kwargs) -> CLIResult:
     """
     X, y = retrieve_X_y(model = model).result
 
-    predictions, intercept, weights = logisticreg_impl(X, y, *args, **kwargs)
     project = model.get_current_project()
-    return project.log_model(MlModel.LOGISTIC_REGRESSION, predictions = predictions, params = {}, intercept = intercept, weights = weights)
+    predictions, intercept, weights, final_model = logisticreg_impl(X, y, *args, preprocessing = project.preprocessing, cache = project.result_cache, **kwargs)
+    return project.log_model(MlModel.LOGISTIC_REGRESSION, predictions = predictions, params = {}, intercept = intercept, weights = weights, final_model = final_model)
 
 @chain
 def decisiontree(model: Model, *args, **kwargs) -> CLIResult:
@@ -126,8 +143,8 @@ def decisiontree(model: Model, *args, **kwargs) -> CLIResult:
     """
     X, y = retrieve_X_y(model = model).result
 
-    predictions, model_importances, final_model = decisiontree_impl(X, y, *args, **kwargs)
     project = model.get_current_project()
+    predictions, model_importances, final_model = decisiontree_impl(X, y, *args, preprocessing = project.preprocessing, cache = project.result_cache, **kwargs)
     return project.log_model(MlModel.DECISION_TREE, predictions = predictions, params = {}, importances = model_importances, final_model = final_model)
 
 @chain
@@ -143,8 +160,8 @@ def randomforest(model: Model, *args, **kwargs) -> CLIResult:
     """
     X, y = retrieve_X_y(model = model).result
 
-    predictions, model_importances, final_model = randomforest_impl(X, y, *args, **kwargs)
     project = model.get_current_project()
+    predictions, model_importances, final_model = randomforest_impl(X, y, *args, preprocessing = project.preprocessing, cache = project.result_cache, **kwargs)
     return project.log_model(MlModel.RANDOM_FOREST, predictions = predictions, params = {}, importances = model_importances, final_model = final_model)
 
 @chain
@@ -160,9 +177,9 @@ def gradientboosting(model: Model, *args, **kwargs) -> CLIResult:
     """
     X, y = retrieve_X_y(model = model).result
 
-    predictions, model_importances, final_model = gradientboosting_impl(X, y, *args, **kwargs)
     project = model.get_current_project()
-    return project.log_model(MlModel.GRADIENT_BOOSTING_CLASSIFIER, predictions = predictions, params = {}, importances = model_importances, final_model = final_model)
+    predictions, model_importances, final_model = gradientboosting_impl(X, y, *args, preprocessing = project.preprocessing, cache = project.result_cache, **kwargs)
+    return project.log_model(MlModel.GRADIENT_BOOSTING_CLASSIFIER, predictions = predictions, params = {}, importances = model_importances, final_model = final_model, **early_stopping_additionals(final_model))
 
 @chain
 def log_from_best(model: Model, *args, **kwargs) -> CLIResult:
@@ -176,7 +193,8 @@ def log_from_best(model: Model, *args, **kwargs) -> CLIResult:
     Args:
         model (Model): The model object containing project details and methods for logging predictions.
         *args: Additional positional arguments to pass to the logging method.
-        **kwargs: Additional keyword arguments to pass to the logging method.
+        **kwargs: Additional keyword arguments to pass to the logging method, e.g. n_values, 
+            search ('grid', 'random' or 'halving'), max_fits and max_time.
 
     Returns:
         CLIResult: A log string containing the predictions from the best performing model.
@@ -0,0 +1,37 @@
+from src.commands.project_store_protocol import Model
+from src.cliresult import chain, add_warning
+from src.cliresult import CLIResult
+from src.profiling import PROFILER
+
+@chain
+def profile(model: Model, cmd: str, path: str = 'profile.jsonl', memory: bool = True, *args, **kwargs) -> CLIResult:
+    """
+    Records the time and memory of every command and of its phases (load, encode, fold fit, predict, refit, CI computation).
+
+    Args:
+        model (Model): Parsed automatically by the command parser.
+        cmd (str): 'on', 'off', 'show', 'clear' or 'export'.
+        path (str): JSON lines file 'export' appends the records to.
+        memory (bool): With 'on', also trace allocated bytes. Tracing slows allocations down.
+
+    Returns:
+        CLIResult: Confirmation, or the profile for 'show'.
+    """
+    if args:
+        add_warning(model, f"Warning: extra arguments {args} will be ignored.")
+    elif kwargs:
+        add_warning(model, f"Warning: extra arguments {kwargs} will be ignored.")
+
+    if cmd == 'on':
+        PROFILER.enable(memory = memory)
+        return CLIResult(f"Profiling on{'' if memory else ' (without memory tracing)'}.")
+    if cmd == 'off':
+        PROFILER.disable()
+        return CLIResult(f"Profiling off. {len(PROFILER.records)} records kept.")
+    if cmd == 'show':
+        return CLIResult(PROFILER.summary())
+    if cmd == 'clear':
+        return CLIResult(f"Records removed: {PROFILER.clear()}")
+    if cmd == 'export':
+        return CLIResult(f"{PROFILER.export(path)} records written to {path}.")
+    raise ValueError(f"Invalid command {cmd}. Use 'on', 'off', 'show', 'clear' or 'export'.")
@@ -94,7 +94,7 @@ def pcp(model: Model) -> CLIResult:
     return model.pcp()
 
 @chain
-def add_data(model: Model, df_name: str, delimiter: str = ',', *args, **kwargs) -> CLIResult:
+def add_data(model: Model, df_name: str, delimiter: str = ',', chunksize: int | None = None, clean: bool = False, *args, **kwargs) -> CLIResult:
     """
     Adds a DataFrame to the current project.
     
@@ -110,6 +110,8 @@ def add_data(model: Model, df_name: str, delimiter: str = ',', *args, **kwargs)
         model (Model): Parsed automatically by the command parser.
         alias (str): Name of the DataFrame to add.
         delimiter (str): Delimiter used in the DataFrame (ignored if format is not '.txt' or '.csv').
+        chunksize (int | None): Read '.txt' and '.csv' files in chunks of this many rows, spilling each to disk.
+        clean (bool): Drop rows with missing values while reading.
     """
     if args:
         add_warning(model, f"Warning: extra arguments {args} will be ignored.")
@@ -118,7 +120,7 @@ def add_data(model: Model, df_name: str, delimiter: str = ',', *args, **kwargs)
         
     project = model.get_current_project()
         
-    return project.add_df(df_name, delimiter = delimiter)
+    return project.add_df(df_name, delimiter = delimiter, chunksize = chunksize, clean = clean)
 
 @chain
 def read_data(model: Model, head: int = 5, *args, **kwargs) -> CLIResult:
@@ -162,13 +164,15 @@ def list_cols(model: Model, *args, **kwargs) -> CLIResult:
     return project.list_cols()
 
 @chain
-def make_X_y(model: Model, target: str, *args, **kwargs) -> CLIResult:
+def make_X_y(model: Model, target: str, optimize: bool = False, sparse: bool = False, *args, **kwargs) -> CLIResult:
     """
     Creates the X and y arrays from the current project.
 
     Args:
         model (Model): Parsed automatically by the command parser.
         target (str): Name of the target column.
+        optimize (bool): Use float32 for X (and a regression y) where precision allows and report the memory saved.
+        sparse (bool): One-hot encode string columns into a sparse CSR X.
 
     Returns:
         CLIResult: Optional message to display to the user.
@@ -180,7 +184,7 @@ def make_X_y(model: Model, target: str, *args, **kwargs) -> CLIResult:
         
     project = model.get_current_project()
         
-    return project.make_X_y(target)
+    return project.make_X_y(target, optimize = optimize, sparse = sparse)
 
 @chain
 def clean_data(model: Model, *args, **kwargs) -> CLIResult:
@@ -269,13 +273,14 @@ def save(model: Model, overwrite: bool = False, *args, **kwargs) -> CLIResult:
     return project.save(overwrite=overwrite)
 
 @chain
-def load_project_from_file(model: Model, alias: str, *args, **kwargs) -> CLIResult:
+def load_project_from_file(model: Model, alias: str, lazy: bool = False, *args, **kwargs) -> CLIResult:
     """
     Loads a project from a file.
 
     Args:
         model (Model): Parsed automatically by the command parser.
         alias (str): Alias of the project to load.
+        lazy (bool): Read the dataframe, X and y only when first used, memory-mapping X and y.
 
     Returns:
         CLIResult: Optional message to display to the user.
@@ -285,7 +290,7 @@ def load_project_from_file(model: Model, alias: str, *args, **kwargs) -> CLIResu
     elif kwargs:
         add_warning(model, f"Warning: extra arguments {kwargs} will be ignored.")
         
-    return model.load_project_from_file(alias)
+    return model.load_project_from_file(alias, lazy = lazy)
 
 @chain
 def stats(model: Model, *args, **kwargs) -> CLIResult:
@@ -305,4 +310,64 @@ def stats(model: Model, *args, **kwargs) -> CLIResult:
         
     project = model.get_current_project()
         
-    return project.stats()
\ No newline at end of file
+    return project.stats()
+
+@chain
+def cache(model: Model, cmd: str, *args, **kwargs) -> CLIResult:
+    """
+    Shows or clears the cached results of model commands for the current project.
+
+    Args:
+        model (Model): Parsed automatically by the command parser.
+        cmd (str): 'stats' or 'clear'.
+
+    Returns:
+        CLIResult: The cache summary, or the number of results removed.
+    """
+    if args:
+        add_warning(model, f"Warning: extra arguments {args} will be ignored.")
+    elif kwargs:
+        add_warning(model, f"Warning: extra arguments {kwargs} will be ignored.")
+        
+    project = model.get_current_project()
+        
+    return project.cache(cmd)
+
+@chain
+def predict(model: Model, df_name: str, *args, **kwargs) -> CLIResult:
+    """
+    Predicts a data file with a fitted model of the current project and writes the predictions to a CSV file.
+
+    Args:
+        model (Model): Parsed automatically by the command parser.
+        df_name (str): Name of the data file to predict.
+        **kwargs: model, chunksize, output and delimiter, see ShellProject.predict.
+
+    Returns:
+        CLIResult: Where the predictions were written.
+    """
+    if args:
+        add_warning(model, f"Warning: extra arguments {args} will be ignored.")
+        
+    project = model.get_current_project()
+        
+    return project.predict(df_name, **kwargs)
+
+@chain
+def foreach(model: Model, projects: list[str] | str, cmd: str, *args, **kwargs) -> CLIResult:
+    """
+    Runs a model command on several projects concurrently, e.g. foreach [p1, p2] randomforestclassifier -n_splits 5.
+
+    Args:
+        model (Model): Parsed automatically by the command parser.
+        projects (list[str] | str): The projects to run the command on.
+        cmd (str): The model command.
+        *args, **kwargs: Arguments of the model command.
+
+    Returns:
+        CLIResult: The result of the command on every project.
+    """
+    if isinstance(projects, str):
+        projects = [projects]
+        
+    return model.foreach([str(alias) for alias in projects], cmd, *args, **kwargs)
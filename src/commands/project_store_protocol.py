@@ -4,14 +4,18 @@ from src.commands.command_utils import MlModel
 from src.MLOps.utils.base import BaseEstimator
 from src.cliresult import CLIResult
 
-from typing import Protocol
+from typing import Protocol, TYPE_CHECKING
 import numpy as np
 
+if TYPE_CHECKING:
+    from src.jobs import JobManager
+
 
 
 class Model(Protocol):
     projects: dict[str, ShellProject]
     current_project: ...
+    jobs: "JobManager"
     def create(self, alias: str, type: ProjectType) -> CLIResult: ...
 
     def delete(self, alias: str, from_dir: bool) -> CLIResult: ...
@@ -22,6 +26,8 @@ class Model(Protocol):
 
     def pcp(self) -> CLIResult: ...
     
-    def load_project_from_file(self, alias: str) -> CLIResult: ...
+    def load_project_from_file(self, alias: str, lazy: bool = False) -> CLIResult: ...
     
+    def foreach(self, aliases: list[str], cmd: str, *args, **kwargs) -> CLIResult: ...
+
     def get_current_project(self) -> ShellProject: ...
\ No newline at end of file
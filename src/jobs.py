@@ -0,0 +1,264 @@
+"""Background jobs of the shell. A command suffixed with `&` runs in a child process on its own copy of the
+current project, so the prompt stays free. The updated project replaces the original once the job is collected,
+and the project refuses commands that would change it while the job runs."""
+
+from src.commands.command import Command
+from src.cliresult import CLIResult
+from src.shell_project import ShellProject
+
+from colorama import Fore
+from dataclasses import dataclass, field
+from multiprocessing.connection import Connection
+from typing import Any
+import multiprocessing
+import os
+import sys
+import time
+
+# Commands that manage the store, the session or matplotlib windows; they only run in the foreground.
+FOREGROUND_ONLY = frozenset({'create', 'chproj', 'delete', 'load', 'listproj', 'config', 'help',
+                             'plot', 'show', 'pca', 'foreach', 'profile', 'jobs', 'wait', 'cancel'})
+# Commands that leave the current project unchanged, allowed while it is busy with a job.
+READ_ONLY = frozenset({'create', 'chproj', 'listproj', 'pcp', 'help', 'config', 'summary', 'view',
+                       'listcols', 'stats', 'profile', 'jobs', 'wait', 'cancel'})
+
+
+def run_on_project(store_class: type, alias: str, project: ShellProject, command: str | Command) -> tuple[CLIResult | None, str | None]:
+    """
+    Runs `command` in a worker process against a store holding only `project`, which the command updates in place.
+    Output of the command (progress bars, notes) is discarded, as it would garble the output of the parent.
+    Used by background jobs and by foreach.
+
+    Returns:
+        tuple[CLIResult | None, str | None]: The result, or the error message if the command raised.
+    """
+    sys.stdout = sys.stderr = open(os.devnull, 'w')
+    store = store_class()
+    store.projects[alias] = project
+    store.current_project = alias
+    try:
+        if isinstance(command, str):
+            command = Command.from_string(command)
+        return command.execute(store), None
+    except Exception as e:
+        return None, f'{type(e).__name__}: {e}'
+
+
+def _run_job(store_class: type, alias: str, project: ShellProject, command: str, connection: Connection) -> None:
+    """Runs `command` (see run_on_project), then sends the result and the updated project back."""
+    try:
+        result, error = run_on_project(store_class, alias, project, command)
+        if error is None:
+            # Whatever the command left unloaded has to be read before the project can be pickled.
+            project.load_deferred()
+        connection.send((result, project, None) if error is None else (None, None, error))
+    except Exception as e:
+        connection.send((None, None, f'{type(e).__name__}: {e}'))
+    finally:
+        connection.close()
+
+
+@dataclass
+class Job:
+    """
+    A command running in a child process.
+
+    Attributes:
+        id (int): Number shown by `jobs` and taken by `wait` and `cancel`.
+        command (str): The command as typed, without the `&`.
+        alias (str): The project the command runs on.
+        status (str): 'running', 'done', 'failed' or 'cancelled'.
+        result (CLIResult | None): The result, once the job is no longer running.
+    """
+    id: int
+    command: str
+    alias: str
+    project: ShellProject = field(repr=False)
+    process: Any = field(repr=False)
+    connection: Connection = field(repr=False)
+    started: float = field(default_factory=time.perf_counter)
+    finished: float | None = None
+    status: str = 'running'
+    result: CLIResult | None = None
+    delivered: bool = False
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+
+class JobManager:
+    """
+    Background jobs of one ProjectStore.
+
+    Every job works on a copy of its project in a child process, so a running job never races a foreground
+    command: the project is only replaced, in the shell's thread, when the job is collected (see poll and wait).
+    A cancelled job's process is terminated and the project is left as it was when the job started.
+    """
+    def __init__(self) -> None:
+        self.jobs: dict[int, Job] = {}
+        self._next_id = 1
+
+    def busy(self, alias: str | None) -> Job | None:
+        """The running job of project `alias`, if any."""
+        for job in self.jobs.values():
+            if job.alias == alias and job.status == 'running':
+                return job
+        return None
+
+    def check(self, cmd: str, alias: str | None) -> None:
+        """
+        Raises if `cmd` would change project `alias` while one of its jobs runs.
+
+        Args:
+            cmd (str): Name of the command about to run in the foreground.
+            alias (str | None): The current project.
+        """
+        job = self.busy(alias)
+        if job is not None and cmd not in READ_ONLY:
+            raise ValueError(f"Project {alias} is busy with job {job.id} ({job.command}). "
+                             f"Use 'wait {job.id}' or 'cancel {job.id}' first.")
+
+    def submit(self, command: str, model: Any) -> CLIResult:
+        """
+        Starts `command` on the current project of `model` in a child process.
+
+        Args:
+            command (str): The command, without the `&`.
+            model (Any): The ProjectStore.
+
+        Returns:
+            CLIResult: The job number.
+        """
+        cmd = Command.from_string(command).cmd
+        if cmd in FOREGROUND_ONLY:
+            raise ValueError(f"Command '{cmd}' cannot run in the background.")
+        alias = model.current_project
+        if not alias:
+            raise ValueError("No current project set.")
+        self.check(cmd, alias)
+        project = model.projects[alias]
+        context = multiprocessing.get_context()
+        if context.get_start_method() != 'fork':
+            # The project is pickled to the child, which lazy loaders cannot be.
+            project.load_deferred()
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(target=_run_job, args=(type(model), alias, project, command, sender), daemon=True)
+        process.start()
+        sender.close()
+        job = Job(id=self._next_id, command=command, alias=alias, project=project,
+                  process=process, connection=receiver)
+        self.jobs[job.id] = job
+        self._next_id += 1
+        return CLIResult(f"[{job.id}] {command} started on {alias}.")
+
+    def _finish(self, job: Job, model: Any) -> None:
+        """Receives the result of a job whose process has sent it (or died) and swaps its project in."""
+        try:
+            result, project, error = job.connection.recv()
+        except EOFError:
+            result, project, error = None, None, f"process exited with code {job.process.exitcode}"
+        job.connection.close()
+        job.process.join()
+        job.finished = time.perf_counter()
+        if error is not None:
+            job.status = 'failed'
+            job.result = CLIResult(f"[{job.id}] {job.command} failed: {error}", c_message=Fore.RED)
+            return
+        job.status = 'done'
+        if result is None:
+            result = CLIResult('')
+        if model.projects.get(job.alias) is job.project:
+            model.projects[job.alias] = project
+        else:
+            result.warning += f"Warning: project {job.alias} was deleted or replaced; the result of job {job.id} was discarded.\n"
+        result.result = f"[{job.id}] {job.command} done in {job.elapsed:.1f}s." + (f"\n{result.result}" if result.result else '')
+        job.result = result
+
+    def poll(self, model: Any) -> list[CLIResult]:
+        """
+        Collects every job that finished since the last call.
+
+        Args:
+            model (Any): The ProjectStore the jobs were started from.
+
+        Returns:
+            list[CLIResult]: Results of the newly finished jobs, warnings and notes included.
+        """
+        for job in self.jobs.values():
+            if job.status == 'running' and (job.connection.poll() or not job.process.is_alive()):
+                self._finish(job, model)
+        return self._undelivered()
+
+    def _undelivered(self) -> list[CLIResult]:
+        results = []
+        for job in self.jobs.values():
+            if job.status != 'running' and not job.delivered and job.result is not None:
+                job.delivered = True
+                results.append(job.result)
+        return results
+
+    def _get(self, job_id: int) -> Job:
+        if job_id not in self.jobs:
+            raise ValueError(f"Job {job_id} does not exist.")
+        return self.jobs[job_id]
+
+    def wait(self, model: Any, job_id: int | None = None) -> list[CLIResult]:
+        """
+        Blocks until job `job_id` (every running job if None) has finished.
+
+        Args:
+            model (Any): The ProjectStore the jobs were started from.
+            job_id (int | None): The job to wait for.
+
+        Returns:
+            list[CLIResult]: Results of every finished job not shown yet, and of `job_id` in any case.
+        """
+        waiting = [self._get(job_id)] if job_id is not None else list(self.jobs.values())
+        for job in waiting:
+            if job.status == 'running':
+                job.connection.poll(None)
+                self._finish(job, model)
+        if job_id is not None:
+            self.jobs[job_id].delivered = False
+        return self._undelivered()
+
+    def cancel(self, job_id: int) -> CLIResult:
+        """
+        Terminates a running job. Its project stays as it was when the job started.
+
+        Args:
+            job_id (int): The job to cancel.
+
+        Returns:
+            CLIResult: Confirmation.
+        """
+        job = self._get(job_id)
+        if job.status != 'running':
+            raise ValueError(f"Job {job_id} is already {job.status}.")
+        job.process.terminate()
+        job.process.join()
+        job.connection.close()
+        job.finished = time.perf_counter()
+        job.status = 'cancelled'
+        job.delivered = True
+        return CLIResult(f"[{job.id}] {job.command} cancelled after {job.elapsed:.1f}s. Project {job.alias} is unchanged.")
+
+    def list_jobs(self) -> str:
+        """One line per job: number, status, seconds elapsed, project and command."""
+        if not self.jobs:
+            return "No jobs."
+        return '\n'.join(f"[{job.id}] {job.status:<9} {job.elapsed:7.1f}s  {job.alias}: {job.command}"
+                         for job in self.jobs.values())
+
+    def shutdown(self) -> int:
+        """
+        Cancels every running job, e.g. when the shell exits.
+
+        Returns:
+            int: Number of jobs cancelled.
+        """
+        running = [job for job in self.jobs.values() if job.status == 'running']
+        for job in running:
+            self.cancel(job.id)
+        return len(running)
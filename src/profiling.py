@@ -0,0 +1,194 @@
+"""Opt-in instrumentation of shell commands. Every command, every function decorated with `chain` and the named
+phases of the ML pipeline (load, encode, fold fit, predict, refit, CI computation) record their wall time, CPU
+time, allocated memory and the peak resident set size once profiling is on. While it is off, a phase costs one
+attribute lookup."""
+
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import Any, ContextManager
+import json
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore
+
+_DISABLED: ContextManager[None] = nullcontext()
+
+
+def peak_rss_bytes() -> int | None:
+    """Peak resident set size of this process so far, or None where the platform does not report it."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS.
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+@dataclass
+class _Frame:
+    name: str
+    wall: float
+    cpu: float
+    allocated: int
+    peak: int
+
+
+class Profiler:
+    """
+    Collects one record per command and per phase while enabled.
+
+    Memory is measured with tracemalloc, which is only started by enable(memory=True) since it slows Python
+    allocations down. Phases nest: a record's peak includes the peaks of the phases inside it. Only the calling
+    thread of this process is measured, so work dispatched to worker processes (n_jobs, foreach, background
+    jobs) shows up as the time its parent phase waited for it.
+
+    Attributes:
+        enabled (bool): Whether phases are recorded.
+        records (list[dict[str, Any]]): Command, phase, depth, wall and CPU seconds, net and peak bytes
+            allocated during the phase and the process' peak RSS after it.
+    """
+    def __init__(self) -> None:
+        self.enabled = False
+        self.records: list[dict[str, Any]] = []
+        self._memory = False
+        self._stack: list[_Frame] = []
+        self._command: str | None = None
+
+    def enable(self, memory: bool = True) -> None:
+        """Starts recording. `memory` also traces allocations."""
+        self.enabled = True
+        self._memory = memory
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def disable(self) -> None:
+        """Stops recording. The records are kept."""
+        self.enabled = False
+        if self._memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._memory = False
+
+    def clear(self) -> int:
+        """Drops the records and returns how many there were."""
+        n_records = len(self.records)
+        self.records.clear()
+        return n_records
+
+    def phase(self, name: str) -> ContextManager[None]:
+        """Context manager recording `name` if profiling is enabled, and doing nothing otherwise."""
+        if not self.enabled:
+            return _DISABLED
+        return _Phase(self, name)
+
+    def command(self, name: str) -> ContextManager[None]:
+        """Like phase, for a whole shell command: the phases inside it are attributed to `name`."""
+        if not self.enabled:
+            return _DISABLED
+        return _Phase(self, name, command=True)
+
+    def _enter(self, name: str) -> None:
+        allocated = 0
+        if self._memory:
+            allocated, peak = tracemalloc.get_traced_memory()
+            # The peak since the last reset belongs to every open phase; resetting starts this one's.
+            for frame in self._stack:
+                frame.peak = max(frame.peak, peak)
+            tracemalloc.reset_peak()
+        self._stack.append(_Frame(name, time.perf_counter(), time.process_time(), allocated, allocated))
+
+    def _exit(self) -> None:
+        frame = self._stack.pop()
+        wall, cpu = time.perf_counter() - frame.wall, time.process_time() - frame.cpu
+        record: dict[str, Any] = {
+            'command': self._command,
+            'phase': frame.name,
+            'depth': len(self._stack),
+            'wall_s': wall,
+            'cpu_s': cpu,
+            'net_bytes': None,
+            'peak_bytes': None,
+            'peak_rss_bytes': peak_rss_bytes(),
+        }
+        if self._memory and tracemalloc.is_tracing():
+            allocated, peak = tracemalloc.get_traced_memory()
+            frame.peak = max(frame.peak, peak)
+            for parent in self._stack:
+                parent.peak = max(parent.peak, frame.peak)
+            record['net_bytes'] = allocated - frame.allocated
+            record['peak_bytes'] = frame.peak - frame.allocated
+        self.records.append(record)
+
+    def summary(self) -> str:
+        """
+        Records aggregated per command and phase, slowest first.
+
+        Returns:
+            str: One line per command and phase with its calls, total wall and CPU seconds and largest peak.
+        """
+        if not self.records:
+            return "No profile recorded. Use 'profile on' and run some commands."
+        totals: dict[tuple[str | None, str], dict[str, Any]] = {}
+        for record in self.records:
+            total = totals.setdefault((record['command'], record['phase']),
+                                      {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'peak_bytes': None, 'depth': record['depth']})
+            total['calls'] += 1
+            total['wall_s'] += record['wall_s']
+            total['cpu_s'] += record['cpu_s']
+            if record['peak_bytes'] is not None:
+                total['peak_bytes'] = max(total['peak_bytes'] or 0, record['peak_bytes'])
+        lines = [f"{'command':<24}{'phase':<32}{'calls':>7}{'wall s':>10}{'cpu s':>10}{'peak MB':>10}"]
+        for (command, name), total in sorted(totals.items(), key=lambda item: (item[1]['depth'] > 0, -item[1]['wall_s'])):
+            peak = '-' if total['peak_bytes'] is None else f"{total['peak_bytes'] / 1024 ** 2:.1f}"
+            lines.append(f"{str(command):<24}{'  ' * total['depth'] + name:<32}{total['calls']:>7}"
+                         f"{total['wall_s']:>10.3f}{total['cpu_s']:>10.3f}{peak:>10}")
+        rss = peak_rss_bytes()
+        if rss is not None:
+            lines.append(f"Peak RSS: {rss / 1024 ** 2:.1f} MB")
+        return '\n'.join(lines)
+
+    def export(self, path: str) -> int:
+        """
+        Appends every record to a JSON lines file.
+
+        Args:
+            path (str): The file.
+
+        Returns:
+            int: Number of records written.
+        """
+        with open(path, 'a') as f:
+            for record in self.records:
+                f.write(json.dumps(record) + '\n')
+        return len(self.records)
+
+
+class _Phase:
+    __slots__ = ('profiler', 'name', 'is_command', 'previous')
+
+    def __init__(self, profiler: Profiler, name: str, command: bool = False) -> None:
+        self.profiler = profiler
+        self.name = name
+        self.is_command = command
+        self.previous: str | None = None
+
+    def __enter__(self) -> None:
+        if self.is_command:
+            self.previous, self.profiler._command = self.profiler._command, self.name
+        self.profiler._enter(self.name)
+
+    def __exit__(self, *exc: Any) -> None:
+        self.profiler._exit()
+        if self.is_command:
+            self.profiler._command = self.previous
+
+
+PROFILER = Profiler()
+
+
+def phase(name: str) -> ContextManager[None]:
+    """Records the enclosed block as phase `name` of the running command when profiling is enabled."""
+    return PROFILER.phase(name)
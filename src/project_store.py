@@ -1,15 +1,37 @@
 from src.commands.project_store_protocol import Model
 from src.shell_project import ShellProject, ProjectType
 from src.cliresult import chain, add_warning, CLIResult
+from src.column_store import PROJECT_FILES
+from src.jobs import JobManager, run_on_project
+from src.commands.command import Command
+from src.commands.command_factory import MODEL_COMMANDS
 
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
+from typing import Any
 import os
 import json
+import shutil
+
+def _run_on_copy(store_class: type, alias: str, project: ShellProject, cmd: str, args: tuple, kwargs: dict[str, Any]) -> tuple:
+    """
+    Runs a model command on a training copy of a project (see run_on_project) and ships back only what it changed.
+
+    Returns:
+        tuple: The result, the updated modeldata, the newly fitted models and the result cache, or an error message.
+    """
+    result, error = run_on_project(store_class, alias, project, Command(cmd, list(args), kwargs))
+    if error is not None:
+        return None, None, None, None, error
+    return result, project.modeldata, project.models, project.result_cache, None
+
 
 @dataclass
 class ProjectStore(Model):
     projects: dict[str, ShellProject] = field(default_factory=dict)
     current_project: str | None  = None
+    # Commands started with a trailing '&'; see Shell.run.
+    jobs: JobManager = field(default_factory=JobManager, repr=False)
 
     @chain
     def create(self, alias: str, type: ProjectType) -> CLIResult:
@@ -61,8 +83,10 @@ class ProjectStore(Model):
                 raise ValueError(f"Project {alias} does not exist in projects directory.")
             os.chdir(project_dir)
             for file in os.listdir():
-                assert file in ['metadata.json', 'df.csv', 'modeldata.json', 'X.npy', 'y.npy'], f"Unexpected file {file} in project directory."
-                if file in ['metadata.json', 'df.csv', 'modeldata.json', 'X.npy', 'y.npy']:
+                assert file in PROJECT_FILES, f"Unexpected file {file} in project directory."
+                if os.path.isdir(file):
+                    shutil.rmtree(file)
+                else:
                     os.remove(file)
                 
             os.chdir('..')
@@ -99,7 +123,7 @@ class ProjectStore(Model):
         
         return CLIResult(self.projects[self.current_project].__str__())
     
-    def load_project_from_file(self, alias: str) -> CLIResult:
+    def load_project_from_file(self, alias: str, lazy: bool = False) -> CLIResult:
         with open('config/paths.json', 'r') as f:
             paths = json.load(f)
         project_path = paths['projects_dir'] + alias + '/'
@@ -115,12 +139,63 @@ class ProjectStore(Model):
             self.projects[alias].project_description = description
             self.projects[alias].is_cleaned = is_cleaned
             self.projects[alias].feature_names = feature_names
+            self.projects[alias].encoding = metadata.get('encoding', {})
         else:
             raise ValueError(f"Project {alias} not found.")
         if not self.current_project:
             raise ValueError("No current project set.")
-        return self.projects[self.current_project].load_project_from_file(alias = alias)
+        return self.projects[self.current_project].load_project_from_file(alias = alias, lazy = lazy)
     
+    def foreach(self, aliases: list[str], cmd: str, *args: Any, **kwargs: Any) -> CLIResult:
+        """
+        Runs the same model command on several projects concurrently, one worker process per project.
+
+        Workers receive a training copy of their project (see ShellProject.training_copy). A project's modeldata,
+        models and result cache are only replaced once its command has succeeded, all at once, so a failing
+        command leaves its project as it was.
+
+        Args:
+            aliases (list[str]): The projects.
+            cmd (str): A model command, e.g. "randomforestclassifier".
+            *args, **kwargs: Arguments of the model command.
+
+        Returns:
+            CLIResult: The result of every project, with the warnings and notes of each prefixed by its project.
+        """
+        if cmd not in MODEL_COMMANDS:
+            raise ValueError(f"foreach runs model commands ({', '.join(sorted(MODEL_COMMANDS))}), not '{cmd}'.")
+        if not aliases:
+            raise ValueError("No projects given.")
+        for alias in aliases:
+            if alias not in self.projects:
+                raise ValueError(f"Project {alias} does not exist.")
+            job = self.jobs.busy(alias)
+            if job is not None:
+                raise ValueError(f"Project {alias} is busy with job {job.id} ({job.command}).")
+        copies = {alias: self.projects[alias].training_copy() for alias in dict.fromkeys(aliases)}
+
+        with ProcessPoolExecutor(max_workers=min(len(copies), os.cpu_count() or 1)) as executor:
+            futures = {alias: executor.submit(_run_on_copy, type(self), alias, copy, cmd, args, kwargs)
+                       for alias, copy in copies.items()}
+            outcomes = {alias: future.result() for alias, future in futures.items()}
+
+        merged = CLIResult('')
+        lines, failed = [], 0
+        for alias, (result, modeldata, models, result_cache, error) in outcomes.items():
+            if error is not None:
+                failed += 1
+                merged.warning += f"{alias}: Error: {error}\n"
+                continue
+            project = self.projects[alias]
+            project.modeldata, project.models, project.result_cache = modeldata, {**project.models, **models}, result_cache
+            if result is None:
+                continue
+            lines.append(f"{alias}: {result.result}")
+            merged.warning += ''.join(f"{alias}: {line}\n" for line in result.warning.splitlines() if line)
+            merged.note += ''.join(f"{alias}: {line}\n" for line in result.note.splitlines() if line)
+        merged.result = '\n'.join(lines + [f"{cmd} ran on {len(copies) - failed} of {len(copies)} projects."])
+        return merged
+
     def get_current_project(self) -> ShellProject:
         if not self.current_project:
             raise ValueError("No current project set.")
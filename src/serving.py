@@ -0,0 +1,228 @@
+"""HTTP prediction endpoint for a fitted project model. Concurrent requests are micro-batched: the rows of every
+request that arrives within a few milliseconds are encoded and predicted by one vectorised call."""
+
+from src.shell_project import ShellProject
+
+from pandas import DataFrame, concat
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import Future
+from collections import deque
+from typing import Any, Callable
+import numpy as np
+import threading
+import queue
+import json
+import time
+
+# Most recent request latencies the percentiles are computed over.
+LATENCY_WINDOW = 10_000
+
+
+class LatencyStats:
+    """
+    Thread-safe request counters and a sliding window of request latencies.
+    """
+    def __init__(self, window: int = LATENCY_WINDOW) -> None:
+        self._lock = threading.Lock()
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._started = time.perf_counter()
+        self.requests = 0
+        self.rows = 0
+        self.batches = 0
+        self.errors = 0
+
+    def record(self, seconds: float, n_rows: int) -> None:
+        """Records one answered request."""
+        with self._lock:
+            self._latencies.append(seconds)
+            self.requests += 1
+            self.rows += n_rows
+
+    def record_batch(self) -> None:
+        with self._lock:
+            self.batches += 1
+
+    def record_error(self) -> None:
+        with self._lock:
+            self.errors += 1
+
+    def snapshot(self) -> dict[str, float | int]:
+        """
+        Current counters.
+
+        Returns:
+            dict[str, float | int]: Requests, rows, batches and errors so far, p50/p99 latency in milliseconds
+                over the latency window, and requests and rows per second since the server started.
+        """
+        with self._lock:
+            latencies = np.array(self._latencies)
+            elapsed = time.perf_counter() - self._started
+            return {
+                'requests': self.requests,
+                'rows': self.rows,
+                'batches': self.batches,
+                'errors': self.errors,
+                'p50_ms': float(np.percentile(latencies, 50) * 1000) if len(latencies) else 0.0,
+                'p99_ms': float(np.percentile(latencies, 99) * 1000) if len(latencies) else 0.0,
+                'requests_per_s': self.requests / elapsed,
+                'rows_per_s': self.rows / elapsed,
+                'rows_per_batch': self.rows / self.batches if self.batches else 0.0,
+            }
+
+
+class MicroBatcher:
+    """
+    Collects prediction requests from many threads and predicts them together on a single worker thread.
+
+    The worker takes the first waiting request, then keeps collecting until `max_batch_rows` rows are waiting
+    or `max_wait` seconds have passed, and predicts all of them with one call. If the batch fails (e.g. one
+    request lacks a column), its requests are predicted one by one so only the bad request gets the error.
+    The model is only ever used from the worker thread.
+    """
+    def __init__(self, predict: Callable[[DataFrame], np.ndarray], stats: LatencyStats,
+                 max_batch_rows: int = 1024, max_wait: float = 0.002) -> None:
+        self.predict = predict
+        self.stats = stats
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait
+        self._queue: queue.Queue[tuple[DataFrame, Future] | None] = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, rows: DataFrame) -> np.ndarray:
+        """
+        Predicts `rows`, blocking until the batch holding them is done.
+
+        Args:
+            rows (DataFrame): Raw rows, with the columns of the project's dataframe.
+
+        Returns:
+            np.ndarray: One prediction per row.
+        """
+        future: Future = Future()
+        self._queue.put((rows, future))
+        return future.result()
+
+    def _collect(self, first: tuple[DataFrame, Future]) -> list[tuple[DataFrame, Future]]:
+        batch = [first]
+        n_rows = len(first[0])
+        deadline = time.perf_counter() + self.max_wait
+        while n_rows < self.max_batch_rows:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                # Closing: finish this batch, then stop.
+                self._queue.put(None)
+                break
+            batch.append(item)
+            n_rows += len(item[0])
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            self.stats.record_batch()
+            try:
+                predictions = self.predict(concat([rows for rows, _ in batch], ignore_index=True))
+            except Exception:
+                for rows, future in batch:
+                    try:
+                        future.set_result(self.predict(rows))
+                    except Exception as e:
+                        future.set_exception(e)
+                continue
+            start = 0
+            for rows, future in batch:
+                future.set_result(predictions[start:start + len(rows)])
+                start += len(rows)
+
+    def close(self) -> None:
+        """Stops the worker once the waiting requests are predicted."""
+        self._queue.put(None)
+        self._worker.join()
+
+
+def make_server(project: ShellProject, model: str | None = None, host: str = '127.0.0.1', port: int = 8000,
+                max_batch_rows: int = 1024, max_wait: float = 0.002) -> tuple[ThreadingHTTPServer, MicroBatcher]:
+    """
+    Builds an HTTP server predicting with a fitted model of `project`.
+
+    Endpoints:
+        POST /predict: body {"rows": [{"column": value, ...}, ...]}, answers {"model": ..., "predictions": [...]}.
+            Malformed JSON or rows missing a column are answered with 400, failures of the model with 500.
+        GET /stats: the LatencyStats snapshot.
+
+    Args:
+        project (ShellProject): Project with fitted models (see ShellProject.models).
+        model (str | None): The model to serve. Defaults to the logged model with the best score.
+        host (str): Address to bind. Only localhost by default.
+        port (int): Port to bind. 0 picks a free port.
+        max_batch_rows (int): Rows after which a batch is predicted without waiting longer.
+        max_wait (float): Seconds a batch waits for further requests.
+
+    Returns:
+        tuple[ThreadingHTTPServer, MicroBatcher]: The server, not yet serving, and its batcher. Close the batcher
+            after shutting the server down.
+    """
+    # The loaders of a lazy load are not thread-safe: run them before the handler threads read X or df.
+    project.load_deferred()
+    name, fitted = project.fitted_model(model)
+    stats = LatencyStats()
+    batcher = MicroBatcher(lambda rows: fitted.predict(project.encode(rows)), stats,
+                           max_batch_rows=max_batch_rows, max_wait=max_wait)
+
+    class PredictionHandler(BaseHTTPRequestHandler):
+        def _reply(self, status: int, body: dict[str, Any]) -> None:
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self) -> None:
+            if self.path != '/stats':
+                self._reply(404, {'error': f"Unknown endpoint {self.path}. Use POST /predict or GET /stats."})
+                return
+            self._reply(200, {'model': name, **stats.snapshot()})
+
+        def do_POST(self) -> None:
+            if self.path != '/predict':
+                self._reply(404, {'error': f"Unknown endpoint {self.path}. Use POST /predict or GET /stats."})
+                return
+            start = time.perf_counter()
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                if not isinstance(body, dict) or not isinstance(body.get('rows'), list):
+                    raise ValueError('Body must be {"rows": [{"column": value, ...}, ...]}.')
+                rows = DataFrame(body['rows'])
+                missing = project.missing_columns(rows)
+                if missing:
+                    raise ValueError(f"Columns {missing} not in rows.")
+            except (ValueError, TypeError) as e:
+                # The request is malformed; json.JSONDecodeError is a ValueError.
+                stats.record_error()
+                self._reply(400, {'error': str(e)})
+                return
+            try:
+                predictions = batcher.submit(rows)
+            except Exception as e:
+                stats.record_error()
+                self._reply(500, {'error': f"{e.__class__.__name__}: {e}"})
+                return
+            stats.record(time.perf_counter() - start, len(rows))
+            self._reply(200, {'model': name, 'predictions': np.asarray(predictions).tolist()})
+
+        def log_message(self, format: str, *args: Any) -> None:
+            # One line per request would dominate the cost of small requests.
+            pass
+
+    return ThreadingHTTPServer((host, port), PredictionHandler), batcher
@@ -10,6 +10,7 @@ class Shell:
 
     def process_cmd(self, cmd: str) -> tuple[bool, CLIResult | None]:
         """Processes command. If command is "exit", returns False.
+        A command ending with '&' is started as a background job instead (see JobManager).
 
         Args:
             cmd (str): Command to process.
@@ -19,8 +20,11 @@ class Shell:
         """
         if cmd.strip().lower() == "exit":
             return False, None
+        if cmd.strip().endswith('&'):
+            return True, self.model.jobs.submit(cmd.strip()[:-1], self.model)
         try:
             command = Command.from_string(cmd)
+            self.model.jobs.check(command.cmd, self.model.current_project)
             result = command.execute(self.model)
         except (TypeError, ValueError, AssertionError) as e:
             raise e
@@ -28,27 +32,40 @@ class Shell:
 
 
     def run(self) -> None:
-        """Runs the shell."""
+        """Runs the shell. Results of background jobs are shown before the prompt following their completion."""
         while True:
+            for result in self.model.jobs.poll(self.model):
+                self.display_result(result)
             user_input = input(Fore.GREEN + ">> " + Style.RESET_ALL)
             if not user_input: continue
             try:
                 for subcommand in user_input.split(';'):
                     keep_alive, result = self.process_cmd(subcommand)
                     if not keep_alive:
+                        cancelled = self.model.jobs.shutdown()
+                        if cancelled:
+                            self.display_message(f"Cancelled {cancelled} running job(s).")
                         return
                     if result is None: continue
-                    if result.warning:
-                        self.display_message(result.warning.strip(), c = result.c_warn)
-                    if result.result:
-                        self.display_message(result.result, c = result.c_message)
-                    if result.note:
-                        self.display_message(result.note.strip(), c = result.c_note)
+                    self.display_result(result)
             except (ValueError, AssertionError, TypeError, AttributeError) as e:
                 self.display_message("Error:")
                 self.display_log(e)
             
 
+    def display_result(self, result: CLIResult) -> None:
+        """
+        Displays the warning, message and note of a command result in their colors.
+        Args:
+            result (CLIResult): The result to be displayed.
+        """
+        if result.warning:
+            self.display_message(result.warning.strip(), c = result.c_warn)
+        if result.result:
+            self.display_message(result.result, c = result.c_message)
+        if result.note:
+            self.display_message(result.note.strip(), c = result.c_note)
+
     def display_message(self, message: str, c: str = Fore.RED) -> None:
         """
         Displays a message in red color.
@@ -1,36 +1,165 @@
 from src.MLOps.utils.stat_utils import accuracy_confidence_interval, mse_confidence_interval
 from src.commands.command_utils import MlModel, ProjectType
-from src.MLOps.utils.ml_utils import onehot_encode_string_columns, clean_dict
+from src.MLOps.utils.ml_utils import (onehot_encode_string_columns, clean_dict, frame_to_matrix, fits_float32, format_bytes,
+                                     sparse_onehot_matrix, fit_vocabulary)
 from src.MLOps.utils.base import BaseEstimator
+from src.MLOps.utils.preprocessing import PreprocessingCache, FittedModel
+from src.MLOps.utils.result_cache import ResultCache
 from src.MLOps.tuning import log_predictions_from_best
 from src.MLOps.visuals.crud.cruds import Plotter
 from src.cliresult import chain, add_warning, add_note, CLIResult
+from src.profiling import phase
 from src.MLOps.visuals.pca.pca import pca_fit
+from src.column_store import STORAGE_FORMAT, FRAME_DIR, MODELS_DIR, ColumnStoreWriter, write_frame, read_frame, encode_labels, decode_labels
 
 from pandas import DataFrame, read_csv, read_json, read_excel, read_xml, read_html
 from dataclasses import dataclass, field
+from typing import Any, Callable
 import numpy as np
+from scipy import sparse as sp
 from sklearn.decomposition import PCA
+import tempfile
+import weakref
+import joblib
+import shutil
 import os
 import json
 
 
+def _prepare_frame(df: DataFrame, clean: bool, downcast: bool = False) -> DataFrame:
+    """
+    Drops id columns, lowercases and strips the column names and, if `clean`, drops rows with missing values.
+    Applied to the whole frame, or to every chunk of a chunked read. With `downcast`, float64 columns that fit
+    float32 (see fits_float32) are stored as float32; the column store widens them again if a later chunk does not fit.
+    """
+    df = df.drop(columns=[col for col in df.columns if col.lower() == 'id'])
+    df = df.rename(columns={col: col.lower().strip() for col in df.columns})
+    if clean:
+        df = df.dropna()
+    if downcast:
+        narrow = [col for col in df.columns if df[col].dtype == np.float64 and fits_float32(df[col].to_numpy())]
+        df = df.astype({col: np.float32 for col in narrow})
+    return df
+
+DATA_READERS: dict[str, Callable[..., Any]] = {
+    ".csv" : read_csv,
+    ".txt" : read_csv,
+    ".xls" : read_excel,
+    ".xlsx" : read_excel,
+    ".json" : read_json,
+    ".xml" : read_xml,
+    ".html" : read_html
+}
+
+def _find_data_file(df_name: str) -> tuple[str, str, Callable[..., Any]]:
+    """
+    Finds `df_name` in the data directory, trying every supported extension. File names are matched
+    case-insensitively, as commands are lowercased; the directory is left untouched, so that pipelines
+    running in parallel can read from it.
+
+    Returns the path, the extension and the pandas reader for it.
+    """
+    with open('config/paths.json', 'r') as f:
+        paths = json.load(f)
+    data_dir = paths['data_dir']
+    files = {file.lower(): file for file in sorted(os.listdir(data_dir))}
+
+    for ext, load_func in DATA_READERS.items():
+        if f'{df_name}{ext}' in files:
+            return data_dir + files[f'{df_name}{ext}'], ext, load_func
+    raise ValueError(f"Dataframe {df_name} not found.")
+
+def _nbytes(X: np.ndarray | sp.spmatrix) -> int:
+    """Memory held by a dense or sparse matrix."""
+    if sp.issparse(X):
+        return X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+    return X.nbytes
+
+def _replace_array(path: str, array: np.ndarray | sp.spmatrix) -> None:
+    """
+    Saves `array` to `path` through a temporary file. A lazily loaded project may still memory-map the file
+    being replaced, and truncating a mapped file in place would invalidate the mapping.
+    Sparse matrices are saved with scipy.sparse.save_npz, to the .npz file next to `path`.
+    """
+    if sp.issparse(array):
+        path = path[:-len('.npy')] + '.npz'
+        tmp_path = path[:-len('.npz')] + '.tmp.npz'
+        sp.save_npz(tmp_path, array)
+    else:
+        tmp_path = path[:-len('.npy')] + '.tmp.npy'
+        np.save(tmp_path, array, allow_pickle=False)
+    os.replace(tmp_path, path)
+
+
 @dataclass
 class ShellProject:
     project_type: ProjectType
     project_name: str
     project_description: str = ''
     is_cleaned: bool = False
-    df: DataFrame | None = None
-    X: np.ndarray | None = None
-    y: np.ndarray | None = None
+    _df: DataFrame | None = field(default=None, repr=False)
+    _X: np.ndarray | None = field(default=None, repr=False)
+    _y: np.ndarray | None = field(default=None, repr=False)
     feature_names: list[str] | None = None
+    # Categories of every one-hot encoded string column, fitted by makexy (see fit_vocabulary).
+    encoding: dict[str, list[str]] = field(default_factory=dict)
     plotter: Plotter = Plotter()
     pca : PCA | None = None
     
     modeldata: dict[str, dict[str, float | int | str]] = field(default_factory=dict)
+    # Fold standardisation shared by every model command, tuning and PCA; reset whenever X changes.
+    preprocessing: PreprocessingCache = field(default_factory=PreprocessingCache, repr=False)
+    # Results of model commands keyed on the data and the model configuration, saved with the project.
+    result_cache: ResultCache = field(default_factory=ResultCache, repr=False)
+    # Final model of every logged model command, fitted on the current X; saved to the models directory.
+    models: dict[str, FittedModel] = field(default_factory=dict, repr=False)
+    # Deferred loaders for df, X and y, registered by a lazy load and run on first access.
+    _loaders: dict[str, Callable[[], Any]] = field(default_factory=dict, repr=False)
+
+    def _get_lazy(self, name: str) -> Any:
+        loader = self._loaders.pop(name, None)
+        if loader is not None:
+            with phase('load'):
+                setattr(self, '_' + name, loader())
+        return getattr(self, '_' + name)
+
+    def load_deferred(self) -> None:
+        """Runs every pending loader of a lazy load, e.g. before the project is pickled."""
+        for name in list(self._loaders):
+            self._get_lazy(name)
+
+    def _set_lazy(self, name: str, value: Any) -> None:
+        self._loaders.pop(name, None)
+        setattr(self, '_' + name, value)
+
+    @property
+    def df(self) -> DataFrame | None:
+        return self._get_lazy('df')
+
+    @df.setter
+    def df(self, value: DataFrame | None) -> None:
+        self._set_lazy('df', value)
+
+    @property
+    def X(self) -> np.ndarray | None:
+        return self._get_lazy('X')
+
+    @X.setter
+    def X(self, value: np.ndarray | None) -> None:
+        self._set_lazy('X', value)
+        self.preprocessing.invalidate()
+        self.result_cache.data_changed()
+
+    @property
+    def y(self) -> np.ndarray | None:
+        return self._get_lazy('y')
+
+    @y.setter
+    def y(self, value: np.ndarray | None) -> None:
+        self._set_lazy('y', value)
+        self.result_cache.data_changed()
     
-    def add_df(self, df_name: str, delimiter: str = ',') -> CLIResult:
+    def add_df(self, df_name: str, delimiter: str = ',', chunksize: int | None = None, clean: bool = False) -> CLIResult:
         """
         Loads data from a file into a pandas DataFrame.
         
@@ -44,48 +173,51 @@ class ShellProject:
         
         :param df_name: The name of the file to load.
         :param delimiter: The delimiter to use for CSV and TXT files.
+        :param chunksize: Rows per chunk for a streaming read of CSV and TXT files. Each chunk is prepared, its floats
+            downcast, and spilled to a column store on disk; integer columns are narrowed when the store is closed.
+            Numeric columns of the frame stay memory-mapped to the store, so the file never has to fit in memory.
+        :param clean: Drop rows with missing values while reading, as clean does.
         """
-        EXTENSIONS = {".csv" : read_csv, 
-                      ".txt" : read_csv, 
-                      ".xls" : read_excel, 
-                      ".xlsx" : read_excel, 
-                      ".json" : read_json, 
-                      ".xml" : read_xml, 
-                      ".html" : read_html
-                      }
-        
-        with open('config/paths.json', 'r') as f:
-            paths = json.load(f)
-        data_dir = paths['data_dir']
-        for file in os.listdir(data_dir):
-            os.rename(data_dir + file, data_dir + file.lower())
-        
-        file = None
-        for ext, load_func in EXTENSIONS.items():
-            if os.path.exists(data_dir + f'{df_name}{ext}'):
-                file = data_dir + f'{df_name}{ext}'
-                break
-        else:
-            raise ValueError(f"Dataframe {df_name} not found.")
+        file, ext, load_func = _find_data_file(df_name)
         
+        if chunksize is not None and ext not in {".csv", ".txt"}:
+            add_warning(self, f"Warning: -chunksize is only supported for .csv and .txt files. Reading {file.split('/')[-1]} at once.")
+            chunksize = None
 
-        if ext in {".csv", ".txt"}:
-            self.df = load_func(file, delimiter=delimiter)
+        n_rows = 0
+        if chunksize is not None:
+            # Unsaved projects have no directory (and ProjectStore treats an existing one as a saved project).
+            spill_dir = tempfile.mkdtemp(prefix='hungakid_')
+            try:
+                with ColumnStoreWriter(spill_dir) as writer:
+                    for chunk in load_func(file, delimiter=delimiter, chunksize=int(chunksize)):
+                        n_rows += len(chunk)
+                        writer.append(_prepare_frame(chunk, clean, downcast=True))
+                df = read_frame(spill_dir, mmap_mode='r')
+            except BaseException:
+                shutil.rmtree(spill_dir, ignore_errors=True)
+                raise
+            # The frame maps the column files, so they are removed once it is released rather than now.
+            weakref.finalize(df, shutil.rmtree, spill_dir, True)
+            self.df = df
         else:
-            self.df = load_func(file)
-        
-        if self.df is None:
-            raise ValueError("No dataframe could be loaded.")
-        
-        for col in self.df.columns:
-            if col.lower() == 'id':
-                self.df.drop(col, axis=1, inplace=True)
+            if ext in {".csv", ".txt"}:
+                df = load_func(file, delimiter=delimiter)
             else:
-                self.df.rename(columns={col: col.lower().strip()}, inplace=True)
-        self.is_cleaned = False
+                df = load_func(file)
+            if df is None:
+                raise ValueError("No dataframe could be loaded.")
+            n_rows = len(df)
+            self.df = _prepare_frame(df, clean).reset_index(drop=True)
+        
+        if clean:
+            add_note(self, f"Note: Observations dropped: {n_rows - len(self.df)}")
+        self.is_cleaned = clean
         self.plotter = Plotter()
         self.pca = None
         self.X, self.y = None, None
+        self.encoding = {}
+        self.models = {}
         return CLIResult(f"Dataframe {file.split('/')[-1]} added successfully.")
 
     @chain
@@ -105,7 +237,16 @@ class ShellProject:
         return CLIResult(str(self.df.columns.tolist()))
 
     @chain 
-    def make_X_y(self, target: str) -> CLIResult:
+    def make_X_y(self, target: str, optimize: bool = False, sparse: bool = False) -> CLIResult:
+        """
+        Builds X from every column but `target`, and y from `target`.
+
+        :param target: The target column.
+        :param optimize: Store X (and a regression y) as float32 when every column fits it without losing
+            precision, and report the memory of X and y against the float64 default.
+        :param sparse: One-hot encode string columns into a sparse CSR X instead of dense dummy columns.
+            The dataframe keeps its string columns.
+        """
         if not self.is_cleaned:
             add_warning(self, "Warning: Data not cleaned. Run clean to clean data and rerun makexy to be safe...")
         if self.df is None:
@@ -130,14 +271,123 @@ class ShellProject:
             if len(self.df[target].unique()) < 15:
                 add_warning(self, "Warning: Target column has few unique values.")
             
-        self.df = onehot_encode_string_columns(self.df, ignore_columns=[target])
-        self.y = np.array(self.df[target].values)
+        y = np.array(self.df[target].values)
+        with phase('encode'):
+            vocabulary = fit_vocabulary(self.df, ignore_columns=[target])
+            if sparse:
+                features = [col for col in self.df.columns if col != target]
+                numeric = [col for col in features if col not in vocabulary]
+                dtype = np.float32 if optimize and all(fits_float32(self.df[col].to_numpy()) for col in numeric) else np.float64
+                X, features = sparse_onehot_matrix(self.df, features, dtype=dtype, vocabulary=vocabulary)
+            else:
+                self.df = onehot_encode_string_columns(self.df, ignore_columns=[target], vocabulary=vocabulary)
+                features = [col for col in self.df.columns if col != target]
+                X = frame_to_matrix(self.df, features) if optimize else frame_to_matrix(self.df, features, dtype=np.float64)
 
-        self.X = self.df.drop(target, axis=1).values.astype(float)
-        self.feature_names = self.df.drop(target, axis=1).columns.tolist()
+        if optimize:
+            before = len(self.df) * len(features) * np.dtype(np.float64).itemsize + y.nbytes
+            if self.project_type == ProjectType.REGRESSION and y.dtype.kind == 'f' and fits_float32(y):
+                y = y.astype(np.float32)
+            add_note(self, f"Note: X and y use {format_bytes(_nbytes(X) + y.nbytes)} instead of {format_bytes(before)} (X is {X.dtype}).")
+        elif sparse:
+            add_note(self, f"Note: Sparse X has {X.shape[1]} columns and uses {format_bytes(_nbytes(X))}.")
+        self.X, self.y = X, y
+        self.feature_names = features
+        self.encoding = vocabulary
+        self.models = {}
         
         return CLIResult("X and y created successfully.")
 
+    def _source_columns(self) -> list[str]:
+        """The columns of X that are not one-hot dummies of a string column, in the column order of X."""
+        if self.X is None or self.feature_names is None:
+            raise ValueError("X and y not set. Run makexy first.")
+        dummies = {f'{col}_{category}' for col, categories in self.encoding.items() for category in categories}
+        return [col for col in self.feature_names if col not in dummies]
+
+    def missing_columns(self, df: DataFrame) -> list[str]:
+        """
+        The columns encode needs that `df` lacks. Column names are compared lowercased and stripped, as read stores them.
+
+        :param df: New rows, see encode.
+        """
+        columns = {str(col).lower().strip() for col in df.columns}
+        return [col for col in self._source_columns() + list(self.encoding) if col not in columns]
+
+    def encode(self, df: DataFrame) -> np.ndarray | sp.spmatrix:
+        """
+        Builds a feature matrix for new rows with the encoding makexy fitted: the same string columns and
+        categories, in the column order of X. Categories makexy did not see get no column.
+
+        :param df: The new rows, with the columns of the dataframe makexy was run on. The target may be missing.
+        """
+        df = _prepare_frame(df, clean=False)
+        sources = self._source_columns()
+        missing = self.missing_columns(df)
+        if missing:
+            raise ValueError(f"Columns {missing} not in dataframe.")
+        with phase('encode'):
+            if sp.issparse(self.X):
+                X, _ = sparse_onehot_matrix(df, sources + list(self.encoding), dtype=self.X.dtype, vocabulary=self.encoding)
+                return X
+            encoded = onehot_encode_string_columns(df, ignore_columns=[], vocabulary=self.encoding)
+            return frame_to_matrix(encoded, self.feature_names, dtype=self.X.dtype)
+
+    def fitted_model(self, name: str | None = None) -> tuple[str, FittedModel]:
+        """
+        Looks up a fitted model by name, or picks the logged model with the best score.
+
+        :param name: The logged model, e.g. linear_regression.
+        """
+        if not self.models:
+            raise ValueError("No fitted models. Train a model first.")
+        if name is None:
+            scores = {str(model): data['score'] for model, data in self.modeldata.items() if str(model) in self.models}
+            if not scores:
+                raise ValueError(f"No logged scores to choose a model by. Use -model with one of {', '.join(self.models)}.")
+            # Accuracy for classification, MSE for regression.
+            best = max if self.project_type == ProjectType.CLASSIFICATION else min
+            name = best(scores, key=lambda model: scores[model])
+        if name not in self.models and name in {str(model) for model in self.modeldata}:
+            raise ValueError(f"Model {name} was logged without a fitted model (e.g. by runall before final models were kept). "
+                             f"Run it again, or use -model with one of {', '.join(self.models)}.")
+        if name not in self.models:
+            raise ValueError(f"Model {name} not found. Fitted models: {', '.join(self.models)}.")
+        return name, self.models[name]
+
+    def predict(self, df_name: str, model: str | None = None, chunksize: int = 10_000, output: str | None = None,
+                delimiter: str = ',') -> CLIResult:
+        """
+        Predicts every row of a data file with a fitted model and writes the predictions to a CSV file.
+        The file is read, encoded (see encode) and predicted a batch at a time, so it never has to fit in memory.
+
+        :param df_name: The name of the file to predict, looked up in the data directory like read does.
+        :param model: The logged model to predict with. Defaults to the one with the best score.
+        :param chunksize: Rows per batch.
+        :param output: Path of the CSV file to write. Defaults to <df_name>_predictions.csv in the data directory.
+        :param delimiter: The delimiter to use for CSV and TXT files.
+        """
+        model, fitted = self.fitted_model(model)
+
+        file, ext, load_func = _find_data_file(df_name)
+        if output is None:
+            output = os.path.join(os.path.dirname(file), f'{df_name}_predictions.csv')
+        chunksize = int(chunksize)
+        if ext in {".csv", ".txt"}:
+            batches = load_func(file, delimiter=delimiter, chunksize=chunksize)
+        else:
+            df = load_func(file)
+            batches = (df.iloc[start:start + chunksize] for start in range(0, len(df), chunksize))
+
+        n_rows = 0
+        with open(output + '.tmp', 'w', newline='') as f:
+            for batch in batches:
+                predictions = fitted.predict(self.encode(batch))
+                DataFrame({'prediction': predictions}).to_csv(f, header=n_rows == 0, index=False)
+                n_rows += len(batch)
+        os.replace(output + '.tmp', output)
+        return CLIResult(f"Predictions of {model} for {n_rows} rows written to {output}.")
+
     def clean_data(self) -> CLIResult:
         if self.df is None:
             raise ValueError("Project has no dataframe.")
@@ -151,14 +401,17 @@ class ShellProject:
     def log_model(self, model_name: MlModel | str, predictions: np.ndarray, params: dict[str, float | int | str], **kwargs: dict[str, float | int | str]) -> CLIResult:
         if self.X is None or self.y is None:
             raise ValueError("X and y not set. Run makexy first.")
-        if self.project_type == ProjectType.CLASSIFICATION:
-            score, CI_lower, CI_upper = accuracy_confidence_interval(self.y, predictions)
+        # Kept for predict rather than written to modeldata.json, which only holds what json can.
+        final_model = kwargs.pop('final_model', None)
+        with phase('CI computation'):
+            if self.project_type == ProjectType.CLASSIFICATION:
+                score, CI_lower, CI_upper = accuracy_confidence_interval(self.y, predictions)
 
-        elif self.project_type == ProjectType.REGRESSION:
-            score, CI_lower, CI_upper = mse_confidence_interval(self.y, predictions, len(params))
+            elif self.project_type == ProjectType.REGRESSION:
+                score, CI_lower, CI_upper = mse_confidence_interval(self.y, predictions, len(params))
 
-        else:
-            raise ValueError(f"Project type {self.project_type} not recognized.")
+            else:
+                raise ValueError(f"Project type {self.project_type} not recognized.")
 
 
         add_note(self, f'CI: [{CI_lower:.4f}, {CI_upper:.4f}] <==> {score:.4f} +- {(CI_upper - score):.4f}' )
@@ -174,8 +427,22 @@ class ShellProject:
             'additionals' : clean_dict(kwargs),
             'parameters' : clean_dict(params),
         } 
+        if final_model is not None:
+            self.models[str(model_name)] = FittedModel(scaler=self.preprocessing.scaler(self.X), estimator=final_model)
         return CLIResult(f"Model {model_name} logged successfully.")
     
+    def training_copy(self) -> "ShellProject":
+        """
+        Copy of the project holding only what model commands use, cheap to send to a worker process.
+        Its modeldata is a copy and its models start empty, so the models it logs can be told apart.
+        """
+        if self.X is None or self.y is None:
+            raise ValueError(f"X and y of project {self.project_name} not set. Run makexy first.")
+        return ShellProject(project_type=self.project_type, project_name=self.project_name, _X=self.X, _y=self.y,
+                            feature_names=self.feature_names, encoding=self.encoding, plotter=Plotter(),
+                            modeldata=dict(self.modeldata), preprocessing=self.preprocessing,
+                            result_cache=self.result_cache)
+
     def summary(self) -> CLIResult:
         if not self.modeldata:
             return CLIResult("No models logged yet.")
@@ -192,12 +459,15 @@ class ShellProject:
         return CLIResult(summary_str[:-2])
     
     @chain
-    def log_predictions_from_best(self, *models: BaseEstimator, cv: int = 10, n_values: int = 3) -> CLIResult:
+    def log_predictions_from_best(self, *models: BaseEstimator, cv: int = 10, n_values: int = 3,
+                                  search: str = 'grid', max_fits: int | None = None, max_time: float | None = None,
+                                  n_jobs: int | bool | None = -1) -> CLIResult:
         if self.X is None or self.y is None:
             raise ValueError("X and y not set. Run makexy first.")
         if not models:
             raise ValueError("No models provided.")
-        return log_predictions_from_best(*models, project=self, cv=cv, n_values=n_values)
+        return log_predictions_from_best(*models, project=self, cv=cv, n_values=n_values,
+                                         search=search, max_fits=max_fits, max_time=max_time, n_jobs=n_jobs)
     
     @chain   
     def save(self, overwrite: bool = False) -> CLIResult:
@@ -215,30 +485,72 @@ class ShellProject:
         else:
             add_warning(self, f"Warning: Overwriting project {self.project_name}.")
         
+        self._write_project(project_path)
+        return CLIResult(f"Project {self.project_name} saved successfully.")
+
+    def _write_project(self, project_path: str) -> None:
+        """
+        Writes the project to `project_path` in the current storage format (see column_store).
+
+        :param project_path: The project directory. Must exist.
+        """
+        if os.path.exists(project_path + 'df.csv'):
+            # Left over from the CSV layout; it would otherwise be loaded instead of the new files.
+            os.remove(project_path + 'df.csv')
+        y_classes = None
         if self.df is not None:
-            self.df.to_csv(project_path + f'df.csv', index=False)
+            write_frame(self.df, project_path)
         if self.X is not None:
-            np.save(project_path + 'X.npy', self.X)
+            _replace_array(project_path + 'X.npy', self.X)
+            # Only one of X.npy (dense) and X.npz (sparse) may exist.
+            stale = project_path + ('X.npy' if sp.issparse(self.X) else 'X.npz')
+            if os.path.exists(stale):
+                os.remove(stale)
         if self.y is not None:
-            np.save(project_path + 'y.npy', self.y)
+            y_codes, y_classes = encode_labels(self.y)
+            _replace_array(project_path + 'y.npy', y_codes)
         if self.modeldata:
             modeldata_path = project_path + 'modeldata.json'
             with open(modeldata_path, 'w') as f:
                 json.dump(self.modeldata, f, indent=4)
+        self.result_cache.save(project_path)
+        self._write_models(project_path)
         type_path = project_path + 'metadata.json'
         metadata = {
             'description': self.project_description,
             'type': self.project_type,
             'cleaned': self.is_cleaned,
-            'feature_names': self.feature_names
+            'feature_names': self.feature_names,
+            'encoding': self.encoding,
+            'format': STORAGE_FORMAT,
+            'y_classes': y_classes,
         }
         with open(type_path, 'w') as f:
             json.dump(metadata, f, indent=4)
-        
-        return CLIResult(f"Project {self.project_name} saved successfully.")
     
+    def _write_models(self, project_path: str) -> None:
+        """Writes every fitted model to the models directory, removing models that no longer exist."""
+        models_dir = project_path + MODELS_DIR + '/'
+        if not self.models and not os.path.exists(models_dir):
+            return
+        os.makedirs(models_dir, exist_ok=True)
+        for file in os.listdir(models_dir):
+            if file[:-len('.joblib')] not in self.models:
+                os.remove(models_dir + file)
+        for name, fitted in self.models.items():
+            # Through a temporary file: a lazily loaded model may still memory-map the file being replaced.
+            joblib.dump(fitted, models_dir + name + '.tmp')
+            os.replace(models_dir + name + '.tmp', models_dir + name + '.joblib')
+
     @chain
-    def load_project_from_file(self, alias: str) -> CLIResult:
+    def load_project_from_file(self, alias: str, lazy: bool = False) -> CLIResult:
+        """
+        Loads a saved project.
+
+        :param alias: The name of the project.
+        :param lazy: Defer reading df, X and y until they are first used. X and y are then memory-mapped
+            read-only from the project directory instead of being read into memory.
+        """
         with open('config/paths.json', 'r') as f:
             paths = json.load(f)
             
@@ -246,6 +558,51 @@ class ShellProject:
 
         if not os.path.exists(project_path):
             raise ValueError(f"Project {alias} not found.")
+        with open(project_path + 'metadata.json', 'r') as f:
+            metadata = json.load(f)
+        if metadata.get('format', 1) < STORAGE_FORMAT:
+            return self._migrate_legacy_project(alias, project_path)
+
+        mmap_mode = 'r' if lazy else None
+        loaders: dict[str, Callable[[], Any]] = {}
+        if os.path.exists(project_path + FRAME_DIR):
+            loaders['df'] = lambda: read_frame(project_path)
+        else:
+            add_warning(self, "Warning: Dataframe not found.")
+        sparse_X = os.path.exists(project_path + 'X.npz')
+        if (sparse_X or os.path.exists(project_path + 'X.npy')) and os.path.exists(project_path + 'y.npy'):
+            if sparse_X:
+                # Sparse matrices cannot be memory-mapped; lazy loading still defers reading it.
+                loaders['X'] = lambda: sp.load_npz(project_path + 'X.npz').tocsr()
+            else:
+                loaders['X'] = lambda: np.load(project_path + 'X.npy', mmap_mode=mmap_mode, allow_pickle=False)
+            loaders['y'] = lambda: decode_labels(np.load(project_path + 'y.npy', mmap_mode=mmap_mode, allow_pickle=False),
+                                                 metadata.get('y_classes'))
+        else:
+            add_warning(self, "Warning: X and y not found.")
+        try:
+            with open(project_path + 'modeldata.json', 'r') as f:
+                self.modeldata = json.load(f)
+        except FileNotFoundError:
+            add_warning(self, "Warning: Model data not found.")
+        self.result_cache.load(project_path)
+        if os.path.exists(project_path + MODELS_DIR):
+            for file in os.listdir(project_path + MODELS_DIR):
+                self.models[file[:-len('.joblib')]] = joblib.load(f'{project_path}{MODELS_DIR}/{file}', mmap_mode=mmap_mode)
+
+        self._loaders.update(loaders)
+        if not lazy:
+            for name in loaders:
+                self._get_lazy(name)
+        return CLIResult(f"Project {alias} loaded successfully.")
+
+    def _migrate_legacy_project(self, alias: str, project_path: str) -> CLIResult:
+        """
+        Loads a project saved in the CSV layout (df.csv and pickled .npy files) and rewrites it in the current format.
+
+        :param alias: The name of the project.
+        :param project_path: The project directory.
+        """
         try:
             self.df = read_csv(project_path + 'df.csv')
         except FileNotFoundError:
@@ -260,8 +617,10 @@ class ShellProject:
                 self.modeldata = json.load(f)
         except FileNotFoundError:
             add_warning(self, "Warning: Model data not found.")
+        self._write_project(project_path)
+        add_note(self, f"Note: Project {alias} migrated to the binary project format.")
         return CLIResult(f"Project {alias} loaded successfully.")
-    
+
     def plot(self, cmd: str, labels: str | list[str], show: bool = False) -> CLIResult:
         if self.df is None:
             raise ValueError("Project has no dataframe.")
@@ -288,7 +647,8 @@ class ShellProject:
         if self.pca is None:
             self.run_pca()
         assert self.pca is not None, "PCA not run successfully."
-        self.plotter.pca_plot(self.pca, self.X, self.y, task=self.project_type.value, cols = self.feature_names, show=show)
+        self.plotter.pca_plot(self.pca, self.X, self.y, task=self.project_type.value, cols = self.feature_names, show=show,
+                              preprocessing=self.preprocessing)
         return CLIResult('PCA plot created successfully.')
         
     
@@ -296,6 +656,18 @@ class ShellProject:
         self.plotter.show()
         return CLIResult('Plots shown successfully.')
     
+    def cache(self, cmd: str) -> CLIResult:
+        """
+        Manages the result cache of the model commands.
+
+        :param cmd: 'stats' to summarise the cache, 'clear' to remove every cached result, also from disk.
+        """
+        if cmd == 'stats':
+            return CLIResult(self.result_cache.stats())
+        if cmd == 'clear':
+            return CLIResult(f"Cache cleared. Results removed: {self.result_cache.clear()}")
+        raise ValueError(f"Invalid cache command {cmd}. Use clear or stats.")
+
     def stats(self) -> CLIResult:
         if self.df is None:
             raise ValueError("Project has no dataframe.")
@@ -306,7 +678,9 @@ class ShellProject:
             if self.df is None:
                 raise ValueError("Project has no dataframe. Use read to add a dataframe.")
             raise ValueError("X and y not set. Run makexy first.")
-        self.pca = pca_fit(self.X)
+        if sp.issparse(self.X):
+            raise ValueError("PCA needs a dense X. Rerun makexy without -sparse.")
+        self.pca = pca_fit(self.X, self.preprocessing)
         add_note(self, f"Note: PCA explained variance: {self.pca.explained_variance_ratio_}")
         return CLIResult("Ran PCA successfully.")
         
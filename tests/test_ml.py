@@ -1,6 +1,17 @@
 from tests.helpers import simulate_cli, extract_ci_bounds
 
 import unittest
+import json
+import os
+
+
+def _worker_view(X, y, train_index):
+    """Run in a joblib worker: what the worker received."""
+    import numpy as np
+    return isinstance(X, np.memmap), isinstance(train_index, np.memmap), os.path.dirname(X.filename), float(X[train_index].sum()), y.dtype.hasobject
+
+def _failing_search(n_jobs):
+    raise ValueError("bad grid")
 
 expected = {
     'lowercasewarning' : 'Note: Command will be converted to lowercase.',
@@ -49,6 +60,25 @@ class TestML(unittest.TestCase):
         self.assertLess(abs(result_ci_high - converted_ci_high), 0.001)
         self.assert_(not 'Error' in result)
         
+    def test_linear_parallel_folds(self):
+        commands = [
+            "create temporaryproj r",
+            "read iris",
+            "makexy sepallengthcm",
+            "linearregression -n_jobs 2",
+            "exit",
+        ]
+        result = simulate_cli(commands)
+        result_ci_low, result_ci_high = extract_ci_bounds(result)
+        converted_ci_low, converted_ci_high = extract_ci_bounds(results['linreg'])
+
+        assert result_ci_low is not None and converted_ci_low is not None
+        assert result_ci_high is not None and converted_ci_high is not None
+
+        self.assertLess(abs(result_ci_low - converted_ci_low), 0.001)
+        self.assertLess(abs(result_ci_high - converted_ci_high), 0.001)
+        self.assert_(not 'Error' in result)
+
     def test_logistic(self):
         commands = [
             "create temporaryproj c",
@@ -123,4 +153,292 @@ class TestML(unittest.TestCase):
     def test_full_run_2(self):
         commands = ["create test c; read iris; makexy species; runall -n_values 1; summary; exit"]
         result = simulate_cli(commands)
-        self.assert_(not 'Error' in result)
\ No newline at end of file
+        self.assert_(not 'Error' in result)
+
+    def test_runall_logs_search_predictions(self):
+        from unittest import mock
+        from sklearn.naive_bayes import GaussianNB
+        from src.project_store import ProjectStore
+        from src.commands.command import Command
+        from src.MLOps.tuning import tune_hyperparameters, infer_param_grid
+
+        store = ProjectStore()
+        for command in ("create temporaryproj c", "read iris", "makexy species"):
+            Command.from_string(command).execute(store)
+        project = store.get_current_project()
+        with mock.patch.object(project, 'log_model', wraps=project.log_model) as log_model:
+            project.log_predictions_from_best(GaussianNB(), n_values=1, n_jobs=1)
+        logged = log_model.call_args.args[1]
+        search = tune_hyperparameters(GaussianNB(), project.X, project.y, infer_param_grid(GaussianNB(), n_values=1), cv=10, n_jobs=1)
+        self.assertEqual(log_model.call_count, 1)
+        self.assert_((logged == search.predictions).all())
+        # The winner is refitted once, so predict and serve.py can use it.
+        name, fitted = project.fitted_model()
+        self.assertEqual(name, 'GaussianNB')
+        self.assertEqual(fitted.predict(project.X[:5]).shape, (5,))
+        project.modeldata['LogisticRegression'] = dict(project.modeldata['GaussianNB'])
+        with self.assertRaisesRegex(ValueError, 'LogisticRegression was logged without a fitted model'):
+            project.fitted_model('LogisticRegression')
+
+    def test_runall_fallback_folds(self):
+        from unittest import mock
+        from sklearn.naive_bayes import GaussianNB
+        from src.project_store import ProjectStore
+        from src.commands.command import Command
+        from src.MLOps import tuning
+        from src.MLOps.search import SearchResult
+
+        store = ProjectStore()
+        for command in ("create temporaryproj c", "read iris", "makexy species"):
+            Command.from_string(command).execute(store)
+        project = store.get_current_project()
+        # A halving search that stopped before any configuration was cross-validated at the full budget.
+        stopped = iter([(GaussianNB(), SearchResult(params={}, strategy='halving', stopped_early=True))])
+        with mock.patch.object(tuning, 'tune_models', return_value=stopped), \
+             mock.patch.object(tuning, 'generic_ml', wraps=tuning.generic_ml) as generic_ml:
+            project.log_predictions_from_best(GaussianNB(), cv=5, search='halving')
+        self.assertEqual(generic_ml.call_args.kwargs['n_splits'], 5)
+        self.assertIn('GaussianNB', project.modeldata)
+        self.assertIn('GaussianNB', project.models)
+
+    def test_runall_reports_failure(self):
+        from sklearn.naive_bayes import GaussianNB
+        from sklearn.tree import DecisionTreeClassifier
+        from src.project_store import ProjectStore
+        from src.commands.command import Command
+
+        store = ProjectStore()
+        for command in ("create temporaryproj c", "read iris", "makexy species -sparse"):
+            Command.from_string(command).execute(store)
+        result = store.get_current_project().log_predictions_from_best(GaussianNB(), DecisionTreeClassifier(), n_values=1, n_jobs=1)
+        self.assertIn("Model GaussianNB failed (TypeError: Sparse data was passed", result.warning)
+        self.assertIn("DecisionTreeClassifier tuned with grid search", result.note)
+
+    def test_scheduler_workers(self):
+        from sklearn.naive_bayes import GaussianNB
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier, GradientBoostingRegressor
+        from src.MLOps.scheduler import allocate_workers, _tune_in_worker
+
+        models = (GaussianNB(), LogisticRegression(), RandomForestClassifier())
+        for n_jobs in range(3, 12):
+            allocation = allocate_workers(models, n_jobs=n_jobs)
+            self.assertEqual(sum(allocation), n_jobs)
+            self.assertTrue(min(allocation) >= 1)
+        self.assertEqual(allocate_workers(models, n_jobs=9), [2, 3, 4])
+        self.assertEqual(allocate_workers(models * 3, n_jobs=2), [1] * 9)
+        self.assertEqual(allocate_workers((GaussianNB(), GradientBoostingRegressor()), n_jobs=7),
+                         allocate_workers((GaussianNB(), GradientBoostingClassifier()), n_jobs=7))
+        self.assertEqual(_tune_in_worker(_failing_search, 4, 1), (4, "ValueError: bad grid"))
+
+    def test_runall_halving(self):
+        commands = ["create test c; read iris; makexy species; runall -n_values 1 -search halving -max_fits 100; exit"]
+        result = simulate_cli(commands)
+        self.assert_(not 'Error' in result)
+        self.assertIn('GaussianNB tuned with halving search', result)
+        self.assertIn('pruned', result)
+
+    def test_warm_start_path(self):
+        from sklearn.datasets import make_classification
+        from sklearn.ensemble import RandomForestClassifier
+        from src.MLOps.tuning import tune_hyperparameters
+        from src.MLOps import search
+
+        X, y = make_classification(n_samples=120, n_features=6, random_state=0)
+        grid = {'n_estimators': [5, 10, 20], 'max_depth': [2, 4]}
+        warm = tune_hyperparameters(RandomForestClassifier(random_state=0), X, y, grid, cv=3, n_jobs=1)
+        paths, search.WARM_START_PATHS = search.WARM_START_PATHS, {}
+        try:
+            cold = tune_hyperparameters(RandomForestClassifier(random_state=0), X, y, grid, cv=3, n_jobs=1)
+        finally:
+            search.WARM_START_PATHS = paths
+        self.assertEqual(warm.n_fits, 18)
+        self.assertEqual(warm.n_warm_fits, 12)
+        self.assertIn('12 warm-started', warm.describe('RandomForestClassifier'))
+        self.assertEqual(warm.params, cold.params)
+        self.assert_((warm.predictions == cold.predictions).all())
+
+    def test_early_stopping(self):
+        commands = ["create temporaryproj c; read iris; makexy species; gradientboostingclassifier -n_splits 5 -patience 5 -early_stop",
+                    "gradientboostingclassifier -early_stop inner -n_splits 5 -patience 5; cache stats",
+                    "mlpclassifier -early_stop holdout -n_splits 5 -max_iter 50",
+                    "summary", "gaussiannb -early_stop; exit"]
+        result = simulate_cli(commands)
+        # A bare -early_stop is -early_stop inner, and is cached as such.
+        self.assertIn('1 hits, 1 misses', result)
+        self.assertIn('Model gradient_boosting_classifier logged successfully.', result)
+        self.assertIn('Model mlpclass logged successfully.', result)
+        self.assertIn('GaussianNB does not support early stopping.', result)
+        self.assertIn("'best_iterations': [", result)
+        self.assertIn("'final_iterations':", result)
+
+    def test_runall_concurrent(self):
+        commands = ["create test r; read iris; makexy sepallengthcm; runall -n_values 1 -n_jobs 2; summary; exit"]
+        result = simulate_cli(commands)
+        self.assert_(not 'Error' in result)
+        self.assertIn('MLPRegressor', result)
+        self.assertIn('RandomForestRegressor', result)
+
+    def test_naivebayes_out_of_core(self):
+        commands = ["create test c; read iris; makexy species; gaussiannb; gaussiannb -chunksize 32; exit"]
+        result = simulate_cli(commands)
+        self.assert_(not 'Error' in result)
+        self.assertEqual(result.count('Model naive_bayes'), 2)
+
+    def test_linear_chunked(self):
+        commands = ["create temporaryproj r; read iris; makexy sepallengthcm; linearregression -chunksize 32; exit"]
+        result = simulate_cli(commands)
+        result_ci_low, result_ci_high = extract_ci_bounds(result)
+        converted_ci_low, converted_ci_high = extract_ci_bounds(results['linreg'])
+
+        assert result_ci_low is not None and converted_ci_low is not None
+        assert result_ci_high is not None and converted_ci_high is not None
+
+        self.assertLess(abs(result_ci_low - converted_ci_low), 0.001)
+        self.assertLess(abs(result_ci_high - converted_ci_high), 0.001)
+        self.assert_(not 'Error' in result)
+
+    def test_linear_loo(self):
+        commands = ["create temporaryproj r; read iris; makexy sepallengthcm; linearregression -cv loo; summary",
+                    "linearregression -cv nosuchcv; exit"]
+        result = simulate_cli(commands)
+        result_ci_low, result_ci_high = extract_ci_bounds(result)
+        assert result_ci_low is not None and result_ci_high is not None
+
+        self.assertIn('Model linear_regression logged successfully.', result)
+        self.assertIn("'cv': 'loo'", result)
+        self.assertLess(result_ci_low, result_ci_high)
+        self.assertIn('Invalid cv nosuchcv.', result)
+
+    def test_linear_loo_refits(self):
+        import numpy as np
+        from sklearn.linear_model import LinearRegression
+        from src.MLOps.regression.ols import ols_ml
+
+        rng = np.random.default_rng(0)
+        n = 12
+        # The last column is a category of a single row, which has leverage 1.
+        X = np.column_stack([rng.normal(size=n), rng.normal(size=n), np.zeros(n)])
+        X[3, 2] = 1.0
+        y = X @ [1.5, -2.0, 4.0] + rng.normal(scale=0.1, size=n)
+        expected = []
+        for i in range(n):
+            train = np.arange(n) != i
+            mu, sig = X[train].mean(axis=0), X[train].std(axis=0)
+            sig[sig == 0] = 1
+            model = LinearRegression().fit((X[train] - mu) / sig, y[train])
+            expected.append(model.predict(((X[i] - mu) / sig)[None])[0])
+        np.testing.assert_allclose(ols_ml(X, y, cv='loo')[0], expected, rtol=0, atol=1e-10)
+
+    def test_linear_optimized_xy(self):
+        commands = ["create temporaryproj r; read iris; makexy sepallengthcm -optimize; linearregression; exit"]
+        result = simulate_cli(commands)
+        result_ci_low, result_ci_high = extract_ci_bounds(result)
+        converted_ci_low, converted_ci_high = extract_ci_bounds(results['linreg'])
+
+        assert result_ci_low is not None and converted_ci_low is not None
+        assert result_ci_high is not None and converted_ci_high is not None
+
+        self.assertLess(abs(result_ci_low - converted_ci_low), 0.001)
+        self.assertLess(abs(result_ci_high - converted_ci_high), 0.001)
+        self.assertIn('(X is float32)', result)
+        self.assert_(not 'Error' in result)
+
+    def test_linear_sparse_xy(self):
+        commands = ["create temporaryproj r; read iris; makexy sepallengthcm -sparse; linearregression; exit"]
+        result = simulate_cli(commands)
+        self.assertIn('Sparse X has 6 columns', result)
+        self.assertIn('Model linear_regression logged successfully.', result)
+        self.assert_(not 'Error' in result)
+
+    def test_shared_preprocessing(self):
+        commands = ["create temporaryproj r; read iris; makexy sepallengthcm; linearregression; linearregression -n_jobs 2; pca run; exit"]
+        result = simulate_cli(commands)
+        # The parallel run reproduces the serial score, which is not logged a second time.
+        self.assertEqual(result.count('Model linear_regression logged successfully.'), 1)
+        self.assertIn('Model linear_regression not logged.', result)
+        self.assertIn('Ran PCA successfully.', result)
+        self.assert_(not 'Error' in result)
+
+    def test_cached_results(self):
+        commands = ["create temporaryproj r; read iris; makexy sepallengthcm; linearregression; linearregression -n_jobs 2; cache stats; cache clear; exit"]
+        result = simulate_cli(commands)
+        self.assertEqual(result.count('Model linear_regression logged successfully.'), 1)
+        self.assertIn('Model linear_regression not logged.', result)
+        self.assertIn('1 cached results in memory', result)
+        self.assertIn('1 hits, 1 misses', result)
+        self.assertIn('Results removed: 1', result)
+        self.assert_(not 'Error' in result)
+
+    def test_result_cache_key(self):
+        import numpy as np
+        from sklearn.linear_model import LinearRegression
+        from src.MLOps.utils.result_cache import ResultCache
+
+        cache = ResultCache()
+        X, y = np.arange(20.0).reshape(10, 2), np.arange(10.0)
+        default = cache.key(LinearRegression(), X, y, {})
+        self.assertEqual(cache.key(LinearRegression(), X, y, {'cv': 'kfold', 'n_jobs': 2, 'early_stop': None, 'patience': 5}), default)
+        self.assertNotEqual(cache.key(LinearRegression(), X, y, {'cv': 'loo'}), default)
+
+    def test_result_size_estimate(self):
+        import pickle
+        from sklearn.datasets import make_classification
+        from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+        from src.MLOps.utils.result_cache import estimate_nbytes
+
+        X, y = make_classification(n_samples=500, random_state=0)
+        for model in (RandomForestClassifier(n_estimators=10, random_state=0), GradientBoostingClassifier(n_estimators=10, random_state=0)):
+            model.fit(X, y)
+            pickled = len(pickle.dumps(model))
+            self.assertTrue(pickled / 2 < estimate_nbytes(model) <= pickled)
+
+    def test_foreach(self):
+        commands = ["create temporaryproj c; read iris; makexy species; create temporaryproj2 c; read iris; makexy species; "
+                    "foreach [temporaryproj, temporaryproj2] gaussiannb -n_splits 5",
+                    "foreach [temporaryproj, nosuchproj] gaussiannb",
+                    "foreach [temporaryproj] read iris",
+                    "chproj temporaryproj; summary; exit"]
+        result = simulate_cli(commands)
+        self.assertIn('temporaryproj: Model naive_bayes logged successfully.', result)
+        self.assertIn('temporaryproj2: Model naive_bayes logged successfully.', result)
+        self.assertIn('gaussiannb ran on 2 of 2 projects.', result)
+        self.assertIn('temporaryproj: CI:', result)
+        self.assertIn('Project nosuchproj does not exist.', result)
+        self.assertIn("foreach runs model commands", result)
+        self.assertIn('Model: naive_bayes', result)
+
+    def test_profile(self):
+        commands = ["create temporaryproj r; read iris; makexy sepallengthcm; profile on; linearregression -n_splits 3; profile show; "
+                    "profile export -path temporary_profile.jsonl; profile off; profile clear; exit"]
+        result = simulate_cli(commands)
+        with open('temporary_profile.jsonl', 'r') as f:
+            records = [json.loads(line) for line in f]
+        os.remove('temporary_profile.jsonl')
+        phases = {record['phase'] for record in records if record['command'] == 'linearregression'}
+        self.assertTrue({'linearregression', 'fold fit', 'predict', 'refit', 'CI computation', 'log_model'} <= phases)
+        # Every fold is solved from the same pass over X.
+        self.assertEqual(sum(record['phase'] == 'fold fit' for record in records), 1)
+        self.assert_(all(record['peak_bytes'] is not None for record in records if record['phase'] == 'fold fit'))
+        self.assertIn('fold fit', result)
+        self.assertIn('records written to temporary_profile.jsonl', result)
+        self.assert_(not 'Error' in result)
+
+    def test_shared_data(self):
+        import numpy as np
+        from joblib import Parallel, delayed
+        from src.MLOps.utils.shared_data import SharedData
+
+        X = np.arange(60, dtype=np.float64).reshape(20, 3)
+        y = np.array(['a', 'b'] * 10, dtype=object)
+        with SharedData(X, y) as shared:
+            directory = shared.directory
+            folds = shared.share_folds([(np.arange(10), np.arange(10, 20))])
+            views = Parallel(n_jobs=2)(delayed(_worker_view)(shared.X, shared.y, train_index) for train_index, _ in folds * 2)
+            self.assertIs(shared.y, y)
+        for x_mapped, index_mapped, x_directory, total, y_object in views:
+            # Far below joblib's own memmapping threshold, so only SharedData maps them.
+            self.assert_(x_mapped and index_mapped and y_object)
+            self.assertEqual(x_directory, directory)
+            self.assertEqual(total, X[:10].sum())
+        self.assertFalse(os.path.exists(directory))
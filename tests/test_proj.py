@@ -3,6 +3,7 @@ from tests.helpers import simulate_cli, convert_expected
 import unittest
 import os
 import json
+import shutil
 
 expected = {
     'lowercasewarning' : 'Note: Command will be converted to lowercase.',
@@ -107,4 +108,320 @@ class TestCommands(unittest.TestCase):
         self.assert_(not 'Error' in result1)
         self.assert_(not 'Error' in result2)
         self.assert_(not 'Error' in result3)
-        
\ No newline at end of file
+        
+    def test_save_load_classification_binary(self):
+        with open('config/paths.json', 'r') as f:
+            paths = json.load(f)
+        projects_dir = paths['projects_dir']
+        commands = ["create temporaryproj c; read iris; clean; makexy species; save; exit"]
+        result1 = simulate_cli(commands)
+        saved_files = sorted(os.listdir(f"{projects_dir}/temporaryproj/"))
+        with open(f"{projects_dir}/temporaryproj/metadata.json", 'r') as f:
+            metadata = json.load(f)
+
+        commands = ["load temporaryproj; logisticregression; delete temporaryproj -from_dir; exit"]
+        result2 = simulate_cli(commands)
+
+        self.assertEqual(saved_files, ['X.npy', 'df', 'metadata.json', 'y.npy'])
+        self.assertEqual(metadata['y_classes'], ['Iris-setosa', 'Iris-versicolor', 'Iris-virginica'])
+        self.assert_(not os.path.exists(f"{projects_dir}/temporaryproj/"))
+        self.assert_(not 'Error' in result1)
+        self.assert_(not 'Error' in result2)
+        self.assertIn('Model logistic_regression logged successfully.', result2)
+
+    def test_lazy_load(self):
+        commands = ["create temporaryproj r; read iris; clean; makexy sepallengthcm; linearregression; save; exit"]
+        result1 = simulate_cli(commands)
+
+        commands = ["load temporaryproj -lazy; summary; linearregression; delete temporaryproj -from_dir; exit"]
+        result2 = simulate_cli(commands)
+
+        self.assert_(not 'Error' in result1)
+        self.assert_(not 'Error' in result2)
+        self.assertIn('Project temporaryproj loaded successfully.', result2)
+        self.assertIn('linear_regression', result2)
+
+    def test_add_data_chunked(self):
+        commands = ["create temporaryproj r; read iris -chunksize 40 -clean; makexy sepallengthcm; linearregression; exit"]
+        result = simulate_cli(commands)
+        self.assert_(not 'Error' in result)
+        self.assertIn(expected['add_data'], result)
+        self.assertIn('Observations dropped: 0', result)
+        self.assertIn('Model linear_regression logged successfully.', result)
+
+    def test_add_data_chunked_mmap(self):
+        import gc
+        import numpy as np
+        from src.project_store import ProjectStore
+        from src.commands.command import Command
+
+        store = ProjectStore()
+        for command in ("create temporaryproj r", "read iris -chunksize 40"):
+            Command.from_string(command).execute(store)
+        project = store.get_current_project()
+        self.assertEqual(project.df['petallengthcm'].dtype, np.float32)
+        values = project.df['petallengthcm'].to_numpy()
+        while not isinstance(values, np.memmap) and values.base is not None:
+            values = values.base
+        self.assertIsInstance(values, np.memmap)
+        spill_dir = os.path.dirname(os.path.dirname(values.filename))
+        del values
+        Command.from_string("read iris").execute(store)
+        gc.collect()
+        self.assertFalse(os.path.exists(spill_dir))
+
+    def test_load_legacy_project(self):
+        import numpy as np
+        import pandas as pd
+        from src.project_store import ProjectStore
+        from src.column_store import STORAGE_FORMAT
+        with open('config/paths.json', 'r') as f:
+            paths = json.load(f)
+        project_path = f"{paths['projects_dir']}temporaryproj/"
+        # The layout save wrote before the binary column store: df.csv, pickled .npy files and no format.
+        df = pd.read_csv(f"{paths['data_dir']}iris.csv").drop(columns=['Id'])
+        df.columns = [col.lower() for col in df.columns]
+        X, y = df.drop(columns=['species']).to_numpy(), df['species'].to_numpy(dtype=object)
+        modeldata = {'gaussiannb': {'score': 0.95, 'CI_lower': 0.9, 'CI_upper': 0.99, 'additionals': {}, 'parameters': {}}}
+        os.makedirs(project_path)
+        df.to_csv(project_path + 'df.csv', index=False)
+        np.save(project_path + 'X.npy', X)
+        np.save(project_path + 'y.npy', y)
+        with open(project_path + 'modeldata.json', 'w') as f:
+            json.dump(modeldata, f)
+        with open(project_path + 'metadata.json', 'w') as f:
+            json.dump({'description': '', 'type': 'classification', 'cleaned': True, 'feature_names': list(df.columns[:-1])}, f)
+
+        try:
+            migrated = ProjectStore()
+            result = migrated.load_project_from_file('temporaryproj')
+            files = sorted(os.listdir(project_path))
+            with open(project_path + 'metadata.json', 'r') as f:
+                metadata = json.load(f)
+            reloaded = ProjectStore()
+            reloaded.load_project_from_file('temporaryproj')
+        finally:
+            shutil.rmtree(project_path)
+
+        self.assertIn('migrated to the binary project format', result.note)
+        self.assertNotIn('df.csv', files)
+        self.assertIn('df', files)
+        self.assertEqual(metadata['format'], STORAGE_FORMAT)
+        for store in (migrated, reloaded):
+            project = store.get_current_project()
+            pd.testing.assert_frame_equal(project.df, df, check_dtype=False)
+            np.testing.assert_array_equal(project.X, X)
+            np.testing.assert_array_equal(project.y, y)
+            self.assertEqual(project.modeldata, modeldata)
+
+    def test_save_load_encoding(self):
+        with open('config/paths.json', 'r') as f:
+            paths = json.load(f)
+        projects_dir = paths['projects_dir']
+        commands = ["create temporaryproj r; read iris; clean; makexy sepallengthcm; save; exit"]
+        result1 = simulate_cli(commands)
+        with open(f"{projects_dir}/temporaryproj/metadata.json", 'r') as f:
+            metadata = json.load(f)
+
+        import numpy as np
+        import pandas as pd
+        from src.project_store import ProjectStore
+        from src.commands.command import Command
+        store = ProjectStore()
+        Command.from_string("load temporaryproj").execute(store)
+        project = store.get_current_project()
+        rows = pd.read_csv(f"{paths['data_dir']}iris.csv").iloc[[0, 50, 100]].drop(columns=['SepalLengthCm'])
+        unseen = rows.iloc[[0]].assign(Species='Iris-unknown')
+        encoded = project.encode(rows)
+        encoded_unseen = project.encode(unseen)
+
+        commands = ["load temporaryproj; linearregression; delete temporaryproj -from_dir; exit"]
+        result2 = simulate_cli(commands)
+
+        np.testing.assert_array_equal(encoded, project.X[[0, 50, 100]])
+        self.assertEqual(encoded_unseen.shape, (1, project.X.shape[1]))
+        np.testing.assert_array_equal(encoded_unseen[0, :-3], project.X[0, :-3])
+        self.assertEqual(encoded_unseen[0, -3:].tolist(), [0, 0, 0])
+        self.assertEqual(metadata['encoding'], {'species': ['Iris-setosa', 'Iris-versicolor', 'Iris-virginica']})
+        self.assertEqual(metadata['feature_names'][-3:], ['species_Iris-setosa', 'species_Iris-versicolor', 'species_Iris-virginica'])
+        self.assert_(not 'Error' in result1)
+        self.assert_(not 'Error' in result2)
+
+    def test_predict_saved_model(self):
+        with open('config/paths.json', 'r') as f:
+            paths = json.load(f)
+        output = f"{paths['data_dir']}iris_predictions.csv"
+        commands = ["create temporaryproj r; read iris; clean; makexy sepallengthcm; linearregression; save; exit"]
+        result1 = simulate_cli(commands)
+        saved_models = os.listdir(f"{paths['projects_dir']}/temporaryproj/models/")
+
+        commands = ["load temporaryproj; predict iris -chunksize 40; delete temporaryproj -from_dir; exit"]
+        result2 = simulate_cli(commands)
+        with open(output, 'r') as f:
+            lines = f.read().splitlines()
+        os.remove(output)
+
+        self.assertEqual(saved_models, ['linear_regression.joblib'])
+        self.assertIn('Predictions of linear_regression for 150 rows written to', result2)
+        self.assertEqual(lines[0], 'prediction')
+        self.assertEqual(len(lines), 151)
+        self.assert_(not 'Error' in result1)
+        self.assert_(not 'Error' in result2)
+
+    def test_serve_saved_model(self):
+        from src.project_store import ProjectStore
+        from src.serving import make_server
+        from src.MLOps.utils.preprocessing import FittedModel
+        from urllib.request import urlopen, Request
+        from urllib.error import HTTPError
+        from unittest import mock
+        import threading
+
+        commands = ["create temporaryproj r; read iris; clean; makexy sepallengthcm; linearregression; save; exit"]
+        result1 = simulate_cli(commands)
+
+        project_store = ProjectStore()
+        project_store.load_project_from_file('temporaryproj')
+        server, batcher = make_server(project_store.get_current_project(), port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        row = {'sepalwidthcm': 3.5, 'petallengthcm': 1.4, 'petalwidthcm': 0.2, 'species': 'Iris-setosa'}
+        responses = []
+        def post() -> None:
+            request = Request(url + '/predict', data=json.dumps({'rows': [row, row]}).encode(), method='POST')
+            with urlopen(request) as response:
+                responses.append(json.load(response))
+        threads = [threading.Thread(target=post) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        errors = {}
+        for label, body in (('json', b'{"rows": ['), ('column', json.dumps({'rows': [{'sepalwidthcm': 3.5}]}).encode()),
+                            ('model', json.dumps({'rows': [row]}).encode())):
+            with mock.patch.object(FittedModel, 'predict', side_effect=RuntimeError("model broke")):
+                try:
+                    urlopen(Request(url + '/predict', data=body, method='POST'))
+                except HTTPError as e:
+                    errors[label] = (e.code, json.load(e)['error'])
+        with urlopen(url + '/stats') as response:
+            stats = json.load(response)
+        server.shutdown()
+        server.server_close()
+        batcher.close()
+        result2 = simulate_cli(["delete temporaryproj -from_dir; exit"])
+
+        self.assertEqual(len(responses), 8)
+        self.assert_(all(len(response['predictions']) == 2 for response in responses))
+        self.assertEqual(errors['json'][0], 400)
+        self.assertEqual(errors['column'], (400, "Columns ['petallengthcm', 'petalwidthcm', 'species'] not in rows."))
+        self.assertEqual(errors['model'], (500, "RuntimeError: model broke"))
+        self.assertEqual(stats['errors'], 3)
+        self.assertEqual(stats['requests'], 8)
+        self.assertEqual(stats['rows'], 16)
+        self.assertLessEqual(stats['batches'], 8)
+        self.assert_(not 'Error' in result1)
+        self.assert_(not 'Error' in result2)
+
+    def test_serve_lazy_project(self):
+        from src.project_store import ProjectStore
+        from src.serving import make_server
+        from urllib.request import urlopen, Request
+        from urllib.error import HTTPError
+        import threading
+
+        commands = ["create temporaryproj r; read iris; clean; makexy sepallengthcm; linearregression; save; exit"]
+        result1 = simulate_cli(commands)
+
+        project_store = ProjectStore()
+        project_store.load_project_from_file('temporaryproj', lazy=True)
+        project = project_store.get_current_project()
+        pending = set(project._loaders)
+        server, batcher = make_server(project, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        row = {'sepalwidthcm': 3.5, 'petallengthcm': 1.4, 'petalwidthcm': 0.2, 'species': 'Iris-setosa'}
+        statuses = []
+        def post() -> None:
+            request = Request(url + '/predict', data=json.dumps({'rows': [row]}).encode(), method='POST')
+            try:
+                with urlopen(request) as response:
+                    statuses.append(response.status)
+            except HTTPError as e:
+                statuses.append(e.code)
+        threads = [threading.Thread(target=post) for _ in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        server.shutdown()
+        server.server_close()
+        batcher.close()
+        result2 = simulate_cli(["delete temporaryproj -from_dir; exit"])
+
+        self.assertTrue(pending)
+        self.assertEqual(project._loaders, {})
+        self.assertEqual(statuses, [200] * 16)
+        self.assert_(not 'Error' in result1)
+        self.assert_(not 'Error' in result2)
+
+    def test_background_jobs(self):
+        commands = ["create temporaryproj r; read iris; clean; makexy sepallengthcm; linearregression &", "linearregression",
+                    "jobs; wait 1; summary; exit"]
+        result1 = simulate_cli(commands)
+
+        commands = ["create temporaryproj r; read iris; clean; makexy sepallengthcm; mlpregressor -max_iter 5000 &; cancel 1; jobs; summary; exit"]
+        result2 = simulate_cli(commands)
+
+        self.assertIn('[1] linearregression started on temporaryproj.', result1)
+        self.assertIn('Project temporaryproj is busy with job 1', result1)
+        self.assertIn('[1] linearregression done in', result1)
+        self.assertIn('Model linear_regression logged successfully.', result1)
+        self.assertIn('[1] mlpregressor -max_iter 5000 cancelled after', result2)
+        self.assertIn('[1] cancelled', result2)
+        self.assert_(not 'mlpreg' in result2.replace('mlpregressor', ''))
+
+    def test_read_mixed_case_file(self):
+        shutil.copy('data/iris.csv', 'data/Temporarydata.csv')
+        try:
+            result = simulate_cli(["create temporaryproj r; read temporarydata; clean; makexy sepallengthcm; exit"])
+            files = os.listdir('data')
+        finally:
+            os.remove('data/Temporarydata.csv')
+
+        self.assert_(not 'Error' in result)
+        self.assertIn('Temporarydata.csv', files)
+        self.assertNotIn('temporarydata.csv', files)
+
+    def test_run_script(self):
+        from src.batch import run_script
+
+        script = '\n'.join([
+            "# two independent projects",
+            "create temporaryproj r; read iris; clean; makexy sepallengthcm",
+            "create temporaryproj2 c",
+            "read iris; clean; makexy species; gaussiannb",
+            "chproj temporaryproj; linearregression; makexy nosuchcolumn; summary",
+            "chproj temporaryproj2; summary",
+        ])
+        with open('temporary_script.hk', 'w') as f:
+            f.write(script)
+        try:
+            result = run_script('temporary_script.hk', log='temporary_script.json', n_jobs=2)
+            with open('temporary_script.json', 'r') as f:
+                log = json.load(f)
+        finally:
+            os.remove('temporary_script.hk')
+            if os.path.exists('temporary_script.json'):
+                os.remove('temporary_script.json')
+
+        statuses = {(record['project'], record['command']): record['status'] for record in log['commands']}
+        self.assertEqual(log, result)
+        self.assertEqual(sorted(log['pipelines']), [['temporaryproj'], ['temporaryproj2']])
+        self.assertEqual([record['index'] for record in log['commands']], list(range(15)))
+        self.assertEqual(statuses[('temporaryproj', 'linearregression')], 'ok')
+        self.assertEqual(statuses[('temporaryproj', 'makexy nosuchcolumn')], 'failed')
+        self.assertEqual(statuses[('temporaryproj', 'summary')], 'skipped')
+        self.assertEqual(statuses[('temporaryproj2', 'summary')], 'ok')
+        self.assertEqual(log['status'], 'failed')
+        self.assertEqual(sorted(log['summary']), ['temporaryproj2: 7 commands, 0 failed.', 'temporaryproj: 8 commands, 1 failed.'])